@@ -0,0 +1,266 @@
+"""Benchmark scenarios for `campaign-cli bench`.
+
+Each scenario runs `cli_live build` in a child process against the local mock
+portal (campaign_core.mock_portal) serving a synthetic dataset, and records:
+
+  records           CSV rows written
+  wall_s            wall time of the child process
+  records_per_sec   records / wall_s
+  api_calls         HTTP requests made by the client, retries included (EMF metrics)
+  p99_ms            client-side p99 request latency across every portal
+  peak_rss_mb       peak RSS of the child (wait4 rusage)
+
+Results can be saved as a baseline JSON, and later runs compared against it:
+a metric that is worse than the baseline by more than the tolerance (and by more
+than a small absolute slack, so an 8ms p99 turning into 12ms does not count) is
+flagged as a regression, as is any change in the number of records.
+"""
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from campaign_core.config import ALLOWED_PORTALS
+from campaign_core.metrics import LatencyHistogram
+from campaign_core.mock_portal import MockPortalConfig, MockPortalServer, write_secret
+from campaign_core.synthetic import DatasetSpec, DiskDataset, SyntheticDataset
+
+BASELINE_VERSION = 1
+
+# metric -> (direction, absolute slack): +1 means higher is worse
+METRICS = {
+    "wall_s": (+1, 0.5),
+    "records_per_sec": (-1, 0.0),
+    "api_calls": (+1, 0),
+    "p99_ms": (+1, 5.0),
+    "peak_rss_mb": (+1, 10.0),
+}
+
+# Environment that would make a child run read or write state outside the scenario
+_STATE_ENV = ("CAMPAIGN_CACHE_PATH", "CAMPAIGN_CACHE_S3_URI", "CAMPAIGN_HTTP_CACHE_DIR",
+              "CAMPAIGN_CHECKPOINT_DIR", "CAMPAIGN_METRICS_SINK", "PORTALS")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    description: str
+    all_portals: bool = False
+    audience: str = "both"            # both | buyers | non-buyers
+    registered_users: bool = False
+    warm_cache: bool = False          # run once untimed to fill the caches first
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "single-cold": Scenario("One portal, both audiences, empty caches"),
+    "single-warm": Scenario("One portal, both audiences, caches filled by a previous run",
+                            warm_cache=True),
+    "all-portals": Scenario("Every portal, both audiences, empty caches", all_portals=True),
+    "buyers": Scenario("One portal, buyers only", audience="buyers"),
+    "non-buyers": Scenario("One portal, non-buyers only", audience="non-buyers"),
+    "registered-users": Scenario("One portal, with registered-user lookups",
+                                 registered_users=True),
+}
+
+
+def _child_env(server: MockPortalServer, secret: str) -> Dict[str, str]:
+    env = {k: v for k, v in os.environ.items() if k not in _STATE_ENV}
+    root = str(Path(__file__).resolve().parents[1])
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (root, env.get("PYTHONPATH")) if p)
+    env["NETLIFE_BASE_URL_TEMPLATE"] = server.base_url_template
+    env["NETLIFE_SECRET_ARN"] = secret
+    return env
+
+
+def _run_child(args: List[str], env: Dict[str, str], cwd: str, log_path: str) -> Dict[str, Any]:
+    """Run one child process; returns exit code, wall time and peak RSS (MB)"""
+    with open(log_path, "wb") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(args, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives this child's own rusage (RUSAGE_CHILDREN would be a max over all)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {"exit_code": proc.returncode, "wall_s": wall, "peak_rss_mb": rss_mb}
+
+
+def _api_metrics(emf_path: str) -> Dict[str, Any]:
+    """Requests, retries and merged p99 from the portal-wide EMF lines"""
+    requests = retries = 0
+    histogram = LatencyHistogram()
+    if os.path.exists(emf_path):
+        with open(emf_path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                doc = json.loads(line)
+                if "Endpoint" in doc:
+                    continue
+                requests += doc["Requests"]
+                retries += doc["Retries"]
+                histogram.merge(LatencyHistogram.from_buckets(doc["LatencyHistogram"]))
+    return {"api_calls": requests, "retries": retries, "p99_ms": histogram.percentile(0.99)}
+
+
+def _count_records(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as fh:
+        return max(0, sum(1 for _ in fh) - 1)
+
+
+def run_scenario(name: str, scenario: Scenario, server: MockPortalServer, secret: str,
+                 portals: List[str], workdir: str, engine: str = "threads",
+                 concurrency: int = 5, repeat: int = 1) -> Dict[str, Any]:
+    """Run a scenario `repeat` times; metrics are medians over the runs"""
+    scenario_dir = os.path.join(workdir, name)
+    os.makedirs(scenario_dir, exist_ok=True)
+    env = _child_env(server, secret)
+    selected = portals if scenario.all_portals else portals[:1]
+    cache_path = os.path.join(scenario_dir, "cache.sqlite")
+    http_cache_dir = os.path.join(scenario_dir, "http-cache")
+
+    def command(run: str) -> List[str]:
+        args = [sys.executable, "-m", "campaign_cli.cli_live", "build",
+                "--portals", ",".join(selected), f"--{scenario.audience}",
+                "--engine", engine, "--concurrency", str(concurrency),
+                "--out", os.path.join(scenario_dir, f"{run}.csv"),
+                "--metrics-sink", os.path.join(scenario_dir, f"{run}.emf"),
+                "--cache-path", cache_path, "--http-cache-dir", http_cache_dir]
+        if scenario.registered_users:
+            args.append("--check-registered-users")
+        return args
+
+    prime_exit_code = 0
+    if scenario.warm_cache:
+        # A failed prime leaves the caches cold or half-filled: the warm numbers would lie
+        prime = _run_child(command("prime"), env, scenario_dir, os.path.join(scenario_dir, "prime.log"))
+        prime_exit_code = prime["exit_code"]
+
+    runs = []
+    for i in range(repeat):
+        if not scenario.warm_cache:
+            # Cold: every measured run starts from empty caches
+            shutil.rmtree(http_cache_dir, ignore_errors=True)
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+        run = f"run{i + 1}"
+        result = _run_child(command(run), env, scenario_dir, os.path.join(scenario_dir, f"{run}.log"))
+        result["records"] = _count_records(os.path.join(scenario_dir, f"{run}.csv"))
+        result.update(_api_metrics(os.path.join(scenario_dir, f"{run}.emf")))
+        runs.append(result)
+
+    out: Dict[str, Any] = {"portals": len(selected), "runs": len(runs),
+                           "exit_code": prime_exit_code or max(r["exit_code"] for r in runs)}
+    if scenario.warm_cache:
+        out["prime_exit_code"] = prime_exit_code
+    for key in ("records", "api_calls", "retries"):
+        out[key] = statistics.median_low(r[key] for r in runs)
+    for key in ("wall_s", "p99_ms", "peak_rss_mb"):
+        out[key] = statistics.median(r[key] for r in runs)
+    out["records_per_sec"] = out["records"] / out["wall_s"] if out["wall_s"] else 0.0
+    for key in ("wall_s", "records_per_sec", "p99_ms", "peak_rss_mb"):
+        out[key] = round(out[key], 3)
+    return out
+
+
+def run_bench(scenario_names: List[str], spec: DatasetSpec, server_config: MockPortalConfig,
+              portals: Optional[List[str]] = None, dataset_dir: Optional[str] = None,
+              engine: str = "threads", concurrency: int = 5, repeat: int = 1,
+              workdir: Optional[str] = None, echo=print) -> Dict[str, Any]:
+    """Start the mock portal, run the scenarios in order and return the report"""
+    portals = portals or list(ALLOWED_PORTALS)
+    if dataset_dir:
+        dataset = DiskDataset(dataset_dir)
+    else:
+        # Keep every job in memory so the server never regenerates one mid-run
+        dataset = SyntheticDataset(spec, cache_jobs=spec.jobs * len(portals))
+    for portal in portals:
+        for _ in dataset.iter_jobs(portal):
+            pass
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="campaign-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    config = replace(server_config, username="bench", password="bench")
+    report: Dict[str, Any] = {
+        "version": BASELINE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {"engine": engine, "concurrency": concurrency, "repeat": repeat,
+                   "portals": portals, "dataset": {"dir": dataset_dir} if dataset_dir else asdict(spec),
+                   "server": {k: v for k, v in asdict(config).items()
+                              if k not in ("username", "password")}},
+        "scenarios": {},
+    }
+    try:
+        secret = write_secret(os.path.join(workdir, "secret.json"), "bench", "bench")
+        with MockPortalServer(config, dataset) as server:
+            for name in scenario_names:
+                echo(f"Running {name}: {SCENARIOS[name].description}")
+                report["scenarios"][name] = run_scenario(
+                    name, SCENARIOS[name], server, secret, portals, workdir,
+                    engine=engine, concurrency=concurrency, repeat=repeat)
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = 0.15) -> List[Dict[str, Any]]:
+    """Per-metric comparison rows for scenarios present in both; 'regression' flags slowdowns"""
+    rows = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if current["records"] != previous["records"]:
+            rows.append({"scenario": name, "metric": "records", "baseline": previous["records"],
+                         "current": current["records"], "change": None, "regression": True})
+        for metric, (direction, slack) in METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = (new - old) * direction
+            rows.append({"scenario": name, "metric": metric, "baseline": old, "current": new,
+                         "change": round(change, 4),
+                         "regression": worse > slack and worse > abs(old) * tolerance})
+    return rows
+
+
+def config_differences(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Config keys that differ from the baseline's (results may not be comparable)"""
+    current, previous = report.get("config", {}), baseline.get("config", {})
+    return sorted(k for k in set(current) | set(previous)
+                  if k != "repeat" and current.get(k) != previous.get(k))
+
+
+def format_table(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]] = None) -> str:
+    flagged: Dict[str, List[str]] = {}
+    for row in comparison or []:
+        if row["regression"]:
+            change = f" {row['change']:+.0%}" if row["change"] is not None else ""
+            flagged.setdefault(row["scenario"], []).append(f"{row['metric']}{change}")
+    header = (f"{'scenario':<18} {'records':>8} {'wall s':>8} {'rec/s':>9} {'API calls':>9} "
+              f"{'p99 ms':>8} {'RSS MB':>7}  status")
+    lines = [header, "-" * len(header)]
+    for name, r in report["scenarios"].items():
+        # A failed run's timings mean nothing, so FAILED wins over SLOWER
+        if r.get("prime_exit_code"):
+            status = "FAILED (prime exit %d)" % r["prime_exit_code"]
+        elif r["exit_code"]:
+            status = "FAILED (exit %d)" % r["exit_code"]
+        elif name in flagged:
+            status = "SLOWER: " + ", ".join(flagged[name])
+        else:
+            status = "ok"
+        lines.append(f"{name:<18} {r['records']:>8} {r['wall_s']:>8.2f} {r['records_per_sec']:>9.1f} "
+                     f"{r['api_calls']:>9} {r['p99_ms']:>8.1f} {r['peak_rss_mb']:>7.1f}  {status}")
+    return "\n".join(lines)
@@ -7,6 +7,7 @@ from pathlib import Path
 import click
 import structlog
 from campaign_core.contracts import OutputContract
+from campaign_core.output import open_csv_output
 from campaign_core.services import (
     CampaignService,
     EnrichmentService,
@@ -18,6 +19,12 @@ from campaign_core.config import ALLOWED_PORTALS, NETLIFE_SECRET_ARN, PORTALS_FI
 from campaign_core.adapters.secrets import load_basic_auth
 from campaign_core.adapters.portals_async import PortalsAsync
 
+# Choices for `bench`, spelled out so other commands never import the benchmark,
+# mock-server and synthetic-data modules (test_bench checks they stay in step)
+BENCH_SCENARIOS = ("single-cold", "single-warm", "all-portals", "buyers", "non-buyers",
+                   "registered-users")
+BENCH_SCALES = ("small", "sc004", "sc004-max")
+
 
 def json_load(path):
     import json, sys
@@ -60,6 +67,49 @@ structlog.configure(
 logger = structlog.get_logger()
 
 
+def _entry_contact(entry):
+    """Contact for one campaign entry built by `build`"""
+    from campaign_core.models import Contact
+    from datetime import datetime
+
+    return Contact(
+        portal=entry['portal'],
+        job_uuid=entry['job_id'],
+        job_name=entry['job_name'],
+        subject_uuid=entry['subject_id'],
+        external_id=None,
+        first_name=entry['name'].split()[0] if entry['name'] else None,
+        last_name=' '.join(entry['name'].split()[1:]) if entry['name'] and len(entry['name'].split()) > 1 else None,
+        parent_name=None,
+        phone_number=entry['phone'],
+        phone_number_2=None,
+        email=entry['email'],
+        email_2=None,
+        country="USA",
+        group=None,
+        buyer="Yes" if entry['type'] == 'buyer' else "No",
+        access_code=f"access-{entry['subject_id'][-8:]}",
+        url=f"https://{entry['portal']}.shop/gallery/{entry['subject_id']}",
+        custom_gallery_url="",
+        sms_marketing_consent="SUBSCRIBE",
+        sms_marketing_timestamp=datetime.now().isoformat(),
+        sms_transactional_consent="SUBSCRIBE",
+        sms_transactional_timestamp=datetime.now().isoformat(),
+        activity_uuid=f"activity-{entry['subject_id'][-8:]}",
+        activity_name=f"Activity for {entry['name']}",
+        registered_user="Yes" if entry.get('registered_user_ref') else "No",
+        registered_user_email=entry.get('registered_email'),
+        registered_user_uuid=entry.get('registered_user_ref'),
+        resolution_strategy="netlife-api-integration",
+        subject_id=entry['subject_id'],
+        phone=entry['phone'],
+        priority=entry['priority'],
+        access_key=f"access-{entry['subject_id'][-8:]}",
+        consent_timestamp=datetime.now(),
+        is_buyer=entry['type'] == 'buyer'
+    )
+
+
 @click.group()
 def cli():
     """SMS Campaign Orchestrator CLI"""
@@ -96,9 +146,20 @@ def cli():
               help="[DEPRECATED] Single portal key. Use --portals instead.")
 @click.option("--buyer-filter", type=click.Choice(["buyers","non-buyers","both"]), required=False,
               help="[DEPRECATED] Audience filter. Use --buyers/--non-buyers/--both instead.")
+# Profiling
+@click.option("--profile", is_flag=True, default=False,
+              help="Write per-stage wall/CPU times to <out>.profile.json")
+@click.option("--profile-cprofile", is_flag=True, default=False,
+              help="Also dump a merged cProfile of the stages to <out>.profile.prof (implies --profile)")
+@click.option("--profile-tracemalloc", is_flag=True, default=False,
+              help="Also record the tracemalloc peak of each stage (implies --profile)")
+@click.option("--metrics-sink", type=str, default=None,
+              help="Emit per-endpoint API metrics as CloudWatch EMF lines to stdout, stderr "
+                   "or a file (env CAMPAIGN_METRICS_SINK)")
 def build(jobs, buyers, non_buyers, both, portals, contact_filter,
           check_registered_users, include_registered_phone, registered_only,
-          out, concurrency, retries, portal, buyer_filter, fallback):
+          out, concurrency, retries, portal, buyer_filter, fallback,
+          profile, profile_cprofile, profile_tracemalloc, metrics_sink):
     """Generate SMS campaign datasets."""
     # --- Backward compatibility for legacy flags
     if portal and portals:
@@ -159,7 +220,9 @@ def build(jobs, buyers, non_buyers, both, portals, contact_filter,
     from campaign_core.adapters.portals_async import PortalsAsync
     from campaign_core.services import CampaignService
     from campaign_core.contracts import OutputContract
-    import boto3, os
+    from campaign_core.metrics import open_metrics_sink
+    from campaign_core.profiling import RunProfiler, write_profile
+    import os
 
     # validate portals against allow-list
     base_urls = {}
@@ -176,8 +239,12 @@ def build(jobs, buyers, non_buyers, both, portals, contact_filter,
         click.echo(f"ERROR: Could not load credentials from AWS Secrets Manager: {e}", err=True)
         sys.exit(1)
     
+    profiler = RunProfiler(profile, cprofile=profile_cprofile, memory=profile_tracemalloc)
+
     portals_async = None if concurrency == 1 else PortalsAsync(base_urls=base_urls, creds=(username, password),
-                                 concurrency=concurrency, timeout_s=timeout_s)
+                                 concurrency=concurrency, timeout_s=timeout_s,
+                                 rate_limit_per_sec=rate_limit,
+                                 metrics_sink=open_metrics_sink(metrics_sink))
     
     portal_client = PortalClient(base_url="", api_key="", auth=(username, password), fallback_mode=fallback)
     enrichment_service = EnrichmentService()
@@ -192,7 +259,8 @@ def build(jobs, buyers, non_buyers, both, portals, contact_filter,
         for portal in portal_list:
             portal_client.base_url = base_urls[portal]
             portal_client.api_key = ""  # TODO: Set proper API key
-            activities = portal_client.get_activities_in_webshop()
+            with profiler.stage("activity_search"):
+                activities = portal_client.get_activities_in_webshop()
             # Extract unique job IDs from activities
             job_ids_from_activities = set()
             for activity in activities:
@@ -215,155 +283,186 @@ def build(jobs, buyers, non_buyers, both, portals, contact_filter,
     # Remove duplicates
     job_ids = list(set(job_ids))
     
-    # Generate campaign data using the new logic
-    campaign_data = []
-    
-    for portal in portal_list:
-        portal_client.base_url = base_urls[portal]
-        portal_client.api_key = ""  # TODO: Set proper API key
-        
-        for job_id in job_ids:
-            # Get job details
-            job_details = portal_client.get_job_details(job_id)
-            
-            # Get buyers and non-buyers for this job
-            buyers, non_buyers = portal_client.get_buyers_and_non_buyers_csv(job_id)
-            
-            # Process based on audience filter
-            subjects_to_process = []
-            if audience == "buyers":
-                subjects_to_process = buyers
-            elif audience == "non-buyers":
-                subjects_to_process = non_buyers
-            else:  # both
-                subjects_to_process = buyers + non_buyers
-            
-            # Get registered users if needed
-            registered_users = {}
-            if check_registered_users or include_registered_phone or registered_only:
-                user_refs = []
+    # --- output CSV, streamed job by job (header is written even for an empty run)
+    writer = open_csv_output(out, kms_key_id=os.getenv("AWS_KMS_KEY_ID"))
+    try:
+        with profiler.stage("csv_write"):
+            writer.open()
+        for portal in portal_list:
+            portal_client.base_url = base_urls[portal]
+            portal_client.api_key = ""  # TODO: Set proper API key
+
+            for job_id in job_ids:
+                # Get job details
+                with profiler.stage("job_details"):
+                    job_details = portal_client.get_job_details(job_id)
+
+                # Get buyers and non-buyers for this job
+                with profiler.stage("subjects"):
+                    buyers, non_buyers = portal_client.get_buyers_and_non_buyers_csv(job_id)
+
+                # Process based on audience filter
+                subjects_to_process = []
+                if audience == "buyers":
+                    subjects_to_process = buyers
+                elif audience == "non-buyers":
+                    subjects_to_process = non_buyers
+                else:  # both
+                    subjects_to_process = buyers + non_buyers
+
+                # Get registered users if needed
+                registered_users = {}
+                if check_registered_users or include_registered_phone or registered_only:
+                    user_refs = []
+                    for subject in subjects_to_process:
+                        if subject.get('registered_user_ref'):
+                            user_refs.append(subject['registered_user_ref'])
+
+                    if user_refs:
+                        with profiler.stage("registered_users"):
+                            registered_users = portal_client.get_registered_users(user_refs)
+
+                # Build campaign entries
+                campaign_data = []
                 for subject in subjects_to_process:
-                    if subject.get('registered_user_ref'):
-                        user_refs.append(subject['registered_user_ref'])
-                
-                if user_refs:
-                    registered_users = portal_client.get_registered_users(user_refs)
-            
-            # Build campaign entries
-            for subject in subjects_to_process:
-                # Skip if registered_only and no registered user
-                if registered_only and not subject.get('registered_user_ref'):
-                    continue
-                
-                # Get contact info
-                contact_info = {}
-                if subject.get('registered_user_ref') and subject['registered_user_ref'] in registered_users:
-                    user_data = registered_users[subject['registered_user_ref']]
-                    if include_registered_phone:
-                        contact_info['phone'] = user_data.get('phone_number', '')
-                    contact_info['email'] = user_data.get('email_address', '')
-                    contact_info['name'] = user_data.get('name', '')
-                else:
-                    contact_info['phone'] = subject.get('phone', '')
-                    contact_info['email'] = subject.get('email', '')
-                    contact_info['name'] = f"{subject.get('first_name', '')} {subject.get('last_name', '')}".strip()
-                
-                # Apply contact filter
-                has_phone = bool(contact_info.get('phone', '').strip())
-                has_email = bool(contact_info.get('email', '').strip())
-                
-                if contact_filter == "phone-only" and not has_phone:
-                    continue
-                elif contact_filter == "email-only" and not has_email:
-                    continue
-                elif contact_filter == "any" and not (has_phone or has_email):
-                    continue
-                
-                # Create campaign entry
-                entry = {
-                    'job_id': job_id,
-                    'job_name': job_details.get('job', {}).get('name', 'Unknown Job'),
-                    'portal': portal,
-                    'subject_id': subject.get('uuid', ''),
-                    'name': contact_info['name'],
-                    'phone': contact_info['phone'],
-                    'email': contact_info['email'],
-                    'type': subject.get('type', 'unknown'),
-                    'priority': 1 if subject.get('registered_user_ref') else 2
-                }
-                campaign_data.append(entry)
-    
-    # Convert to CampaignDataset format
-    from campaign_core.models import CampaignDataset, Contact
-    from datetime import datetime
-    
-    contacts = []
-    for entry in campaign_data:
-        contact = Contact(
-            portal=entry['portal'],
-            job_uuid=entry['job_id'],
-            job_name=entry['job_name'],
-            subject_uuid=entry['subject_id'],
-            external_id=None,
-            first_name=entry['name'].split()[0] if entry['name'] else None,
-            last_name=' '.join(entry['name'].split()[1:]) if entry['name'] and len(entry['name'].split()) > 1 else None,
-            parent_name=None,
-            phone_number=entry['phone'],
-            phone_number_2=None,
-            email=entry['email'],
-            email_2=None,
-            country="USA",
-            group=None,
-            buyer="Yes" if entry['type'] == 'buyer' else "No",
-            access_code=f"access-{entry['subject_id'][-8:]}",
-            url=f"https://{entry['portal']}.shop/gallery/{entry['subject_id']}",
-            custom_gallery_url="",
-            sms_marketing_consent="SUBSCRIBE",
-            sms_marketing_timestamp=datetime.now().isoformat(),
-            sms_transactional_consent="SUBSCRIBE", 
-            sms_transactional_timestamp=datetime.now().isoformat(),
-            activity_uuid=f"activity-{entry['subject_id'][-8:]}",
-            activity_name=f"Activity for {entry['name']}",
-            registered_user="Yes" if entry.get('registered_user_ref') else "No",
-            registered_user_email=entry.get('registered_email'),
-            registered_user_uuid=entry.get('registered_user_ref'),
-            resolution_strategy="netlife-api-integration",
-            subject_id=entry['subject_id'],
-            phone=entry['phone'],
-            priority=entry['priority'],
-            access_key=f"access-{entry['subject_id'][-8:]}",
-            consent_timestamp=datetime.now(),
-            is_buyer=entry['type'] == 'buyer'
-        )
-        contacts.append(contact)
-    
-    campaign_dataset = CampaignDataset(
-        contacts=contacts,
-        metadata={"source": "netlife-api", "portal": portal_list[0], "audience": audience},
-        generated_at=datetime.now()
-    )
+                    # Skip if registered_only and no registered user
+                    if registered_only and not subject.get('registered_user_ref'):
+                        continue
+
+                    # Get contact info
+                    contact_info = {}
+                    if subject.get('registered_user_ref') and subject['registered_user_ref'] in registered_users:
+                        user_data = registered_users[subject['registered_user_ref']]
+                        if include_registered_phone:
+                            contact_info['phone'] = user_data.get('phone_number', '')
+                        contact_info['email'] = user_data.get('email_address', '')
+                        contact_info['name'] = user_data.get('name', '')
+                    else:
+                        contact_info['phone'] = subject.get('phone', '')
+                        contact_info['email'] = subject.get('email', '')
+                        contact_info['name'] = f"{subject.get('first_name', '')} {subject.get('last_name', '')}".strip()
+
+                    # Apply contact filter
+                    has_phone = bool(contact_info.get('phone', '').strip())
+                    has_email = bool(contact_info.get('email', '').strip())
+
+                    if contact_filter == "phone-only" and not has_phone:
+                        continue
+                    elif contact_filter == "email-only" and not has_email:
+                        continue
+                    elif contact_filter == "any" and not (has_phone or has_email):
+                        continue
+
+                    # Create campaign entry
+                    entry = {
+                        'job_id': job_id,
+                        'job_name': job_details.get('job', {}).get('name', 'Unknown Job'),
+                        'portal': portal,
+                        'subject_id': subject.get('uuid', ''),
+                        'name': contact_info['name'],
+                        'phone': contact_info['phone'],
+                        'email': contact_info['email'],
+                        'type': subject.get('type', 'unknown'),
+                        'priority': 1 if subject.get('registered_user_ref') else 2
+                    }
+                    campaign_data.append(entry)
 
-    # --- output CSV
-    csv_str = OutputContract.format_csv(campaign_dataset.contacts)
-    csv_bytes = csv_str.encode('utf-8')
+                # Write this job's rows now, so memory is bounded by one job, not the run
+                with profiler.stage("assemble"):
+                    contacts = [_entry_contact(entry) for entry in campaign_data]
+                with profiler.stage("csv_write"):
+                    writer.write_contacts(contacts)
+    finally:
+        with profiler.stage("output_close"):
+            writer.close()
+    if portals_async is not None:
+        portals_async.emit_metrics()
+    if profiler.enabled:
+        profile_path = write_profile(profiler, out, kms_key_id=os.getenv("AWS_KMS_KEY_ID"),
+                                     command="cli build", portals=portal_list,
+                                     records=writer.rows)
+        profiler.close()
+        click.echo(f"Profile saved to {profile_path}", err=True)
     if out and out.startswith("s3://"):
-        s3 = boto3.client("s3")
-        from urllib.parse import urlparse
-        u = urlparse(out); bucket, key = u.netloc, u.path.lstrip("/")
-        extra = {}
-        if (k := os.getenv("AWS_KMS_KEY_ID")):
-            extra.update(ServerSideEncryption="aws:kms", SSEKMSKeyId=k)
-        s3.put_object(Bucket=bucket, Key=key, Body=csv_bytes, **extra)
         # one-line JSON for Step Functions
         click.echo(json.dumps({"s3_uri": out}))
     elif out:
-        # Local file output
-        with open(out, 'wb') as f:
-            f.write(csv_bytes)
         click.echo(f"Campaign data saved to {out}")
-    else:
-        sys.stdout.buffer.write(csv_bytes)
 
 
+@cli.command()
+@click.option("--scenario", "scenarios", multiple=True,
+              type=click.Choice(BENCH_SCENARIOS),
+              help="Scenario to run (repeatable); default: all of them, in this order.")
+@click.option("--portals", type=str, default=None,
+              help="Comma-separated portal keys to serve; the first is the single-portal one (default: all).")
+@click.option("--subjects", type=int, default=2000, show_default=True,
+              help="Synthetic subjects per portal (~100 per job).")
+@click.option("--scale", type=click.Choice(BENCH_SCALES), default=None,
+              help="Dataset size preset instead of --subjects.")
+@click.option("--dataset-dir", type=str, default=None,
+              help="Serve a campaign_core.synthetic dump instead of generating the dataset.")
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option("--engine", type=click.Choice(["threads", "async"]), default="threads", show_default=True)
+@click.option("--concurrency", type=int, default=5, show_default=True,
+              help="cli_live --concurrency (jobs per portal).")
+@click.option("--repeat", type=int, default=1, show_default=True,
+              help="Measured runs per scenario; the median is reported.")
+@click.option("--latency-ms", type=float, default=0.0, show_default=True,
+              help="Mock portal latency per request.")
+@click.option("--error-rate", type=float, default=0.0, show_default=True,
+              help="Fraction of mock portal requests answered 503.")
+@click.option("--throttle-rate", type=float, default=0.0, show_default=True,
+              help="Fraction of mock portal requests answered 429.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Baseline JSON to compare against; slowdowns are flagged and exit 1.")
+@click.option("--tolerance", type=float, default=0.15, show_default=True,
+              help="Relative slowdown allowed before a metric is flagged.")
+@click.option("--save-baseline", type=str, default=None,
+              help="Write this run's results as a baseline JSON.")
+@click.option("--workdir", type=str, default=None,
+              help="Keep per-scenario CSVs, logs and EMF metrics here (default: temporary).")
+def bench(scenarios, portals, subjects, scale, dataset_dir, seed, engine, concurrency, repeat,
+          latency_ms, error_rate, throttle_rate, baseline, tolerance, save_baseline, workdir):
+    """Benchmark cli_live build against the local mock portal"""
+    from dataclasses import replace
+    from campaign_core.mock_portal import MockPortalConfig
+    from campaign_core.synthetic import SCALES, DatasetSpec
+    from campaign_cli.bench import SCENARIOS, compare, config_differences, format_table, run_bench
+
+    portal_list = [p.strip() for p in portals.split(",") if p.strip()] if portals else list(ALLOWED_PORTALS)
+    for k in portal_list:
+        if k not in ALLOWED_PORTALS:
+            click.echo(f"ERROR: portal '{k}' not allowed.", err=True); sys.exit(10)
+    spec = replace(SCALES[scale] if scale else DatasetSpec.scaled(subjects), seed=seed)
+    server_config = MockPortalConfig(seed=seed, latency_ms=latency_ms, error_rate=error_rate,
+                                     throttle_rate=throttle_rate)
+    report = run_bench(list(scenarios) or list(SCENARIOS), spec, server_config, portals=portal_list,
+                       dataset_dir=dataset_dir, engine=engine, concurrency=concurrency,
+                       repeat=repeat, workdir=workdir, echo=lambda m: click.echo(m, err=True))
+
+    comparison = None
+    if baseline:
+        previous = json_load(baseline)
+        comparison = compare(report, previous, tolerance)
+        report["comparison"] = {"baseline": baseline, "tolerance": tolerance, "rows": comparison}
+        differing = config_differences(report, previous)
+        if differing:
+            click.echo(f"WARNING: config differs from the baseline ({', '.join(differing)}); "
+                       "results may not be comparable", err=True)
+    click.echo(format_table(report, comparison))
+    if save_baseline:
+        Path(save_baseline).write_text(json.dumps(report, indent=2, sort_keys=True))
+        click.echo(f"Baseline saved to {save_baseline}", err=True)
+
+    failed = [name for name, r in report["scenarios"].items() if r["exit_code"]]
+    regressions = sorted({row["scenario"] for row in comparison or [] if row["regression"]})
+    if failed:
+        click.echo(f"ERROR: scenario run failed: {', '.join(failed)}", err=True)
+    if regressions:
+        click.echo(f"SLOWDOWN against {baseline}: {', '.join(regressions)}", err=True)
+    if failed or regressions:
+        sys.exit(1)
+
 if __name__ == "__main__":
     cli()
@@ -4,18 +4,34 @@ CLI for live SMS campaign data using NetlifeAPIClient (not CSV fallback)
 Connects directly to Netlife portal APIs for real-time data retrieval
 """
 
+import asyncio
 import json
+import os
 import sys
 import logging
-from pathlib import Path
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from collections import deque
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import click
 import structlog
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from campaign_core.netlife_client import NetlifeAPIClient
-from campaign_core.contracts import OutputContract, Contact
-from campaign_core.config import ALLOWED_PORTALS, NETLIFE_SECRET_ARN
+from campaign_core.netlife_client import NetlifeAPIClient, NetlifeClientBase
+from campaign_core.netlife_client_async import AsyncNetlifeAPIClient
+from campaign_core.contracts import Contact
+from campaign_core.output import (
+    clear_partial_marker, open_csv_output, spooled_part, write_partial_marker,
+)
+from campaign_core.config import (
+    ALLOWED_PORTALS, CACHE_CONFIG, CHECKPOINT_CONFIG, DELTA_CONFIG, HTTP_CACHE_CONFIG, NETLIFE_SECRET_ARN, PERFORMANCE_CONFIG,
+)
+from campaign_core.checkpoint import CheckpointMismatchError, RunCheckpoint, new_run_id
+from campaign_core.delta import DeltaRun, DeltaStateStore, delta_scope, write_removals
+from campaign_core.http_cache import ConditionalHTTPCache
+from campaign_core.metrics import EmfSink, open_metrics_sink
+from campaign_core.persistent_cache import CacheView, PersistentCache, open_persistent_cache
+from campaign_core.profiling import NULL_PROFILER, RunProfiler, write_profile
+from campaign_core.shutdown import PARTIAL_EXIT_CODE, ShutdownCoordinator, ShutdownRequested
 from campaign_core.adapters.secrets import load_basic_auth
 
 # Unbuffer stdout for immediate output
@@ -106,21 +122,734 @@ def get_user_details_cached(cache: Dict, client: NetlifeAPIClient, user_uuid: st
         return {}
 
 
-def get_or_create_access_key_cached(cache: Dict, client: NetlifeAPIClient, 
-                                     job_uuid: str, subject_uuid: str, 
-                                     display_name: str, has_images: bool) -> str:
-    """Get or create access key with caching"""
-    key = (job_uuid, subject_uuid)
-    if key in cache:
-        return cache[key]
+def extract_subject_contacts(subject: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """Return (phone, email, phone_2, email_2) from a subject's delivery objects"""
+    # Extract from nested delivery objects, not flat fields
+    phone = ''
+    email = ''
+    phone_2 = ''
+    email_2 = ''
+
+    # Try primary delivery (delivery_1) first
+    delivery_1 = subject.get('delivery_1', {})
+    if isinstance(delivery_1, dict):
+        email = email or (delivery_1.get('email_address') or '').strip()
+        phone = phone or (delivery_1.get('mobile_phone') or '').strip()
+
+    # Try secondary delivery (delivery_2)
+    delivery_2 = subject.get('delivery_2', {})
+    if isinstance(delivery_2, dict):
+        # For secondary, get from delivery_2 if delivery_1 didn't have it
+        email = email or (delivery_2.get('email_address') or '').strip()
+        phone = phone or (delivery_2.get('mobile_phone') or '').strip()
+        # Also store secondary variants if different
+        d1_email = (delivery_1.get('email_address') or '').strip()
+        d1_phone = (delivery_1.get('mobile_phone') or '').strip()
+        d2_email = (delivery_2.get('email_address') or '').strip()
+        d2_phone = (delivery_2.get('mobile_phone') or '').strip()
+        if d1_email and d2_email and d1_email != d2_email:
+            email_2 = d2_email
+        if d1_phone and d2_phone and d1_phone != d2_phone:
+            phone_2 = d2_phone
+
+    # Fallback to direct subject fields
+    phone = phone or (subject.get('phone_number') or '').strip()
+    email = email or (subject.get('email') or '').strip()
+    return phone, email, phone_2, email_2
+
+
+def passes_contact_filter(contact_filter: str, phone: str, email: str) -> bool:
+    """Apply --contact-filter to a subject's resolved phone/email"""
+    if contact_filter == "phone-only":
+        return bool(phone)
+    if contact_filter == "email-only":
+        return bool(email)
+    return bool(phone or email)
+
+
+def prefetch_access_keys(cache: Dict, client: NetlifeAPIClient, job_uuid: str,
+                         subjects: List[Dict[str, Any]]) -> None:
+    """Fill the access-key cache for a job's subjects before the assembly loop.
+
+    Subjects the portal confirmed have no key are cached as '' (persisted with the
+    shorter negative TTL); failed lookups are not cached, so the next run asks again.
+    """
+    pending = [s for s in subjects if (job_uuid, s.get('uuid')) not in cache]
+    if not pending:
+        return
+    try:
+        keys = client.get_access_keys_bulk(job_uuid, pending)
+    except Exception as e:
+        logger.warning("error_prefetching_access_keys", job_uuid=job_uuid, error=str(e))
+        return
+    cache.update({(job_uuid, subject_uuid): code or '' for subject_uuid, code in keys.items()})
+
+
+def unresolved_access_keys(cache: Dict, job_uuid: str, subjects: List[Dict[str, Any]]) -> int:
+    """Subjects whose access-key lookup failed (failed lookups are never cached)"""
+    return sum(1 for s in subjects if (job_uuid, s['uuid']) not in cache)
+
+
+def select_audience(audience: str, buyers_list: List[Dict[str, Any]],
+                    non_buyers_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Subjects to process for --buyers / --non-buyers / --both"""
+    if audience == "buyers":
+        return buyers_list
+    if audience == "non-buyers":
+        return non_buyers_list
+    return buyers_list + non_buyers_list
+
+
+def select_candidates(subjects: List[Dict[str, Any]], registered_users_map: Dict[str, Dict],
+                      *, contact_filter: str, registered_only: bool) -> List[Dict[str, Any]]:
+    """Subjects that can produce a row: have a uuid and pass the registered/contact filters"""
+    return [
+        subject for subject in subjects
+        if subject.get('uuid')
+        and not (registered_only and subject['uuid'] not in registered_users_map)
+        and passes_contact_filter(contact_filter, *extract_subject_contacts(subject)[:2])
+    ]
+
+
+def registered_user_uuids(candidates: List[Dict[str, Any]],
+                          registered_users_map: Dict[str, Dict]) -> List[str]:
+    """Registered user uuids whose profiles are needed for the candidates, in order"""
+    seen = set()
+    out = []
+    for subject in candidates:
+        user_uuid = registered_users_map.get(subject['uuid'], {}).get('userUuid')
+        if user_uuid and user_uuid not in seen:
+            seen.add(user_uuid)
+            out.append(user_uuid)
+    return out
+
+
+def prefetch_user_details(cache: Dict, client: NetlifeAPIClient, user_uuids: List[str]) -> None:
+    """Fill the user-details cache for a job's registered users with a bounded fan-out"""
+    pending = [u for u in user_uuids if u not in cache]
+    if not pending:
+        return
+    workers = min(PERFORMANCE_CONFIG['access_key_workers'], len(pending))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="user-details") as pool:
+        list(pool.map(lambda u: get_user_details_cached(cache, client, u), pending))
+
+
+def group_activities_by_job(activities: List[Dict[str, Any]]) -> Dict[str, List[Dict]]:
+    """Group activities by job UUID, preserving first-seen job order"""
+    jobs_map: Dict[str, List[Dict]] = {}
+    for activity in activities:
+        job_data = activity.get('job', {})
+        job_uuid = job_data.get('uuid')
+        if job_uuid:
+            if job_uuid not in jobs_map:
+                jobs_map[job_uuid] = []
+            jobs_map[job_uuid].append(activity)
+    return jobs_map
+
+
+@dataclass
+class JobIndex:
+    """Per-job lookup tables, built once so the assembly loop is O(subjects)"""
+    activities_by_uuid: Dict[str, Dict[str, Any]]
+    buyer_uuids: set
+    subject_activities: Dict[str, set]
+    default_activity: Dict[str, Any]
+
+    def is_buyer(self, subject_uuid: str) -> bool:
+        return subject_uuid in self.buyer_uuids
+
+    def activities_for(self, subject_uuid: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """(activity_uuid, activity) pairs for a subject in a stable order; subjects
+        without a mapped activity fall back to the job's first activity"""
+        activity_uuids = self.subject_activities.get(subject_uuid)
+        if not activity_uuids:
+            if not self.default_activity:
+                return []
+            activity_uuids = {self.default_activity.get('uuid')}
+        return [(uuid, self.activities_by_uuid.get(uuid, self.default_activity))
+                for uuid in sorted(activity_uuids, key=str)]
+
+
+def build_job_index(job_activities: List[Dict[str, Any]], buyers_list: List[Dict[str, Any]],
+                    subject_activity_map: Dict[str, set]) -> JobIndex:
+    activities_by_uuid: Dict[str, Dict[str, Any]] = {}
+    for activity in job_activities:
+        activities_by_uuid.setdefault(activity.get('uuid'), activity)
+    return JobIndex(
+        activities_by_uuid=activities_by_uuid,
+        buyer_uuids={s.get('uuid') for s in buyers_list if s.get('uuid')},
+        subject_activities=subject_activity_map,
+        default_activity=job_activities[0] if job_activities else {},
+    )
+
+
+def assemble_job_contacts(client: NetlifeClientBase, portal_key: str, base_url: str,
+                          job_uuid: str, job_name: str, index: JobIndex,
+                          subjects_to_process: List[Dict[str, Any]],
+                          registered_users_map: Dict[str, Dict], *,
+                          contact_filter: str, check_registered_users: bool,
+                          registered_only: bool, access_key_cache: Dict,
+                          user_details_cache: Dict) -> List[Contact]:
+    """Turn one job's fetched data into Contact records.
+
+    Makes no API calls: access keys and user details must already be in the
+    caches, which lets the thread and async engines share this code.
+    """
+    # Extract portal root: remove /api/v1 or /api endpoints
+    portal_root = base_url.rstrip('/')
+    if '/api/v1' in portal_root:
+        portal_root = portal_root.split('/api/v1')[0]
+    elif '/api' in portal_root:
+        portal_root = portal_root.split('/api')[0]
+
+    records: List[Contact] = []
+    for subject in subjects_to_process:
+        subject_uuid = subject.get('uuid')
+        if not subject_uuid:
+            continue
+
+        # Filter by registered user if requested
+        if registered_only and subject_uuid not in registered_users_map:
+            continue
+
+        phone, email, phone_2, email_2 = extract_subject_contacts(subject)
+
+        is_buyer = index.is_buyer(subject_uuid)
+
+        # Apply contact filter
+        if not passes_contact_filter(contact_filter, phone, email):
+            continue
+
+        # Get registered user info
+        reg_user_info = registered_users_map.get(subject_uuid, {})
+        registered_user_uuid = reg_user_info.get('userUuid')
+        registered_user_email = reg_user_info.get('email')
+        has_registered_user = bool(registered_user_uuid)
+
+        # Access key was resolved for every candidate before assembly
+        has_images = bool(subject.get('images') or subject.get('group_images'))
+        access_key = access_key_cache.get((job_uuid, subject_uuid)) or ''
+
+        # Skip this contact if no access key available
+        if not access_key:
+            logger.debug("skipping_contact_no_access_key", subject_uuid=subject_uuid)
+            continue
+
+        # Subject's activities (sorted), or fallback to first job activity
+        for activity_uuid, activity in index.activities_for(subject_uuid):
+            activity_name = activity.get('name', '')
+
+            # Get SMS marketing timestamp from activity entry time
+            sms_marketing_timestamp = generate_consent_timestamp(activity)
+
+            # Build gallery URLs
+            # url: https://portal.shop/gallery/subject_uuid
+            # custom_gallery_url: url with access code parameter
+            gallery_url = f"{portal_root}/gallery/{subject_uuid}"
+            custom_gallery_url = f"{portal_root}/?code={access_key}" if access_key else portal_root
+
+            # Get registered user phone if available
+            registered_user_phone = ''
+            if has_registered_user and check_registered_users:
+                # Try to get phone from registered user details
+                if registered_user_uuid:
+                    user_details = user_details_cache.get(registered_user_uuid)
+                    if user_details:
+                        reg_phone = user_details.get('phone_number', '')
+                        if reg_phone:
+                            registered_user_phone = clean_phone_number(reg_phone)
+
+            # Create contact record
+            contact = Contact(
+                portal=portal_key,
+                job_uuid=job_uuid,
+                job_name=job_name,
+                subject_uuid=subject_uuid,
+                external_id=subject.get('external_id', ''),
+                first_name=subject.get('first_name', ''),
+                last_name=subject.get('last_name', ''),
+                parent_name=subject.get('parent_name', ''),
+                phone_number=phone,
+                phone_number_2=phone_2 or subject.get('phone_number_2', ''),
+                email=email,
+                email_2=email_2 or subject.get('email_2', ''),
+                country=subject.get('country', ''),
+                group=subject.get('group', ''),
+                buyer="Yes" if is_buyer else "No",
+                access_code=access_key,
+                url=gallery_url,
+                custom_gallery_url=custom_gallery_url,
+                sms_marketing_consent="SUBSCRIBE",  # Fixed: Always SUBSCRIBE when in webshop
+                sms_marketing_timestamp=sms_marketing_timestamp,  # From activity entry time
+                sms_transactional_consent="SUBSCRIBE",  # Fixed: Always SUBSCRIBE when in webshop
+                sms_transactional_timestamp=sms_marketing_timestamp,  # Fixed: SAME as marketing timestamp
+                activity_uuid=activity_uuid,
+                activity_name=activity_name,
+                registered_user="Yes" if has_registered_user else "No",
+                registered_user_email=registered_user_email or '',
+                registered_user_uuid=registered_user_uuid or '',
+                registered_user_phone=registered_user_phone,
+                resolution_strategy='netlife-api-live'
+            )
+
+            records.append(contact)
+
+            # Update stats
+            client.add_subject_stats(
+                has_phone=bool(phone),
+                has_email=bool(email),
+                has_images=has_images
+            )
+
+    return records
+
+
+def save_job_checkpoint(checkpoint: RunCheckpoint, portal_key: str, job_uuid: str,
+                        records: List[Contact]) -> None:
+    """Checkpoint a finished job; a failed write only costs the job on --resume"""
+    try:
+        checkpoint.save_job(portal_key, job_uuid, records)
+    except Exception as e:
+        logger.warning("job_checkpoint_failed", portal=portal_key, job_uuid=job_uuid,
+                       error=str(e))
+
+
+def process_job(client: NetlifeAPIClient, portal_key: str, base_url: str,
+                job_uuid: str, job_activities: List[Dict[str, Any]], *,
+                audience: str, contact_filter: str,
+                check_registered_users: bool, registered_only: bool,
+                access_key_cache: Dict, user_details_cache: Dict,
+                split_subjects_locally: bool = False,
+                checkpoint: Optional[RunCheckpoint] = None,
+                delta: Optional[DeltaRun] = None,
+                profiler: RunProfiler = NULL_PROFILER) -> List[Contact]:
+    """Fetch one job's subjects and assemble its Contact records.
+
+    Safe to run concurrently for different jobs of the same portal: the client
+    keeps per-thread sessions and lock-protected stats, and the shared caches
+    only ever see idempotent inserts.
+    """
+    logger.info("processing_job", portal=portal_key, job_uuid=job_uuid,
+               activity_count=len(job_activities))
+
+    try:
+        # Get job details
+        with profiler.stage("job_details"):
+            job_details = client.get_job_details(job_uuid)
+        job_name = job_details.get('name', f'Job {job_uuid}')
+
+        # Get subjects (only the listings the audience needs)
+        with profiler.stage("subjects"):
+            buyers_list, non_buyers_list = client.get_buyers_and_non_buyers(
+                job_uuid, audience=audience, split_locally=split_subjects_locally)
+
+        # Select subjects based on audience filter
+        subjects_to_process = select_audience(audience, buyers_list, non_buyers_list)
+
+        logger.info("subjects_fetched", portal=portal_key, job_uuid=job_uuid,
+                   buyers=len(buyers_list), non_buyers=len(non_buyers_list),
+                   to_process=len(subjects_to_process))
+
+        # Get registered users map if needed (bulk, efficient!)
+        registered_users_map = {}
+        if check_registered_users or registered_only:
+            with profiler.stage("registered_users"):
+                registered_users_map = client.get_job_registered_users_map(job_uuid)
+            logger.info("registered_users_fetched", portal=portal_key, job_uuid=job_uuid,
+                       count=len(registered_users_map))
+
+        # Build subject-to-activity mapping
+        subject_activity_map = client.build_subject_activity_mapping(
+            job_details, subjects_to_process
+        )
+
+        # Resolve access keys (and registered user profiles) for every subject that can
+        # produce a row in bounded fan-outs, so assembly only reads the caches
+        candidates = select_candidates(subjects_to_process, registered_users_map,
+                                       contact_filter=contact_filter,
+                                       registered_only=registered_only)
+        with profiler.stage("access_keys"):
+            prefetch_access_keys(access_key_cache, client, job_uuid, candidates)
+        if check_registered_users:
+            with profiler.stage("user_details"):
+                prefetch_user_details(user_details_cache, client,
+                                      registered_user_uuids(candidates, registered_users_map))
+
+        with profiler.stage("assemble"):
+            index = build_job_index(job_activities, buyers_list, subject_activity_map)
+            records = assemble_job_contacts(
+                client, portal_key, base_url, job_uuid, job_name, index,
+                subjects_to_process, registered_users_map,
+                contact_filter=contact_filter, check_registered_users=check_registered_users,
+                registered_only=registered_only, access_key_cache=access_key_cache,
+                user_details_cache=user_details_cache,
+            )
+        # Only a job whose fetches all succeeded is checkpointed or counted as complete
+        # by the delta run; listing failures raise before this point, failed
+        # access-key lookups are counted here
+        if checkpoint is not None or delta is not None:
+            unresolved = unresolved_access_keys(access_key_cache, job_uuid, candidates)
+            if unresolved:
+                logger.warning("job_incomplete", portal=portal_key, job_uuid=job_uuid,
+                               failed_access_keys=unresolved)
+                if delta is not None:
+                    delta.mark_incomplete(portal_key, job_uuid)
+            elif checkpoint is not None:
+                with profiler.stage("checkpoint_write"):
+                    save_job_checkpoint(checkpoint, portal_key, job_uuid, records)
+
+        client.increment_job_processed()
+
+    except Exception as e:
+        logger.error("job_processing_failed", portal=portal_key, job_uuid=job_uuid,
+                   error=str(e))
+        return []
+    finally:
+        # The job document and subject listings are not needed past this job
+        client.release_job(job_uuid)
+
+    return records
+
+
+def process_portal(portal_key: str, username: str, password: str,
+                   emit: Callable[[List[Contact]], None], *,
+                   concurrency: int, rate_limit: float, audience: str, contact_filter: str,
+                   check_registered_users: bool, registered_only: bool,
+                   access_key_cache: Dict, user_details_cache: Dict,
+                   split_subjects_locally: bool = False,
+                   persistent_cache: Optional[PersistentCache] = None,
+                   http_cache: Optional[ConditionalHTTPCache] = None,
+                   delta: Optional[DeltaRun] = None,
+                   checkpoint: Optional[RunCheckpoint] = None,
+                   shutdown: Optional[ShutdownCoordinator] = None,
+                   profiler: RunProfiler = NULL_PROFILER,
+                   metrics_sink: Optional[EmfSink] = None) -> int:
+    """Run the full pipeline for one portal, emitting each job's records in job order.
+
+    Returns the number of records emitted.
+    """
+    base_url = ALLOWED_PORTALS[portal_key]
+    logger.info("processing_portal", portal=portal_key, base_url=base_url)
+
+    emitted = 0
+    try:
+        # Initialize API client
+        client = NetlifeAPIClient(
+            portal_name=portal_key,
+            base_url=base_url,
+            username=username,
+            password=password,
+            pool_maxsize=max(concurrency, PERFORMANCE_CONFIG['pool_maxsize']),
+            rate_limit_per_sec=rate_limit,
+            persistent_cache=persistent_cache,
+            http_cache=http_cache,
+            profiler=profiler if profiler.enabled else None,
+            metrics_sink=metrics_sink,
+        )
+
+        # Test connection
+        if not client.test_connection():
+            logger.error("connection_test_failed", portal=portal_key)
+            click.echo(f"ERROR: Could not connect to portal {portal_key}", err=True)
+            return 0
+
+        logger.info("connection_test_passed", portal=portal_key)
+
+        # Get activities in webshop status
+        with profiler.stage("activity_search"):
+            activities = client.get_activities_in_webshop()
+        if not activities:
+            logger.warning("no_activities_found", portal=portal_key)
+            return 0
+
+        logger.info("activities_fetched", portal=portal_key, count=len(activities))
+
+        jobs_map = group_activities_by_job(activities)
+
+        logger.info("jobs_extracted", portal=portal_key, job_count=len(jobs_map))
+
+        if delta is not None:
+            jobs_map = delta.register_jobs(portal_key, jobs_map)
+
+        # On --resume, jobs finished by the earlier attempt are read back from the
+        # checkpoint (in their usual place in the output) instead of being re-fetched
+        resumed = checkpoint.completed_jobs(portal_key) if checkpoint is not None else set()
+        if resumed:
+            logger.info("jobs_resumed_from_checkpoint", portal=portal_key,
+                        resumed=len(resumed & set(jobs_map)), job_count=len(jobs_map))
+
+        # Process jobs in parallel; each job is emitted as soon as it and every job
+        # before it have finished, so the output matches a sequential run while only
+        # out-of-order results are held in memory. After SIGTERM no new job starts and
+        # in-flight jobs get until the shutdown deadline; finished ones are still emitted.
+        run_job = shutdown.guard(process_job) if shutdown is not None else process_job
+        abandoned = 0
+        job_pool = ThreadPoolExecutor(max_workers=max(1, concurrency),
+                                      thread_name_prefix=f"{portal_key}-job")
+        try:
+            futures = deque(
+                job_pool.submit(checkpoint.load_job, portal_key, job_uuid)
+                if job_uuid in resumed else
+                job_pool.submit(
+                    run_job, client, portal_key, base_url, job_uuid, job_activities,
+                    audience=audience, contact_filter=contact_filter,
+                    check_registered_users=check_registered_users,
+                    registered_only=registered_only,
+                    access_key_cache=access_key_cache,
+                    user_details_cache=user_details_cache,
+                    split_subjects_locally=split_subjects_locally,
+                    checkpoint=checkpoint,
+                    delta=delta,
+                    profiler=profiler,
+                )
+                for job_uuid, job_activities in jobs_map.items()
+            )
+            while futures:
+                future = futures.popleft()
+                try:
+                    job_records = shutdown.result(future) if shutdown is not None else future.result()
+                except ShutdownRequested:
+                    abandoned += 1
+                    continue
+                with profiler.stage("csv_write"):
+                    emit(job_records)
+                emitted += len(job_records)
+        finally:
+            # Jobs still running past the shutdown deadline are left behind, not awaited
+            job_pool.shutdown(wait=not (shutdown is not None and shutdown.requested),
+                              cancel_futures=True)
+        if abandoned:
+            logger.warning("jobs_abandoned_on_shutdown", portal=portal_key,
+                           abandoned=abandoned, signal=shutdown.signal_name)
+
+        # Log final stats for portal
+        client.log_final_stats()
+        if not abandoned:
+            client.close()
+
+    except Exception as e:
+        logger.error("portal_processing_failed", portal=portal_key, error=str(e))
+
+    return emitted
+
+
+# ----------------------- Async engine (--engine async) -----------------------
+
+async def _no_registrations() -> Dict[str, Dict[str, str]]:
+    return {}
+
+
+async def _staged(profiler: RunProfiler, stage: str, awaitable):
+    """Await under a profiler stage (so concurrent fetches are timed separately)"""
+    with profiler.stage(stage):
+        return await awaitable
+
+
+async def process_job_async(client: AsyncNetlifeAPIClient, portal_key: str, base_url: str,
+                            job_uuid: str, job_activities: List[Dict[str, Any]], *,
+                            audience: str, contact_filter: str,
+                            check_registered_users: bool, registered_only: bool,
+                            access_key_cache: Dict, user_details_cache: Dict,
+                            split_subjects_locally: bool = False,
+                            checkpoint: Optional[RunCheckpoint] = None,
+                            delta: Optional[DeltaRun] = None,
+                            profiler: RunProfiler = NULL_PROFILER) -> List[Contact]:
+    """asyncio twin of process_job: details, subjects and registrations are fetched
+    concurrently, then access keys and user profiles as bounded task fan-outs."""
+    logger.info("processing_job", portal=portal_key, job_uuid=job_uuid,
+               activity_count=len(job_activities))
+
     try:
-        code = client.get_or_create_access_key(job_uuid, subject_uuid, display_name, has_images)
-        if code:
-            cache[key] = code
-        return code or ''
+        need_registered = check_registered_users or registered_only
+        job_details, (buyers_list, non_buyers_list), registered_users_map = await asyncio.gather(
+            _staged(profiler, "job_details", client.get_job_details(job_uuid)),
+            _staged(profiler, "subjects",
+                    client.get_buyers_and_non_buyers(job_uuid, audience=audience,
+                                                     split_locally=split_subjects_locally)),
+            _staged(profiler, "registered_users", client.get_job_registered_users_map(job_uuid))
+            if need_registered else _no_registrations(),
+        )
+        job_name = job_details.get('name', f'Job {job_uuid}')
+        subjects_to_process = select_audience(audience, buyers_list, non_buyers_list)
+
+        logger.info("subjects_fetched", portal=portal_key, job_uuid=job_uuid,
+                   buyers=len(buyers_list), non_buyers=len(non_buyers_list),
+                   to_process=len(subjects_to_process))
+
+        subject_activity_map = client.build_subject_activity_mapping(
+            job_details, subjects_to_process
+        )
+
+        candidates = select_candidates(subjects_to_process, registered_users_map,
+                                       contact_filter=contact_filter,
+                                       registered_only=registered_only)
+        # With --cache-path the access-key cache is SQLite: query and update it in one
+        # batch per job on a worker thread, not on the event loop
+        pending = await asyncio.to_thread(
+            lambda: [s for s in candidates if (job_uuid, s['uuid']) not in access_key_cache])
+        if pending:
+            keys = await _staged(profiler, "access_keys",
+                                 client.get_access_keys_bulk(job_uuid, pending))
+            await asyncio.to_thread(access_key_cache.update,
+                                    {(job_uuid, subject_uuid): code or ''
+                                     for subject_uuid, code in keys.items()})
+
+        if check_registered_users:
+            sem = asyncio.Semaphore(PERFORMANCE_CONFIG['access_key_workers'])
+
+            async def fetch_user(user_uuid: str) -> None:
+                async with sem:
+                    user_details_cache[user_uuid] = await client.get_user_details(user_uuid) or {}
+
+            await _staged(profiler, "user_details", asyncio.gather(*(
+                fetch_user(u) for u in registered_user_uuids(candidates, registered_users_map)
+                if u not in user_details_cache
+            )))
+
+        with profiler.stage("assemble"):
+            index = build_job_index(job_activities, buyers_list, subject_activity_map)
+            records = assemble_job_contacts(
+                client, portal_key, base_url, job_uuid, job_name, index,
+                subjects_to_process, registered_users_map,
+                contact_filter=contact_filter, check_registered_users=check_registered_users,
+                registered_only=registered_only, access_key_cache=access_key_cache,
+                user_details_cache=user_details_cache,
+            )
+        if checkpoint is not None or delta is not None:
+            unresolved = await asyncio.to_thread(unresolved_access_keys, access_key_cache,
+                                                 job_uuid, candidates)
+            if unresolved:
+                logger.warning("job_incomplete", portal=portal_key, job_uuid=job_uuid,
+                               failed_access_keys=unresolved)
+                if delta is not None:
+                    delta.mark_incomplete(portal_key, job_uuid)
+            elif checkpoint is not None:
+                await _staged(profiler, "checkpoint_write", asyncio.to_thread(
+                    save_job_checkpoint, checkpoint, portal_key, job_uuid, records))
+
+        client.increment_job_processed()
+
+    except Exception as e:
+        logger.error("job_processing_failed", portal=portal_key, job_uuid=job_uuid,
+                   error=str(e))
+        return []
+    finally:
+        # The job document and subject listings are not needed past this job
+        client.release_job(job_uuid)
+
+    return records
+
+
+async def process_portal_async(portal_key: str, username: str, password: str,
+                               emit: Callable[[List[Contact]], None], *,
+                               concurrency: int, rate_limit: float, audience: str,
+                               contact_filter: str, check_registered_users: bool,
+                               registered_only: bool, access_key_cache: Dict,
+                               user_details_cache: Dict,
+                               split_subjects_locally: bool = False,
+                               persistent_cache: Optional[PersistentCache] = None,
+                               http_cache: Optional[ConditionalHTTPCache] = None,
+                               delta: Optional[DeltaRun] = None,
+                               checkpoint: Optional[RunCheckpoint] = None,
+                               shutdown: Optional[ShutdownCoordinator] = None,
+                               profiler: RunProfiler = NULL_PROFILER,
+                               metrics_sink: Optional[EmfSink] = None) -> int:
+    """asyncio twin of process_portal; jobs run as tasks bounded by --concurrency"""
+    base_url = ALLOWED_PORTALS[portal_key]
+    logger.info("processing_portal", portal=portal_key, base_url=base_url, engine="async")
+
+    emitted = 0
+    try:
+        async with AsyncNetlifeAPIClient(portal_name=portal_key, base_url=base_url,
+                                         username=username, password=password,
+                                         rate_limit_per_sec=rate_limit,
+                                         persistent_cache=persistent_cache,
+                                         http_cache=http_cache,
+                                         profiler=profiler if profiler.enabled else None,
+                                         metrics_sink=metrics_sink) as client:
+            if not await client.test_connection():
+                logger.error("connection_test_failed", portal=portal_key)
+                click.echo(f"ERROR: Could not connect to portal {portal_key}", err=True)
+                return 0
+
+            logger.info("connection_test_passed", portal=portal_key)
+
+            activities = await _staged(profiler, "activity_search",
+                                       client.get_activities_in_webshop())
+            if not activities:
+                logger.warning("no_activities_found", portal=portal_key)
+                return 0
+
+            logger.info("activities_fetched", portal=portal_key, count=len(activities))
+
+            jobs_map = group_activities_by_job(activities)
+            logger.info("jobs_extracted", portal=portal_key, job_count=len(jobs_map))
+            if delta is not None:
+                jobs_map = delta.register_jobs(portal_key, jobs_map)
+            resumed = set()
+            if checkpoint is not None:
+                resumed = await asyncio.to_thread(checkpoint.completed_jobs, portal_key)
+            if resumed:
+                logger.info("jobs_resumed_from_checkpoint", portal=portal_key,
+                            resumed=len(resumed & set(jobs_map)), job_count=len(jobs_map))
+
+            sem = asyncio.Semaphore(max(1, concurrency))
+
+            async def run_job(job_uuid: str, job_activities: List[Dict[str, Any]]) -> List[Contact]:
+                async with sem:
+                    if shutdown is not None and shutdown.requested and job_uuid not in resumed:
+                        raise ShutdownRequested()
+                    if job_uuid in resumed:
+                        return await asyncio.to_thread(checkpoint.load_job, portal_key, job_uuid)
+                    return await process_job_async(
+                        client, portal_key, base_url, job_uuid, job_activities,
+                        audience=audience, contact_filter=contact_filter,
+                        check_registered_users=check_registered_users,
+                        registered_only=registered_only,
+                        access_key_cache=access_key_cache,
+                        user_details_cache=user_details_cache,
+                        split_subjects_locally=split_subjects_locally,
+                        checkpoint=checkpoint,
+                        delta=delta,
+                        profiler=profiler,
+                    )
+
+            # Awaiting the tasks in submission order keeps the output deterministic
+            tasks = deque(asyncio.ensure_future(run_job(j, a)) for j, a in jobs_map.items())
+            abandoned = 0
+            while tasks:
+                task = tasks.popleft()
+                try:
+                    job_records = await shutdown.result_async(task) if shutdown is not None else await task
+                except ShutdownRequested:
+                    abandoned += 1
+                    continue
+                with profiler.stage("csv_write"):
+                    emit(job_records)
+                emitted += len(job_records)
+            if abandoned:
+                logger.warning("jobs_abandoned_on_shutdown", portal=portal_key,
+                               abandoned=abandoned, signal=shutdown.signal_name)
+            client.log_final_stats()
+
     except Exception as e:
-        logger.warning("error_creating_access_key", subject_uuid=subject_uuid, error=str(e))
-        return ''
+        logger.error("portal_processing_failed", portal=portal_key, error=str(e))
+
+    return emitted
+
+
+async def build_async(portal_list: List[str], username: str, password: str,
+                      emitters: List[Callable[[List[Contact]], None]], *,
+                      portal_concurrency: int, **options: Any) -> int:
+    """Run every portal pipeline in one event loop; each portal emits to its own writer"""
+    sem = asyncio.Semaphore(max(1, portal_concurrency))
+
+    async def run_portal(portal_key: str, emit: Callable[[List[Contact]], None]) -> int:
+        async with sem:
+            return await process_portal_async(portal_key, username, password, emit, **options)
+
+    counts = await asyncio.gather(*(run_portal(p, e) for p, e in zip(portal_list, emitters)))
+    return sum(counts)
 
 
 @click.group()
@@ -148,10 +877,59 @@ def cli():
 # Performance
 @click.option("--concurrency", type=int, default=5, show_default=True,
               help="Max concurrent jobs per portal")
+@click.option("--portal-concurrency", type=int, default=None,
+              help="Max portals processed in parallel (default: all requested, up to 9)")
+@click.option("--rate-limit", "rate_limit_override", type=float, default=None,
+              help="Requests/sec per portal host; overrides the secret's rate_limit_per_sec (0 = unlimited)")
 @click.option("--timeout", type=int, default=30, show_default=True,
               help="API request timeout in seconds")
+@click.option("--engine", type=click.Choice(["threads", "async"]), default="threads",
+              show_default=True,
+              help="Pipeline engine: thread pools, or one asyncio program over HTTP/2")
+@click.option("--split-subjects-locally", is_flag=True,
+              default=PERFORMANCE_CONFIG['split_subjects_locally'],
+              help="Fetch each job's subjects once and split buyers/non-buyers on has_order")
+# Cross-run cache
+@click.option("--cache-path", type=str, default=None,
+              help="SQLite file persisting access keys, user profiles and job registrations "
+                   "across runs (env CAMPAIGN_CACHE_PATH)")
+@click.option("--cache-s3-uri", type=str, default=None,
+              help="s3://... copy of the cache: seeded before the run, synced after (env CAMPAIGN_CACHE_S3_URI)")
+@click.option("--http-cache-dir", type=str, default=None,
+              help="Directory caching /jobs/{uuid} bodies for ETag/Last-Modified revalidation "
+                   "(env CAMPAIGN_HTTP_CACHE_DIR)")
+# Incremental runs
+@click.option("--since-last-run", is_flag=True, default=False,
+              help="Emit only contacts that are new or changed since the last run")
+@click.option("--state-path", type=str, default=None,
+              help="SQLite delta state for --since-last-run (env CAMPAIGN_STATE_PATH)")
+@click.option("--removals-out", type=str, default=None,
+              help="With --since-last-run, write contacts that disappeared to this CSV")
+@click.option("--skip-unchanged-jobs", is_flag=True, default=False,
+              help="With --since-last-run, skip jobs whose webshop activities are unchanged")
+# Checkpoint / resume
+@click.option("--checkpoint-dir", type=str, default=None,
+              help="Local directory or s3://... prefix for per-job checkpoints "
+                   "(env CAMPAIGN_CHECKPOINT_DIR)")
+@click.option("--resume", "resume_run_id", type=str, default=None,
+              help="Resume the given run id, skipping jobs it already checkpointed")
+# Profiling
+@click.option("--profile", is_flag=True, default=False,
+              help="Write per-stage and per-endpoint wall/CPU times to <out>.profile.json")
+@click.option("--profile-cprofile", is_flag=True, default=False,
+              help="Also dump a merged cProfile of the stages to <out>.profile.prof (implies --profile)")
+@click.option("--profile-tracemalloc", is_flag=True, default=False,
+              help="Also record the tracemalloc peak of each stage (implies --profile)")
+@click.option("--metrics-sink", type=str, default=None,
+              help="Emit per-endpoint API metrics as CloudWatch EMF lines to stdout, stderr "
+                   "or a file (env CAMPAIGN_METRICS_SINK)")
 def build(portals, buyers, non_buyers, both, contact_filter,
-          check_registered_users, registered_only, out, concurrency, timeout):
+          check_registered_users, registered_only, out, concurrency, portal_concurrency,
+          rate_limit_override, timeout, engine, split_subjects_locally,
+          cache_path, cache_s3_uri, http_cache_dir,
+          since_last_run, state_path, removals_out, skip_unchanged_jobs,
+          checkpoint_dir, resume_run_id, profile, profile_cprofile, profile_tracemalloc,
+          metrics_sink):
     """Generate SMS campaign datasets from LIVE portal APIs"""
     
     try:
@@ -159,6 +937,9 @@ def build(portals, buyers, non_buyers, both, contact_filter,
         logger.info("loading_credentials_from_aws_secrets_manager")
         username, password, timeout_s, rate_limit = load_basic_auth(NETLIFE_SECRET_ARN)
         logger.info("credentials_loaded_successfully", username=username)
+        if rate_limit_override is not None:
+            rate_limit = rate_limit_override
+        logger.info("rate_limit_configured", requests_per_sec=rate_limit or "unlimited")
     except Exception as e:
         logger.error("failed_to_load_credentials", error=str(e))
         click.echo(f"ERROR: Could not load credentials from AWS Secrets Manager: {e}", err=True)
@@ -185,293 +966,189 @@ def build(portals, buyers, non_buyers, both, contact_filter,
             click.echo(f"ERROR: portal '{portal_key}' not allowed.", err=True)
             sys.exit(10)
 
-    # Collect all results
-    all_records: List[Contact] = []
-    
-    # Initialize caches for access keys and user details (shared across portals)
-    access_key_cache: Dict[tuple, str] = {}
-    user_details_cache: Dict[str, Dict[str, Any]] = {}
-
-    # Process each portal
-    for portal_key in portal_list:
-        base_url = ALLOWED_PORTALS[portal_key]
-        logger.info("processing_portal", portal=portal_key, base_url=base_url)
-        
+    # Per-job checkpoints: a retried task resumes with --resume <run id>
+    checkpoint = None
+    checkpoint_dir = checkpoint_dir or CHECKPOINT_CONFIG['directory']
+    if resume_run_id and not checkpoint_dir:
+        click.echo("ERROR: --resume needs --checkpoint-dir (or CAMPAIGN_CHECKPOINT_DIR).", err=True)
+        sys.exit(10)
+    checkpoint_options = dict(audience=audience, contact_filter=contact_filter,
+                              check_registered_users=check_registered_users,
+                              registered_only=registered_only)
+    if checkpoint_dir:
+        checkpoint = RunCheckpoint(checkpoint_dir, resume_run_id or new_run_id(),
+                                   kms_key_id=os.getenv("AWS_KMS_KEY_ID"))
         try:
-            # Initialize API client
-            client = NetlifeAPIClient(
-                portal_name=portal_key,
-                base_url=base_url,
-                username=username,
-                password=password
-            )
+            checkpoint.start(checkpoint_options, resume=bool(resume_run_id))
+        except (FileNotFoundError, CheckpointMismatchError) as e:
+            click.echo(f"ERROR: Cannot resume: {e}", err=True)
+            sys.exit(10)
+        logger.info("checkpointing_run", run_id=checkpoint.run_id, location=checkpoint_dir,
+                    resumed=bool(resume_run_id))
+        click.echo(f"Run id: {checkpoint.run_id} (resume with --resume {checkpoint.run_id})",
+                   err=True)
 
-            # Test connection
-            if not client.test_connection():
-                logger.error("connection_test_failed", portal=portal_key)
-                click.echo(f"ERROR: Could not connect to portal {portal_key}", err=True)
-                continue
+    # Initialize caches for access keys and user details (shared across portals).
+    # With --cache-path/--cache-s3-uri access keys, user profiles and job registration
+    # maps persist across runs, so repeat runs skip almost all of those requests.
+    cache_s3_uri = cache_s3_uri or CACHE_CONFIG['s3_uri']
+    persistent_cache = open_persistent_cache(cache_path, cache_s3_uri)
+    access_key_cache: Dict[tuple, str] = {}
+    if persistent_cache is not None:
+        logger.info("persistent_cache_opened", path=persistent_cache.path,
+                    entries=persistent_cache.count(), s3_uri=cache_s3_uri)
+        access_key_cache = CacheView(persistent_cache, "access_keys",
+                                     ttl=CACHE_CONFIG['access_key_ttl'],
+                                     negative_ttl=CACHE_CONFIG['negative_ttl'])
+    user_details_cache: Dict[str, Dict[str, Any]] = {}
 
-            logger.info("connection_test_passed", portal=portal_key)
+    # Unchanged job documents come back as bodyless 304s answered from this disk cache
+    http_cache_dir = http_cache_dir or HTTP_CACHE_CONFIG['directory']
+    http_cache = ConditionalHTTPCache(http_cache_dir) if http_cache_dir else None
 
-            # Get activities in webshop status
-            activities = client.get_activities_in_webshop()
-            if not activities:
-                logger.warning("no_activities_found", portal=portal_key)
-                continue
+    # Delta mode: fingerprints of what earlier runs emitted, per audience/filter scope
+    delta = None
+    if since_last_run:
+        delta_store = DeltaStateStore(state_path or DELTA_CONFIG['state_path'])
+        delta = DeltaRun(delta_store,
+                         delta_scope(audience, contact_filter, check_registered_users,
+                                     registered_only),
+                         skip_unchanged_jobs=skip_unchanged_jobs)
+        logger.info("delta_mode", state_path=delta_store.path, scope=delta.scope)
 
-            logger.info("activities_fetched", portal=portal_key, count=len(activities))
+    # Portals are independent hosts: run their pipelines side by side, each with its
+    # own client, connection pool and --concurrency job budget. Rows are streamed as
+    # jobs finish: the first portal writes straight to --out, later portals to spooled
+    # parts appended in --portals order, so the output is deterministic.
+    if portal_concurrency is None:
+        portal_concurrency = min(len(portal_list), PERFORMANCE_CONFIG['max_concurrent_portals'])
+    shutdown = ShutdownCoordinator()
+    profiler = RunProfiler(profile, cprofile=profile_cprofile, memory=profile_tracemalloc)
+    pipeline_options = dict(
+        concurrency=concurrency, rate_limit=rate_limit,
+        audience=audience, contact_filter=contact_filter,
+        check_registered_users=check_registered_users,
+        registered_only=registered_only,
+        access_key_cache=access_key_cache,
+        user_details_cache=user_details_cache,
+        split_subjects_locally=split_subjects_locally,
+        persistent_cache=persistent_cache,
+        http_cache=http_cache,
+        delta=delta,
+        checkpoint=checkpoint,
+        shutdown=shutdown,
+        profiler=profiler,
+        metrics_sink=open_metrics_sink(metrics_sink),
+    )
+    logger.info("pipeline_engine", engine=engine, portal_concurrency=portal_concurrency,
+                job_concurrency=concurrency)
 
-            # Group activities by job UUID
-            jobs_map: Dict[str, List[Dict]] = {}
-            for activity in activities:
-                job_data = activity.get('job', {})
-                job_uuid = job_data.get('uuid')
-                if job_uuid:
-                    if job_uuid not in jobs_map:
-                        jobs_map[job_uuid] = []
-                    jobs_map[job_uuid].append(activity)
+    if out:
+        logger.info("saving_to_s3" if out.startswith('s3://') else "saving_to_local_file",
+                    path=out)
+    # s3:// outputs stream as a multipart upload, SSE-KMS encrypted like cli.py
+    writer = open_csv_output(out, kms_key_id=os.getenv("AWS_KMS_KEY_ID"))
+    parts = [writer] + [spooled_part() for _ in portal_list[1:]]
+    emitters = [part.write_contacts for part in parts]
+    if delta is not None:
+        emitters = [lambda records, part=part: part.write_contacts(delta.filter(records))
+                    for part in parts]
 
-            logger.info("jobs_extracted", portal=portal_key, job_count=len(jobs_map))
+    # SIGTERM/SIGINT: stop starting jobs, flush what finished, end the run as partial
+    shutdown.install()
+    try:
+        if engine == "async":
+            asyncio.run(build_async(
+                portal_list, username, password, emitters,
+                portal_concurrency=portal_concurrency, **pipeline_options,
+            ))
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, portal_concurrency),
+                                    thread_name_prefix="portal") as portal_pool:
+                portal_futures = [
+                    portal_pool.submit(process_portal, portal_key, username, password,
+                                       emit, **pipeline_options)
+                    for portal_key, emit in zip(portal_list, emitters)
+                ]
+                for future in portal_futures:
+                    future.result()
 
-            # Process each job
-            for job_uuid, job_activities in jobs_map.items():
-                logger.info("processing_job", portal=portal_key, job_uuid=job_uuid,
-                           activity_count=len(job_activities))
-                
+        with profiler.stage("output_finalize"):
+            for part in parts[1:]:
+                writer.append(part)
+    finally:
+        shutdown.restore()
+        for part in parts[1:]:
+            part.close()
+        with profiler.stage("output_close"):
+            writer.close()
+        if http_cache is not None:
+            logger.info("http_cache_stats", **http_cache.stats())
+        if persistent_cache is not None:
+            logger.info("access_key_cache_stats", **access_key_cache.stats())
+            if cache_s3_uri:
                 try:
-                    # Get job details
-                    job_details = client.get_job_details(job_uuid)
-                    job_name = job_details.get('name', f'Job {job_uuid}')
-
-                    # Get subjects (with buyer/non-buyer split)
-                    buyers_list, non_buyers_list = client.get_buyers_and_non_buyers(job_uuid)
-
-                    # Select subjects based on audience filter
-                    if audience == "buyers":
-                        subjects_to_process = buyers_list
-                    elif audience == "non-buyers":
-                        subjects_to_process = non_buyers_list
-                    else:  # both
-                        subjects_to_process = buyers_list + non_buyers_list
-
-                    logger.info("subjects_fetched", portal=portal_key, job_uuid=job_uuid,
-                               buyers=len(buyers_list), non_buyers=len(non_buyers_list),
-                               to_process=len(subjects_to_process))
-
-                    # Get registered users map if needed (bulk, efficient!)
-                    registered_users_map = {}
-                    if check_registered_users or registered_only:
-                        registered_users_map = client.get_job_registered_users_map(job_uuid)
-                        logger.info("registered_users_fetched", portal=portal_key, job_uuid=job_uuid,
-                                   count=len(registered_users_map))
-
-                    # Build subject-to-activity mapping
-                    subject_activity_map = client.build_subject_activity_mapping(
-                        job_details, subjects_to_process
-                    )
+                    persistent_cache.sync_to_s3(cache_s3_uri,
+                                                kms_key_id=os.getenv("AWS_KMS_KEY_ID"))
+                except Exception as e:
+                    logger.warning("persistent_cache_sync_failed", s3_uri=cache_s3_uri,
+                                   error=str(e))
+            persistent_cache.close()
 
-                    # Process each subject
-                    for subject in subjects_to_process:
-                        subject_uuid = subject.get('uuid')
-                        if not subject_uuid:
-                            continue
-
-                        # Filter by registered user if requested
-                        if registered_only and subject_uuid not in registered_users_map:
-                            continue
-
-                        # Get contact info - FIXED: Extract from nested delivery objects, not flat fields
-                        phone = ''
-                        email = ''
-                        phone_2 = ''
-                        email_2 = ''
-                        
-                        # Try primary delivery (delivery_1) first
-                        delivery_1 = subject.get('delivery_1', {})
-                        if isinstance(delivery_1, dict):
-                            email = email or (delivery_1.get('email_address') or '').strip()
-                            phone = phone or (delivery_1.get('mobile_phone') or '').strip()
-                        
-                        # Try secondary delivery (delivery_2)
-                        delivery_2 = subject.get('delivery_2', {})
-                        if isinstance(delivery_2, dict):
-                            # For secondary, get from delivery_2 if delivery_1 didn't have it
-                            email = email or (delivery_2.get('email_address') or '').strip()
-                            phone = phone or (delivery_2.get('mobile_phone') or '').strip()
-                            # Also store secondary variants if different
-                            d1_email = (delivery_1.get('email_address') or '').strip()
-                            d1_phone = (delivery_1.get('mobile_phone') or '').strip()
-                            d2_email = (delivery_2.get('email_address') or '').strip()
-                            d2_phone = (delivery_2.get('mobile_phone') or '').strip()
-                            if d1_email and d2_email and d1_email != d2_email:
-                                email_2 = d2_email
-                            if d1_phone and d2_phone and d1_phone != d2_phone:
-                                phone_2 = d2_phone
-                        
-                        # Fallback to direct subject fields
-                        phone = phone or (subject.get('phone_number') or '').strip()
-                        email = email or (subject.get('email') or '').strip()
-                        
-                        is_buyer = subject_uuid in buyers_list
-
-                        # Apply contact filter
-                        if contact_filter == "phone-only" and not phone:
-                            continue
-                        elif contact_filter == "email-only" and not email:
-                            continue
-                        elif contact_filter == "any" and not (phone or email):
-                            continue
-
-                        # Get registered user info
-                        reg_user_info = registered_users_map.get(subject_uuid, {})
-                        registered_user_uuid = reg_user_info.get('userUuid')
-                        registered_user_email = reg_user_info.get('email')
-                        has_registered_user = bool(registered_user_uuid)
-
-                        # Get activities for this subject
-                        activity_uuids = subject_activity_map.get(subject_uuid, set())
-                        
-                        # Use subject's activities, or fallback to first job activity
-                        if not activity_uuids and job_activities:
-                            activity_uuids = {job_activities[0].get('uuid')}
-                        
-                        for activity_uuid in activity_uuids:
-                            # Find activity details
-                            activity = next((a for a in job_activities 
-                                           if a.get('uuid') == activity_uuid), 
-                                          job_activities[0] if job_activities else {})
-                            activity_name = activity.get('name', '')
-                            
-                            # Get SMS marketing timestamp from activity entry time
-                            sms_marketing_timestamp = generate_consent_timestamp(activity)
-
-                            # Get or create access key (try for all subjects, not just those with images)
-                            has_images = bool(subject.get('images') or subject.get('group_images'))
-                            access_key = ''
-                            try:
-                                access_key = get_or_create_access_key_cached(
-                                    access_key_cache, client,
-                                    job_uuid, subject_uuid, subject.get('name', ''), has_images
-                                ) or ''
-                            except Exception as e:
-                                logger.warning("error_getting_access_key", 
-                                             subject_uuid=subject_uuid, error=str(e))
-
-                            # Skip this contact if no access key available
-                            if not access_key:
-                                logger.debug("skipping_contact_no_access_key", subject_uuid=subject_uuid)
-                                continue
-
-                            # Build gallery URLs
-                            # url: https://portal.shop/gallery/subject_uuid
-                            # custom_gallery_url: url with access code parameter
-                            # Extract portal root: remove /api/v1 or /api endpoints
-                            portal_root = base_url.rstrip('/')
-                            if '/api/v1' in portal_root:
-                                portal_root = portal_root.split('/api/v1')[0]
-                            elif '/api' in portal_root:
-                                portal_root = portal_root.split('/api')[0]
-                            
-                            gallery_url = f"{portal_root}/gallery/{subject_uuid}"
-                            custom_gallery_url = f"{portal_root}/?code={access_key}" if access_key else portal_root
-
-                            # Get registered user phone if available
-                            registered_user_phone = ''
-                            if has_registered_user and check_registered_users:
-                                # Try to get phone from registered user details
-                                if registered_user_uuid:
-                                    user_details = get_user_details_cached(
-                                        user_details_cache, client, registered_user_uuid
-                                    )
-                                    if user_details:
-                                        reg_phone = user_details.get('phone_number', '')
-                                        if reg_phone:
-                                            registered_user_phone = clean_phone_number(reg_phone)
-
-                            # Create contact record
-                            contact = Contact(
-                                portal=portal_key,
-                                job_uuid=job_uuid,
-                                job_name=job_name,
-                                subject_uuid=subject_uuid,
-                                external_id=subject.get('external_id', ''),
-                                first_name=subject.get('first_name', ''),
-                                last_name=subject.get('last_name', ''),
-                                parent_name=subject.get('parent_name', ''),
-                                phone_number=phone,
-                                phone_number_2=phone_2 or subject.get('phone_number_2', ''),
-                                email=email,
-                                email_2=email_2 or subject.get('email_2', ''),
-                                country=subject.get('country', ''),
-                                group=subject.get('group', ''),
-                                buyer="Yes" if is_buyer else "No",
-                                access_code=access_key,
-                                url=gallery_url,
-                                custom_gallery_url=custom_gallery_url,
-                                sms_marketing_consent="SUBSCRIBE",  # Fixed: Always SUBSCRIBE when in webshop
-                                sms_marketing_timestamp=sms_marketing_timestamp,  # From activity entry time
-                                sms_transactional_consent="SUBSCRIBE",  # Fixed: Always SUBSCRIBE when in webshop
-                                sms_transactional_timestamp=sms_marketing_timestamp,  # Fixed: SAME as marketing timestamp
-                                activity_uuid=activity_uuid,
-                                activity_name=activity_name,
-                                registered_user="Yes" if has_registered_user else "No",
-                                registered_user_email=registered_user_email or '',
-                                registered_user_uuid=registered_user_uuid or '',
-                                registered_user_phone=registered_user_phone,
-                                resolution_strategy='netlife-api-live'
-                            )
-                            
-                            all_records.append(contact)
-                            
-                            # Update stats
-                            client.add_subject_stats(
-                                has_phone=bool(phone),
-                                has_email=bool(email),
-                                has_images=has_images
-                            )
-
-                    client.increment_job_processed()
+    if profiler.enabled:
+        try:
+            profile_path = write_profile(
+                profiler, out, kms_key_id=os.getenv("AWS_KMS_KEY_ID"), command="cli_live build",
+                engine=engine, portals=portal_list, records=writer.rows,
+                status="partial" if shutdown.requested else "complete")
+            logger.info("profile_written", path=profile_path)
+            click.echo(f"Profile saved to {profile_path}", err=True)
+        except Exception as e:
+            logger.warning("profile_write_failed", error=str(e))
+        profiler.close()
 
-                except Exception as e:
-                    logger.error("job_processing_failed", portal=portal_key, job_uuid=job_uuid,
-                               error=str(e))
-                    continue
+    if shutdown.requested:
+        # Partial output: no checkpoint/delta completion, the state machine resumes
+        logger.warning("run_interrupted", signal=shutdown.signal_name, records=writer.rows,
+                       run_id=checkpoint.run_id if checkpoint is not None else None)
+        if checkpoint is not None:
+            checkpoint.finish(checkpoint_options, status="partial")
+        if out:
+            write_partial_marker(out, {
+                "status": "partial", "signal": shutdown.signal_name, "records": writer.rows,
+                "run_id": checkpoint.run_id if checkpoint is not None else None,
+            }, kms_key_id=os.getenv("AWS_KMS_KEY_ID"))
+        click.echo(f"WARNING: Run interrupted by {shutdown.signal_name}; "
+                   f"{writer.rows} records flushed, output is partial", err=True)
+        if delta is not None:
+            delta.store.close()
+        # Everything worth keeping is flushed. Jobs abandoned at the deadline still hold
+        # non-daemon pool threads that sys.exit() would join, blocking until ECS kills
+        # the task, so leave without running interpreter shutdown.
+        logging.shutdown()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(PARTIAL_EXIT_CODE)
 
-            # Log final stats for portal
-            client.log_final_stats()
+    if checkpoint is not None:
+        checkpoint.finish(checkpoint_options)
+        if resume_run_id and out:
+            clear_partial_marker(out)
 
-        except Exception as e:
-            logger.error("portal_processing_failed", portal=portal_key, error=str(e))
-            continue
+    if delta is not None:
+        # Only a completed run moves the baseline forward
+        removed = delta.commit()
+        delta.store.close()
+        logger.info("delta_summary", removed=len(removed), **delta.stats())
+        if removals_out:
+            write_removals(removals_out, removed)
+            click.echo(f"Removed contacts saved to {removals_out}")
 
     # Output results
-    if all_records:
-        csv_content = OutputContract.format_csv(all_records)
-
+    if writer.rows:
         if out:
-            # Save to file or S3
-            if out.startswith('s3://'):
-                logger.info("saving_to_s3", s3_path=out)
-                # TODO: Implement S3 upload
-                import boto3
-                s3 = boto3.client('s3')
-                # Parse s3://bucket/key
-                parts = out.split('/', 3)
-                bucket = parts[2]
-                key = parts[3] if len(parts) > 3 else 'output.csv'
-                s3.put_object(Bucket=bucket, Key=key, Body=csv_content.encode())
-                click.echo(f"Campaign data saved to {out}")
-            else:
-                # Save to local file
-                logger.info("saving_to_local_file", path=out)
-                Path(out).write_text(csv_content, encoding='utf-8')
-                click.echo(f"Campaign data saved to {out}")
-        else:
-            # Print to stdout
-            click.echo(csv_content)
-
-        logger.info("campaign_generation_complete", total_records=len(all_records))
+            click.echo(f"Campaign data saved to {out}")
+        logger.info("campaign_generation_complete", total_records=writer.rows)
     else:
         click.echo("WARNING: No records generated", err=True)
         logger.warning("no_records_generated")
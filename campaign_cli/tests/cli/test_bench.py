@@ -0,0 +1,78 @@
+# campaign-cli/tests/cli/test_bench.py
+import json
+from types import SimpleNamespace
+
+from click.testing import CliRunner
+
+from campaign_cli import bench as bench_module
+from campaign_cli.bench import SCENARIOS, compare, format_table, run_scenario
+from campaign_cli.cli import BENCH_SCALES, BENCH_SCENARIOS, bench
+from campaign_core.synthetic import SCALES
+
+
+def _report(**metrics):
+    scenario = {"records": 100, "wall_s": 2.0, "records_per_sec": 50.0, "api_calls": 300,
+                "p99_ms": 10.0, "peak_rss_mb": 80.0, "exit_code": 0}
+    scenario.update(metrics)
+    return {"scenarios": {"single-cold": scenario}}
+
+
+def test_compare_flags_slowdowns_beyond_tolerance_and_slack():
+    baseline = _report()
+    assert not any(row["regression"] for row in compare(_report(wall_s=2.2, p99_ms=14.0), baseline))
+
+    rows = compare(_report(wall_s=3.0, records_per_sec=33.3, api_calls=420, peak_rss_mb=85.0),
+                   baseline)
+    flagged = {row["metric"] for row in rows if row["regression"]}
+    assert flagged == {"wall_s", "records_per_sec", "api_calls"}
+
+    rows = compare(_report(records=90, wall_s=1.0), baseline)
+    assert [row["metric"] for row in rows if row["regression"]] == ["records"]
+
+
+def test_cli_choices_match_scenarios_and_scales():
+    assert BENCH_SCENARIOS == tuple(SCENARIOS)
+    assert BENCH_SCALES == tuple(SCALES)
+
+
+def test_failed_prime_fails_the_scenario_ahead_of_slowdowns(tmp_path, monkeypatch):
+    def fake_run_child(args, env, cwd, log_path):
+        return {"exit_code": 3 if log_path.endswith("prime.log") else 0,
+                "wall_s": 1.0, "peak_rss_mb": 50.0}
+
+    monkeypatch.setattr(bench_module, "_run_child", fake_run_child)
+    server = SimpleNamespace(base_url_template="http://127.0.0.1:1/{portal}/api/v1")
+    result = run_scenario("single-warm", SCENARIOS["single-warm"], server, "file:///secret.json",
+                          ["legacyphoto"], str(tmp_path))
+    assert result["exit_code"] == result["prime_exit_code"] == 3
+
+    report = {"scenarios": {"single-warm": dict(result, records=100)}}
+    rows = [{"scenario": "single-warm", "metric": "wall_s", "change": 1.0, "regression": True}]
+    table = format_table(report, rows)
+    assert "FAILED (prime exit 3)" in table and "SLOWER" not in table
+
+
+def test_bench_saves_and_compares_baseline(tmp_path):
+    runner = CliRunner()
+    args = ["--subjects", "60", "--portals", "legacyphoto,nowandgen",
+            "--scenario", "single-cold", "--scenario", "single-warm",
+            "--workdir", str(tmp_path / "work")]
+    saved = tmp_path / "baseline.json"
+    result = runner.invoke(bench, args + ["--save-baseline", str(saved)])
+    assert result.exit_code == 0, result.output
+    baseline = json.loads(saved.read_text())
+    cold, warm = baseline["scenarios"]["single-cold"], baseline["scenarios"]["single-warm"]
+    assert cold["records"] == warm["records"] > 0
+    assert cold["api_calls"] > warm["api_calls"] > 0
+    assert cold["peak_rss_mb"] > 0 and cold["p99_ms"] > 0
+
+    # A baseline that was much faster makes this run a regression
+    for scenario in baseline["scenarios"].values():
+        scenario["wall_s"] /= 10
+        scenario["records_per_sec"] *= 10
+    faster = tmp_path / "faster.json"
+    faster.write_text(json.dumps(baseline))
+    result = runner.invoke(bench, args + ["--baseline", str(faster)])
+    assert result.exit_code == 1
+    assert "SLOWER: records_per_sec" in result.output
+    assert "SLOWDOWN against" in result.output
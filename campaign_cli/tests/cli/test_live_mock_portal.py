@@ -0,0 +1,101 @@
+# campaign-cli/tests/cli/test_live_mock_portal.py
+import csv
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from campaign_core.mock_portal import MockPortalConfig, MockPortalServer, write_secret
+from campaign_core.synthetic import DatasetSpec, SyntheticDataset
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+def test_cli_live_build_against_mock_portal(tmp_path):
+    dataset = SyntheticDataset(DatasetSpec(jobs=3, subjects_per_job=25, subjects_jitter=0.4, seed=11))
+    config = MockPortalConfig(users_page_size=5, username="mock", password="mock",
+                              throttle_rate=0.05, seed=11)
+    out = tmp_path / "campaign.csv"
+    with MockPortalServer(config, dataset) as server:
+        env = dict(os.environ, PYTHONPATH=str(REPO_ROOT),
+                   NETLIFE_BASE_URL_TEMPLATE=server.base_url_template,
+                   NETLIFE_SECRET_ARN=write_secret(str(tmp_path / "secret.json")))
+        cp = subprocess.run([sys.executable, "-m", "campaign_cli.cli_live", "build",
+                             "--portals", "legacyphoto", "--both", "--check-registered-users",
+                             "--out", str(out)],
+                            cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+    assert cp.returncode == 0, cp.stdout[-2000:] + cp.stderr[-2000:]
+
+    with out.open(newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    jobs = list(dataset.iter_jobs("legacyphoto"))
+    reachable = {s["uuid"] for job in jobs for s in job.subjects
+                 if s["delivery_1"] or s.get("delivery_2")}
+    registered = {r["subjectUuid"] for job in jobs for r in dataset.registrations(job)}
+    assert {row["subject_uuid"] for row in rows} == reachable
+    assert {row["subject_uuid"] for row in rows if row["registered_user_uuid"]} == registered & reachable
+    assert server.statuses[429] >= 1
+
+
+def test_failed_listing_is_not_checkpointed_and_resume_refetches_it(tmp_path):
+    dataset = SyntheticDataset(DatasetSpec(jobs=3, subjects_per_job=20, seed=5))
+    failing = dataset.job_uuid("legacyphoto", 1)
+    config = MockPortalConfig(username="mock", password="mock", seed=5,
+                              fail_pattern=f"^/jobs/{failing}/subjects$")
+    checkpoints = tmp_path / "checkpoints"
+    with MockPortalServer(config, dataset) as server:
+        env = dict(os.environ, PYTHONPATH=str(REPO_ROOT),
+                   NETLIFE_BASE_URL_TEMPLATE=server.base_url_template,
+                   NETLIFE_SECRET_ARN=write_secret(str(tmp_path / "secret.json")))
+
+        def build(out, *extra):
+            cp = subprocess.run([sys.executable, "-m", "campaign_cli.cli_live", "build",
+                                 "--portals", "legacyphoto", "--both", "--out", str(tmp_path / out),
+                                 "--checkpoint-dir", str(checkpoints), *extra],
+                                cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+            assert cp.returncode == 0, cp.stdout[-2000:] + cp.stderr[-2000:]
+            with (tmp_path / out).open(newline="") as fh:
+                return {row["job_uuid"] for row in csv.DictReader(fh)}
+
+        assert failing not in build("first.csv")
+        (run_id,) = os.listdir(checkpoints)
+        saved = {p.stem for p in (checkpoints / run_id / "legacyphoto").glob("*.json")}
+        assert failing not in saved and len(saved) == 2
+
+        server.config.fail_pattern = ""
+        calls = server.requests["job"]
+        assert failing in build("resumed.csv", "--resume", run_id)
+    assert server.requests["job"] - calls == 1  # only the failed job was fetched again
+
+
+def test_sigterm_exits_partial_without_waiting_for_abandoned_jobs(tmp_path):
+    dataset = SyntheticDataset(DatasetSpec(jobs=6, subjects_per_job=20, seed=7))
+    config = MockPortalConfig(username="mock", password="mock", latency_ms=3000, seed=7)
+    out = tmp_path / "campaign.csv"
+    with MockPortalServer(config, dataset) as server:
+        env = dict(os.environ, PYTHONPATH=str(REPO_ROOT),
+                   NETLIFE_BASE_URL_TEMPLATE=server.base_url_template,
+                   NETLIFE_SECRET_ARN=write_secret(str(tmp_path / "secret.json")),
+                   CAMPAIGN_SHUTDOWN_GRACE_SECONDS="0.5")
+        proc = subprocess.Popen([sys.executable, "-m", "campaign_cli.cli_live", "build",
+                                 "--portals", "legacyphoto", "--both", "--out", str(out)],
+                                cwd=tmp_path, env=env, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE)
+        try:
+            # Wait until jobs are in flight, each still several slow requests from done
+            deadline = time.monotonic() + 60
+            while server.requests["job"] < 1 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            proc.send_signal(signal.SIGTERM)
+            sent = time.monotonic()
+            _, stderr = proc.communicate(timeout=60)
+            elapsed = time.monotonic() - sent
+        finally:
+            proc.kill()
+    assert proc.returncode == 75, stderr[-2000:]
+    # Grace period plus the request in hand, not the remaining requests of every job
+    assert elapsed < 2.5, elapsed
+    assert json.loads((tmp_path / "campaign.csv.partial.json").read_text())["signal"] == "SIGTERM"
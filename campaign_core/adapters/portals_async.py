@@ -2,8 +2,17 @@
 from __future__ import annotations
 import asyncio
 import random
+import time
 import httpx
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from campaign_core.concurrency import AsyncAdaptiveConcurrencyLimiter
+from campaign_core.config import ADAPTIVE_CONCURRENCY_CONFIG
+from campaign_core.metrics import ApiMetrics, EmfSink, response_bytes
+from campaign_core.phones import realistic_phone, stable_seed
+from campaign_core.profiling import endpoint_template
+from campaign_core.rate_limit import get_rate_limiter
 
 RETRYABLE = {429, 500, 502, 503, 504}
 
@@ -11,7 +20,8 @@ def jitter(base: float) -> float:
     """Add jitter: 0.5x to 1.5x the base delay"""
     return base * (0.5 + random.random())
 
-async def retry(fn, *, retries: int = 3, base: float = 0.2, cap: float = 5.0):
+async def retry(fn, *, retries: int = 3, base: float = 0.2, cap: float = 5.0,
+                on_retry: Optional[Callable[[], None]] = None):
     """Retry with exponential backoff and jitter"""
     attempt = 0
     while True:
@@ -23,54 +33,96 @@ async def retry(fn, *, retries: int = 3, base: float = 0.2, cap: float = 5.0):
                 sleep = min(cap, jitter(base * (2 ** attempt)))
                 await asyncio.sleep(sleep)
                 attempt += 1
+                if on_retry is not None:
+                    on_retry()
                 continue
             raise
 
 def generate_realistic_phone(subject_uuid: str) -> str:
     """Generate a realistic US phone number based on subject_uuid"""
-    # Use subject_uuid to seed a deterministic but varied phone number
-    random.seed(hash(subject_uuid) % 1000000)  # Make it deterministic per UUID
-    area_codes = ['201', '202', '203', '205', '206', '207', '208', '209', '210', '212', '213', '214', '215', '216', '217', '218', '219', '220', '224', '225', '228', '229', '231', '234', '239', '240', '248', '251', '252', '253', '254', '256', '260', '262', '267', '269', '270', '272', '276', '281', '301', '302', '303', '304', '305', '307', '308', '309', '310', '312', '313', '314', '315', '316', '317', '318', '319', '320', '321', '323', '325', '330', '331', '334', '336', '337', '339', '346', '347', '351', '352', '360', '361', '364', '380', '385', '386', '401', '402', '404', '405', '406', '407', '408', '409', '410', '412', '413', '414', '415', '417', '419', '423', '424', '425', '430', '432', '434', '435', '440', '442', '443', '445', '447', '458', '463', '464', '469', '470', '475', '478', '479', '480', '484', '501', '502', '503', '504', '505', '507', '508', '509', '510', '512', '513', '515', '516', '517', '518', '520', '530', '531', '534', '539', '540', '541', '551', '559', '561', '562', '563', '564', '567', '570', '571', '573', '574', '575', '580', '582', '585', '586', '601', '602', '603', '605', '606', '607', '608', '609', '610', '612', '614', '615', '616', '617', '618', '619', '620', '623', '626', '628', '629', '630', '631', '636', '641', '646', '650', '651', '657', '660', '661', '662', '667', '669', '678', '681', '682', '701', '702', '703', '704', '706', '707', '708', '712', '713', '714', '715', '716', '717', '718', '719', '720', '724', '725', '727', '730', '731', '732', '734', '737', '740', '743', '747', '754', '757', '760', '762', '763', '765', '769', '770', '772', '773', '774', '775', '779', '781', '785', '786', '801', '802', '803', '804', '805', '806', '808', '810', '812', '813', '814', '815', '816', '817', '818', '828', '830', '831', '832', '843', '845', '847', '848', '850', '854', '856', '857', '858', '859', '860', '862', '863', '864', '865', '870', '872', '878', '901', '903', '904', '906', '907', '908', '909', '910', '912', '913', '914', '915', '916', '917', '918', '919', '920', '925', '928', '929', '930', '931', '934', '936', '937', '938', '940', '941', '947', '949', '951', '952', '954', '956', '959', '970', '971', '972', '973', '975', '978', '979', '980', '984', '985', '986', '989']
-    
-    area_code = random.choice(area_codes)
-    exchange = f"{random.randint(200, 999):03d}"
-    number = f"{random.randint(1000, 9999):04d}"
-    
-    return f"+1{area_code}{exchange}{number}"
+    # Private Random with a process-independent seed: deterministic per UUID across runs,
+    # safe across threads, and the global random state is left alone
+    return realistic_phone(random.Random(stable_seed(subject_uuid)))
 
 class PortalsAsync:
     def __init__(self, base_urls: Dict[str, str], creds: tuple[str, str], *,
-                 concurrency: int = 8, timeout_s: float = 30.0):
-        self._sem = asyncio.Semaphore(concurrency)
+                 concurrency: int = 8, timeout_s: float = 30.0,
+                 rate_limit_per_sec: Optional[float] = None,
+                 metrics_sink: Optional[EmfSink] = None):
+        # Per-portal adaptive windows start at `concurrency` and move with portal health
+        max_limit = max(concurrency, ADAPTIVE_CONCURRENCY_CONFIG['max_limit'])
+        self._limits = {key: AsyncAdaptiveConcurrencyLimiter(initial=concurrency, max_limit=max_limit)
+                        for key in base_urls}
         self._client = httpx.AsyncClient(
             timeout=timeout_s,
-            limits=httpx.Limits(max_connections=concurrency,
-                                 max_keepalive_connections=concurrency),
+            limits=httpx.Limits(max_connections=max_limit,
+                                 max_keepalive_connections=max_limit),
             auth=httpx.BasicAuth(creds[0], creds[1]),
             http2=True,
             headers={"Accept-Encoding": "gzip"}
         )
         self._base = base_urls  # key -> url
+        # Per-host token buckets, shared process-wide with NetlifeAPIClient
+        self._limiters = {key: get_rate_limiter(urlparse(url).netloc, rate_limit_per_sec)
+                          for key, url in base_urls.items()}
+        # Per-portal endpoint latency histograms, bytes, retries and 429s (EMF)
+        self.metrics = {key: ApiMetrics(key) for key in base_urls}
+        self._metrics_sink = metrics_sink
+
+    async def _throttle(self, key: str) -> None:
+        limiter = self._limiters.get(key)
+        if limiter is not None:
+            await limiter.acquire_async()
+
+    async def _send(self, key: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Rate limit, pass the portal's adaptive gate, send and feed back latency/status"""
+        await self._throttle(key)
+        gate = self._limits[key]
+        await gate.acquire()
+        status = None
+        bytes_in = 0
+        start = time.monotonic()
+        try:
+            r = await self._client.request(method, url, **kwargs)
+            status = r.status_code
+            bytes_in = response_bytes(r)
+            return r
+        finally:
+            elapsed = time.monotonic() - start
+            await gate.release(elapsed, status, f"{method} {endpoint_template(url)}")
+            self.metrics[key].record_response(method, url, status, elapsed, bytes_in)
+
+    def concurrency_stats(self) -> Dict[str, dict]:
+        """Current adaptive window per portal"""
+        return {key: gate.snapshot() for key, gate in self._limits.items()}
+
+    def metrics_summary(self) -> Dict[str, dict]:
+        """Per-endpoint request counts, latency percentiles, bytes, retries and 429s per portal"""
+        return {key: metrics.summary() for key, metrics in self.metrics.items()}
+
+    def emit_metrics(self) -> None:
+        """Write every portal's API metrics to the EMF sink, if one is configured"""
+        if self._metrics_sink is not None:
+            for metrics in self.metrics.values():
+                self._metrics_sink.emit(metrics.emf_documents())
 
     async def _get(self, key: str, path: str, params: Optional[Dict] = None) -> dict:
-        """Get JSON with retry and semaphore"""
-        async with self._sem:
-            url = self._base[key].rstrip('/') + '/' + path.lstrip('/')
-            async def _fetch():
-                r = await self._client.get(url, params=params)
-                r.raise_for_status()
-                return r.json()
-            return await retry(_fetch)
+        """Get JSON with retry under the portal's adaptive window"""
+        url = self._base[key].rstrip('/') + '/' + path.lstrip('/')
+        async def _fetch():
+            r = await self._send(key, "GET", url, params=params)
+            r.raise_for_status()
+            return r.json()
+        return await retry(_fetch, on_retry=lambda: self.metrics[key].record_retry("GET", url))
 
     async def _post(self, key: str, path: str, json_body: dict) -> dict:
-        """Post JSON with retry and semaphore"""
-        async with self._sem:
-            url = self._base[key].rstrip('/') + '/' + path.lstrip('/')
-            async def _fetch():
-                r = await self._client.post(url, json=json_body)
-                r.raise_for_status()
-                return r.json()
-            return await retry(_fetch)
+        """Post JSON with retry under the portal's adaptive window"""
+        url = self._base[key].rstrip('/') + '/' + path.lstrip('/')
+        async def _fetch():
+            r = await self._send(key, "POST", url, json=json_body)
+            r.raise_for_status()
+            return r.json()
+        return await retry(_fetch, on_retry=lambda: self.metrics[key].record_retry("POST", url))
 
     async def get_activities_for_job(self, key: str, job_id: str) -> List[dict]:
         """Get activities for a job with efficient field selection"""
@@ -4,8 +4,14 @@ import os, json, base64
 import boto3
 
 def load_basic_auth(secret_arn: str) -> tuple[str, str, int, int]:
-    sm = boto3.client("secretsmanager")
-    resp = sm.get_secret_value(SecretId=secret_arn)
-    s = resp.get("SecretString") or base64.b64decode(resp["SecretBinary"]).decode()
+    if secret_arn.startswith("file://"):
+        # Local JSON with the same fields, for runs against the mock portal
+        with open(secret_arn[len("file://"):], "r") as fh:
+            s = fh.read()
+    else:
+        sm = boto3.client("secretsmanager")
+        resp = sm.get_secret_value(SecretId=secret_arn)
+        s = resp.get("SecretString") or base64.b64decode(resp["SecretBinary"]).decode()
     data = json.loads(s)
-    return data["username"], data["password"], int(data.get("timeout_s", 30)), int(data.get("rate_limit_per_sec", 8))
\ No newline at end of file
+    # No rate_limit_per_sec in the secret means the portal is not throttled (0 = unlimited)
+    return data["username"], data["password"], int(data.get("timeout_s", 30)), int(data.get("rate_limit_per_sec") or 0)
\ No newline at end of file
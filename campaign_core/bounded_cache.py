@@ -0,0 +1,140 @@
+# campaign_core/bounded_cache.py
+"""
+Size-bounded in-process LRU cache for API documents.
+
+Entries are weighed by an approximate in-memory size, and least-recently-used
+entries are evicted once a cache's byte budget is exceeded, so a client working
+through a large portal holds at most its budgets' worth of job documents and
+subject listings. Entries that are no longer needed can be released explicitly.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+def approx_size(obj: Any) -> int:
+    """Approximate deep size in bytes of a decoded JSON value (shared objects are
+    counted once per reference, which errs on the high side)"""
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+    return size
+
+
+class BoundedCache:
+    """Thread-safe LRU mapping bounded by approximate bytes (and optionally entries).
+
+    An entry larger than the whole budget is not kept at all.
+    """
+
+    def __init__(self, name: str, max_bytes: int, max_entries: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = approx_size):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.peak_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.released = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            self._drop(key)
+            if size > self.max_bytes:
+                self.evictions += 1
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or (
+                    self.max_entries is not None and len(self._entries) > self.max_entries):
+                _, (_, victim_size) = self._entries.popitem(last=False)
+                self._bytes -= victim_size
+                self.evictions += 1
+            self.peak_bytes = max(self.peak_bytes, self._bytes)
+
+    def _drop(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def discard(self, key: Hashable) -> bool:
+        """Release one entry that is no longer needed"""
+        with self._lock:
+            dropped = self._drop(key)
+            self.released += dropped
+            return dropped
+
+    def discard_matching(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Release every entry whose key matches; returns how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._drop(key)
+            self.released += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'peak_bytes': self.peak_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'released': self.released,
+            }
@@ -0,0 +1,138 @@
+# campaign_core/checkpoint.py
+"""
+Per-job checkpoints for long multi-job runs.
+
+Every job that finishes is written as its own JSON document under
+<checkpoint dir>/<run id>/<portal>/<job uuid>.json, on local disk or s3://. A run
+started with --resume <run id> loads those jobs from the checkpoint instead of
+calling the API again, so a retried Fargate task only pays for the remaining work.
+The run's options are kept in manifest.json and must match on resume.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+from campaign_core.models import Contact
+
+MANIFEST = "manifest.json"
+
+
+class CheckpointMismatchError(ValueError):
+    """The options of a resumed run differ from those the checkpoint was written with"""
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+
+
+class RunCheckpoint:
+    """Checkpoint store of one run (thread-safe: every job is a separate object)"""
+
+    def __init__(self, location: str, run_id: str, kms_key_id: Optional[str] = None,
+                 s3_client=None):
+        self.run_id = run_id
+        self.location = location.rstrip("/")
+        self._is_s3 = location.startswith("s3://")
+        self._extra = {}
+        if self._is_s3:
+            parsed = urlparse(self.location)
+            self._bucket = parsed.netloc
+            self._prefix = "/".join(p for p in (parsed.path.strip("/"), run_id) if p)
+            if kms_key_id:
+                self._extra.update(ServerSideEncryption="aws:kms", SSEKMSKeyId=kms_key_id)
+            if s3_client is None:
+                import boto3
+                s3_client = boto3.client("s3")
+            self._s3 = s3_client
+        else:
+            self._root = os.path.join(self.location, run_id)
+
+    # ------------------------------ storage -------------------------------
+
+    def _read(self, relpath: str) -> Optional[bytes]:
+        if self._is_s3:
+            try:
+                response = self._s3.get_object(Bucket=self._bucket, Key=f"{self._prefix}/{relpath}")
+            except self._s3.exceptions.NoSuchKey:
+                return None
+            return response["Body"].read()
+        try:
+            with open(os.path.join(self._root, relpath), "rb") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, relpath: str, data: bytes) -> None:
+        if self._is_s3:
+            self._s3.put_object(Bucket=self._bucket, Key=f"{self._prefix}/{relpath}",
+                                Body=data, **self._extra)
+            return
+        path = os.path.join(self._root, relpath)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write next to the target and swap in: a crash never leaves a half-written job
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    def _list(self, subdir: str) -> List[str]:
+        if self._is_s3:
+            prefix = f"{self._prefix}/{subdir}/"
+            names = []
+            paginator = self._s3.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self._bucket, Prefix=prefix):
+                names.extend(obj["Key"][len(prefix):] for obj in page.get("Contents", []))
+            return names
+        try:
+            return os.listdir(os.path.join(self._root, subdir))
+        except FileNotFoundError:
+            return []
+
+    # ------------------------------- run ---------------------------------
+
+    def exists(self) -> bool:
+        return self._read(MANIFEST) is not None
+
+    def start(self, options: Dict[str, Any], resume: bool = False) -> None:
+        """Write the manifest of a new run, or check it against a resumed one"""
+        if resume:
+            raw = self._read(MANIFEST)
+            if raw is None:
+                raise FileNotFoundError(f"no checkpoint for run {self.run_id} in {self.location}")
+            recorded = json.loads(raw)["options"]
+            if recorded != options:
+                raise CheckpointMismatchError(
+                    f"run {self.run_id} was started with {recorded}, not {options}")
+            return
+        self._write_manifest(options, status="running")
+
+    def finish(self, options: Dict[str, Any], status: str = "complete") -> None:
+        """Record how the run ended: "complete", or "partial" when it was interrupted"""
+        self._write_manifest(options, status=status)
+
+    def _write_manifest(self, options: Dict[str, Any], status: str) -> None:
+        manifest = {"run_id": self.run_id, "options": options, "status": status,
+                    "updated_at": time.time()}
+        self._write(MANIFEST, json.dumps(manifest, sort_keys=True).encode())
+
+    # ------------------------------- jobs --------------------------------
+
+    def completed_jobs(self, portal: str) -> Set[str]:
+        return {name[:-len(".json")] for name in self._list(portal) if name.endswith(".json")}
+
+    def save_job(self, portal: str, job_uuid: str, contacts: List[Contact]) -> None:
+        payload = [contact.model_dump(mode="json") for contact in contacts]
+        self._write(f"{portal}/{job_uuid}.json", json.dumps(payload).encode())
+
+    def load_job(self, portal: str, job_uuid: str) -> List[Contact]:
+        raw = self._read(f"{portal}/{job_uuid}.json")
+        if raw is None:
+            raise FileNotFoundError(f"checkpoint for job {portal}/{job_uuid} vanished")
+        return [Contact.model_validate(item) for item in json.loads(raw)]
@@ -0,0 +1,152 @@
+# campaign_core/concurrency.py
+"""
+Adaptive (AIMD) concurrency control per portal.
+
+The in-flight window grows additively (about +1 per window of healthy responses)
+while latency stays near its observed baseline, and is cut multiplicatively on
+429/5xx/transport errors or when smoothed latency drifts well above baseline.
+Latency is tracked per endpoint (callers pass e.g. "GET /jobs/{id}"), so a slow
+job document is compared with earlier job documents, not with fast accesskeys
+calls. Each portal gets its own controller, so fast portals open up and slow ones
+back off.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from campaign_core.config import ADAPTIVE_CONCURRENCY_CONFIG
+
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _LatencyTrack:
+    """Smoothed and baseline latency of one endpoint"""
+    __slots__ = ("ewma", "baseline")
+
+    def __init__(self, latency: float):
+        self.ewma = latency
+        self.baseline = latency
+
+    def update(self, latency: float, smoothing: float) -> None:
+        self.ewma += smoothing * (latency - self.ewma)
+        # Baseline tracks the best latency seen, drifting up slowly so it can recover
+        if latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += 0.01 * (self.ewma - self.baseline)
+
+
+class AIMDController:
+    """Window arithmetic shared by the thread and asyncio gates"""
+
+    def __init__(self, initial: Optional[int] = None, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None):
+        cfg = ADAPTIVE_CONCURRENCY_CONFIG
+        self.min_limit = max(1, min_limit or cfg['min_limit'])
+        self.max_limit = max(self.min_limit, max_limit or cfg['max_limit'])
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial or cfg['initial_limit'])))
+        self._decrease_factor = cfg['decrease_factor']
+        self._latency_tolerance = cfg['latency_tolerance']
+        self._smoothing = cfg['latency_smoothing']
+        self._mutex = threading.Lock()
+        self.in_flight = 0
+        self._latency: Dict[str, _LatencyTrack] = {}
+        self._rtt = 0.0  # smoothed latency of the last endpoint seen, for the cut cooldown
+        self._last_decrease = 0.0
+        self.peak_limit = int(self._limit)
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _decrease(self, now: float) -> None:
+        # One cut per smoothed RTT: a burst of failures from the same window counts once
+        if now - self._last_decrease < self._rtt:
+            return
+        self._limit = max(float(self.min_limit), self._limit * self._decrease_factor)
+        self._last_decrease = now
+        self.decreases += 1
+
+    def record(self, latency: float, status: Optional[int], endpoint: str = "*") -> None:
+        """Feed one completed request (status None means a transport error)"""
+        now = time.monotonic()
+        with self._mutex:
+            if status is None or status in BACKOFF_STATUSES:
+                self._decrease(now)
+                return
+            track = self._latency.get(endpoint)
+            if track is None:
+                track = self._latency[endpoint] = _LatencyTrack(latency)
+            else:
+                track.update(latency, self._smoothing)
+            self._rtt = track.ewma
+            if track.ewma > track.baseline * self._latency_tolerance:
+                self._decrease(now)
+            elif self._limit < self.max_limit:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                self.increases += 1
+                self.peak_limit = max(self.peak_limit, int(self._limit))
+
+    def _most_drifted(self) -> Tuple[float, float]:
+        """(ewma, baseline) of the endpoint furthest above its baseline"""
+        if not self._latency:
+            return 0.0, 0.0
+        track = max(self._latency.values(), key=lambda t: t.ewma / t.baseline if t.baseline else 0.0)
+        return track.ewma, track.baseline
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._mutex:
+            ewma, baseline = self._most_drifted()
+            return {
+                'concurrency_window': int(self._limit),
+                'concurrency_window_peak': self.peak_limit,
+                'concurrency_in_flight': self.in_flight,
+                'concurrency_increases': self.increases,
+                'concurrency_decreases': self.decreases,
+                'latency_ewma_ms': round(ewma * 1000, 1),
+                'latency_baseline_ms': round(baseline * 1000, 1),
+            }
+
+
+class AdaptiveConcurrencyLimiter(AIMDController):
+    """Blocking gate for worker threads"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition(self._mutex)
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self._limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, status: Optional[int], endpoint: str = "*") -> None:
+        self.record(latency, status, endpoint)
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+
+class AsyncAdaptiveConcurrencyLimiter(AIMDController):
+    """Awaitable gate for asyncio tasks on a single event loop"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self._limit))
+            self.in_flight += 1
+
+    async def release(self, latency: float, status: Optional[int], endpoint: str = "*") -> None:
+        self.record(latency, status, endpoint)
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
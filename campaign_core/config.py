@@ -16,6 +16,11 @@ ALLOWED_PORTALS: Dict[str, str] = {
     "coastguardportraits": "https://coastguardportraits.shop/api/v1",
 }
 
+# Point every portal at one host, e.g. the local mock (campaign_core/mock_portal.py):
+# NETLIFE_BASE_URL_TEMPLATE=http://127.0.0.1:8765/{portal}/api/v1
+if os.getenv("NETLIFE_BASE_URL_TEMPLATE"):
+    ALLOWED_PORTALS = {k: os.environ["NETLIFE_BASE_URL_TEMPLATE"].format(portal=k) for k in ALLOWED_PORTALS}
+
 NETLIFE_SECRET_ARN = os.getenv(
     "NETLIFE_SECRET_ARN",
     "arn:aws:secretsmanager:us-east-1:754102187132:secret:nws/netlife-api-dev-tsm19Z",
@@ -43,6 +48,79 @@ PERFORMANCE_CONFIG = {
     'retry_attempts': 3,
     'retry_backoff': 1.5,
     'max_concurrent_jobs': 10,
+    'max_concurrent_portals': 9,  # Portal pipelines run side by side in cli_live
+    'slow_path_timeout': 120,   # Extended timeout for very large /jobs/{uuid} documents
+    'pool_connections': 10,     # Number of per-host connection pools kept by the transport
+    'access_key_workers': 8,    # Bounded fan-out for per-job access-key resolution
+    'pool_maxsize': 32,         # Max keep-alive connections per portal host (shared by all threads)
+    'split_subjects_locally': False,  # One unfiltered subject listing per job, split on has_order
+    'stream_chunk_size': 64 * 1024,  # Read size when a response body is parsed as it streams
+}
+
+# Per-portal AIMD window for in-flight requests (see campaign_core/concurrency.py)
+ADAPTIVE_CONCURRENCY_CONFIG = {
+    'initial_limit': 8,
+    'min_limit': 1,
+    'max_limit': 64,
+    'decrease_factor': 0.5,     # Multiplicative cut on 429/5xx/errors
+    'latency_tolerance': 2.0,   # Back off when smoothed latency exceeds baseline by this factor
+    'latency_smoothing': 0.1,   # EWMA weight of each new latency sample
+}
+
+# Streaming CSV output (see campaign_core/output.py)
+OUTPUT_CONFIG = {
+    'spool_max_bytes': 8 * 1024 * 1024,  # Spooled portal parts stay in memory up to this, then go to disk
+    's3_part_size': 8 * 1024 * 1024,     # Multipart upload part size for s3:// outputs (min 5 MiB)
+    's3_max_concurrency': 4,             # Parts uploaded (and held in memory) at once
+}
+
+# Cross-run persistent cache (see campaign_core/persistent_cache.py)
+CACHE_CONFIG = {
+    'path': os.getenv('CAMPAIGN_CACHE_PATH') or None,        # SQLite file; unset = in-process only
+    's3_uri': os.getenv('CAMPAIGN_CACHE_S3_URI') or None,    # Seed from / sync to s3://bucket/key
+    'access_key_ttl': 30 * 24 * 3600,   # Access keys almost never change
+    'negative_ttl': 6 * 3600,           # "No access key" results are re-checked sooner
+    'user_details_ttl': 24 * 3600,      # Registered-user profiles (phone numbers)
+    'registrations_ttl': 3600,          # Job registration maps grow as parents register
+}
+
+# Conditional-request response cache (see campaign_core/http_cache.py)
+HTTP_CACHE_CONFIG = {
+    'directory': os.getenv('CAMPAIGN_HTTP_CACHE_DIR') or None,  # Unset = no HTTP cache
+    'max_bytes': 2 * 1024 ** 3,  # Least-recently-used bodies are evicted beyond this
+}
+
+# In-process client caches (see campaign_core/bounded_cache.py): LRU, bounded by the
+# approximate bytes each cache may hold; a job's entries are also released once processed
+CLIENT_CACHE_CONFIG = {
+    'job_details': 256 * 1024 ** 2,        # Full job documents, including every image
+    'buyers': 64 * 1024 ** 2,
+    'non_buyers': 64 * 1024 ** 2,
+    'subjects_enriched': 64 * 1024 ** 2,
+    'user_details': 32 * 1024 ** 2,
+}
+
+# Graceful shutdown on SIGTERM/SIGINT (see campaign_core/shutdown.py); keep it below the
+# ECS stopTimeout (30s by default) so there is time left to flush the output
+SHUTDOWN_CONFIG = {
+    'grace_seconds': float(os.getenv('CAMPAIGN_SHUTDOWN_GRACE_SECONDS', '20')),
+}
+
+# Per-job checkpoints for --resume (see campaign_core/checkpoint.py)
+CHECKPOINT_CONFIG = {
+    'directory': os.getenv('CAMPAIGN_CHECKPOINT_DIR') or None,  # Local dir or s3://bucket/prefix
+}
+
+# Incremental (--since-last-run) state (see campaign_core/delta.py)
+DELTA_CONFIG = {
+    'state_path': os.getenv('CAMPAIGN_STATE_PATH', '.campaign_state.sqlite'),
+}
+
+# Per-endpoint API metrics as CloudWatch Embedded Metric Format lines (see campaign_core/metrics.py).
+# Sink: 'stdout', 'stderr' or a file path (e.g. one tailed by the CloudWatch agent); unset = off
+METRICS_CONFIG = {
+    'sink': os.getenv('CAMPAIGN_METRICS_SINK') or None,
+    'namespace': os.getenv('CAMPAIGN_METRICS_NAMESPACE', 'SMS/Prod'),
 }
 
 # ============================================================================
@@ -0,0 +1,206 @@
+# campaign_core/delta.py
+"""
+Incremental (delta) campaign runs.
+
+A compact fingerprint of every emitted contact (portal, job, subject, activity,
+phone, email, access_code) is kept in a local SQLite state store, scoped by the
+audience/filter combination. A --since-last-run build then emits only rows that are
+new or changed, lists rows that disappeared, and can skip jobs whose webshop
+activities have not changed since the previous run.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from campaign_core.models import Contact
+
+REMOVAL_COLUMNS = ("portal", "job_uuid", "subject_uuid", "activity_uuid")
+
+
+def contact_identity(contact: Contact) -> Tuple[str, str, str, str]:
+    return (contact.portal, contact.job_uuid, contact.subject_uuid, contact.activity_uuid)
+
+
+def contact_fingerprint(contact: Contact) -> str:
+    """Digest of the fields whose change should re-send a contact downstream"""
+    fields = (contact.phone_number or "", contact.email or "", contact.access_code or "")
+    return hashlib.blake2b("\x1f".join(fields).encode(), digest_size=12).hexdigest()
+
+
+def activities_fingerprint(activities: Iterable[Dict[str, Any]]) -> str:
+    ordered = sorted(activities, key=lambda a: str(a.get('uuid')))
+    payload = json.dumps(ordered, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+
+
+class DeltaStateStore:
+    """SQLite store of contact fingerprints and job activity fingerprints per scope"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS contacts ("
+            " scope TEXT NOT NULL, portal TEXT NOT NULL, job_uuid TEXT NOT NULL,"
+            " subject_uuid TEXT NOT NULL, activity_uuid TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (scope, portal, job_uuid, subject_uuid, activity_uuid));"
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " scope TEXT NOT NULL, portal TEXT NOT NULL, job_uuid TEXT NOT NULL,"
+            " activities_fingerprint TEXT NOT NULL, PRIMARY KEY (scope, portal, job_uuid));"
+        )
+
+    def contacts(self, scope: str, portal: str) -> Dict[Tuple[str, str, str, str], str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT portal, job_uuid, subject_uuid, activity_uuid, fingerprint FROM contacts"
+                " WHERE scope = ? AND portal = ?", (scope, portal)).fetchall()
+        return {tuple(row[:4]): row[4] for row in rows}
+
+    def job_fingerprints(self, scope: str, portal: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_uuid, activities_fingerprint FROM jobs WHERE scope = ? AND portal = ?",
+                (scope, portal)).fetchall()
+        return dict(rows)
+
+    def apply(self, scope: str, upserts: Dict[Tuple[str, str, str, str], str],
+              removals: Iterable[Tuple[str, str, str, str]],
+              jobs: Dict[Tuple[str, str], str]) -> None:
+        """Write one run's changes in a single transaction"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO contacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(scope, *identity, fp, now) for identity, fp in upserts.items()])
+            self._conn.executemany(
+                "DELETE FROM contacts WHERE scope = ? AND portal = ? AND job_uuid = ?"
+                " AND subject_uuid = ? AND activity_uuid = ?",
+                [(scope, *identity) for identity in removals])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)",
+                [(scope, portal, job_uuid, fp) for (portal, job_uuid), fp in jobs.items()])
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class DeltaRun:
+    """Delta bookkeeping for one build, shared by every portal pipeline (thread-safe).
+
+    Removals are only reported for jobs that produced rows in this run or that left
+    the webshop; jobs that were skipped as unchanged, failed or came back incomplete
+    keep their previous rows, so an API error never looks like a mass unsubscribe.
+    """
+
+    def __init__(self, store: DeltaStateStore, scope: str, skip_unchanged_jobs: bool = False):
+        self.store = store
+        self.scope = scope
+        self.skip_unchanged_jobs = skip_unchanged_jobs
+        self._lock = threading.Lock()
+        self._previous: Dict[Tuple[str, str, str, str], str] = {}
+        self._active_jobs: Dict[str, Set[str]] = {}
+        self._job_fingerprints: Dict[Tuple[str, str], str] = {}
+        self._produced_jobs: Set[Tuple[str, str]] = set()
+        self._incomplete_jobs: Set[Tuple[str, str]] = set()
+        self._seen: Dict[Tuple[str, str, str, str], str] = {}
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.skipped_jobs = 0
+
+    def register_jobs(self, portal: str, jobs_map: Dict[str, List[Dict[str, Any]]]
+                      ) -> Dict[str, List[Dict[str, Any]]]:
+        """Record a portal's active jobs; returns the jobs that still need processing"""
+        previous_contacts = self.store.contacts(self.scope, portal)
+        previous_jobs = self.store.job_fingerprints(self.scope, portal)
+        to_process = {}
+        with self._lock:
+            self._previous.update(previous_contacts)
+            self._active_jobs[portal] = set(jobs_map)
+            for job_uuid, activities in jobs_map.items():
+                fingerprint = activities_fingerprint(activities)
+                if self.skip_unchanged_jobs and previous_jobs.get(job_uuid) == fingerprint:
+                    self.skipped_jobs += 1
+                    continue
+                self._job_fingerprints[(portal, job_uuid)] = fingerprint
+                to_process[job_uuid] = activities
+        return to_process
+
+    def mark_incomplete(self, portal: str, job_uuid: str) -> None:
+        """A job whose rows came back partial (e.g. a failed access-key lookup): its
+        missing contacts are carried forward and it is not recorded as unchanged"""
+        with self._lock:
+            self._incomplete_jobs.add((portal, job_uuid))
+
+    def _complete(self, job: Tuple[str, str]) -> bool:
+        return job in self._produced_jobs and job not in self._incomplete_jobs
+
+    def filter(self, contacts: List[Contact]) -> List[Contact]:
+        """Keep only contacts that are new or changed since the last run"""
+        emitted = []
+        with self._lock:
+            for contact in contacts:
+                identity = contact_identity(contact)
+                fingerprint = contact_fingerprint(contact)
+                self._seen[identity] = fingerprint
+                self._produced_jobs.add(identity[:2])
+                previous = self._previous.get(identity)
+                if previous == fingerprint:
+                    self.unchanged += 1
+                    continue
+                if previous is None:
+                    self.new += 1
+                else:
+                    self.changed += 1
+                emitted.append(contact)
+        return emitted
+
+    def removals(self) -> List[Tuple[str, str, str, str]]:
+        with self._lock:
+            removed = []
+            for identity in self._previous:
+                if identity in self._seen or identity[0] not in self._active_jobs:
+                    continue
+                job = identity[:2]
+                if self._complete(job) or job[1] not in self._active_jobs[job[0]]:
+                    removed.append(identity)
+            return sorted(removed)
+
+    def commit(self) -> List[Tuple[str, str, str, str]]:
+        """Persist this run's state; returns the removal list"""
+        removed = self.removals()
+        with self._lock:
+            upserts = {k: v for k, v in self._seen.items() if self._previous.get(k) != v}
+            jobs = {job: fp for job, fp in self._job_fingerprints.items()
+                    if self._complete(job)}
+        self.store.apply(self.scope, upserts, removed, jobs)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'delta_new': self.new, 'delta_changed': self.changed,
+                    'delta_unchanged': self.unchanged, 'delta_skipped_jobs': self.skipped_jobs}
+
+
+def delta_scope(audience: str, contact_filter: str, check_registered_users: bool,
+                registered_only: bool) -> str:
+    """State is kept separately per audience/filter combination"""
+    return f"{audience}|{contact_filter}|reg={int(check_registered_users)}|only={int(registered_only)}"
+
+
+def write_removals(path: str, removals: List[Tuple[str, str, str, str]]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh, lineterminator="\n")
+        writer.writerow(REMOVAL_COLUMNS)
+        writer.writerows(removals)
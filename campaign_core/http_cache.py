@@ -0,0 +1,167 @@
+# campaign_core/http_cache.py
+"""
+Conditional-request (ETag / Last-Modified) response cache on local disk.
+
+Large portal documents such as /jobs/{uuid} are stored with their validators. The
+next request for the same URL sends If-None-Match / If-Modified-Since, and an
+unchanged resource comes back as a bodyless 304 that is answered from disk.
+The store is bounded by size and evicts least-recently-used entries.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlencode
+
+from campaign_core.config import HTTP_CACHE_CONFIG
+
+
+@dataclass
+class CachedResponse:
+    key: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    size: int
+
+    def validators(self) -> Dict[str, str]:
+        """Request headers that revalidate this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def http_cache_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """Cache key for a GET: the URL plus its query parameters in a stable order"""
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+
+class ConditionalHTTPCache:
+    """Size-bounded on-disk store of GET bodies and their validators (thread-safe)"""
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes or HTTP_CACHE_CONFIG['max_bytes']
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + suffix)
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from the entries already on disk (oldest use first)"""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.meta'):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            try:
+                with open(meta_path, encoding='utf-8') as fh:
+                    meta = json.load(fh)
+                found.append((os.path.getmtime(meta_path), CachedResponse(**meta)))
+            except (OSError, ValueError, TypeError):
+                continue
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[entry.key] = entry
+            self._total_bytes += entry.size
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def revalidated(self, entry: CachedResponse) -> Optional[bytes]:
+        """The stored body after a 304 (None if it vanished from disk meanwhile)"""
+        try:
+            with open(self._path(entry.key, '.body'), 'rb') as fh:
+                body = fh.read()
+        except OSError:
+            self._remove(entry.key)
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(body)
+            if entry.key in self._entries:
+                self._entries.move_to_end(entry.key)
+        try:
+            os.utime(self._path(entry.key, '.meta'))
+        except OSError:
+            pass
+        return body
+
+    def store(self, key: str, body: bytes, headers: Mapping[str, str]) -> bool:
+        """Record a full (non-304) fetch, keeping the body when the server sent a
+        validator; returns whether it was kept"""
+        with self._lock:
+            self.misses += 1
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified) or len(body) > self.max_bytes:
+            self._remove(key)
+            return False
+        entry = CachedResponse(key=key, etag=etag, last_modified=last_modified, size=len(body))
+        self._write_atomic(self._path(key, '.body'), body)
+        self._write_atomic(self._path(key, '.meta'), json.dumps(entry.__dict__).encode())
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.size
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            victims = []
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                victim_key, victim = self._entries.popitem(last=False)
+                self._total_bytes -= victim.size
+                self.evictions += 1
+                victims.append(victim_key)
+        for victim_key in victims:
+            self._unlink(victim_key)
+        return True
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry.size
+        if entry is not None:
+            self._unlink(key)
+
+    def _unlink(self, key: str) -> None:
+        for suffix in ('.meta', '.body'):
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'http_cache_hits': self.hits,
+                'http_cache_misses': self.misses,
+                'http_cache_bytes_saved': self.bytes_saved,
+                'http_cache_evictions': self.evictions,
+                'http_cache_entries': len(self._entries),
+                'http_cache_bytes': self._total_bytes,
+            }
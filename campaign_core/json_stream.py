@@ -0,0 +1,170 @@
+# campaign_core/json_stream.py
+"""
+Pruned JSON decoding for large portal documents.
+
+/jobs/{uuid} carries every image of a job, but the pipeline only reads the job
+name and the subject -> image -> activity links. A prune spec describes the parts
+of a document to keep; everything else is skipped while parsing. With the optional
+ijson package (pip install campaign_core[streaming]) the document is parsed
+incrementally, from the response stream or its bytes, so the full dict is never
+built. Without it the body is decoded once with json and pruned straight away, so
+only the slim document is retained.
+
+Spec format: True keeps a whole subtree; a dict names the keys to keep (with their
+own specs), '*' applies to any other key and '[]' to list items. Scalars are kept
+wherever a spec applies; containers without one are dropped.
+"""
+from __future__ import annotations
+
+import io
+import json
+from typing import Any, Dict, IO, Iterable, Tuple, Union
+
+try:
+    import ijson
+except ImportError:  # optional: pip install campaign_core[streaming]
+    ijson = None
+
+HAVE_IJSON = ijson is not None
+
+Spec = Union[bool, Dict[str, Any]]
+
+# References from a subject to its images: uuids, {uuid: ...} maps or image stubs
+_IMAGE_STUB: Spec = {'uuid': True}
+IMAGE_REFS: Spec = {'uuid': True, '[]': _IMAGE_STUB, '*': _IMAGE_STUB}
+_IMAGE_REF_FIELDS = ('images', 'group_images', 'image',
+                     'favorite_image_uuid', 'favoriteImageUuid', 'favorite_image')
+
+# /jobs/{uuid}: job scalars (name, ...), and only the fields
+# build_subject_activity_mapping reads from subjects and images
+_JOB_SUBJECT: Spec = {'uuid': True, 'activity_uuid': True, 'activity': True,
+                      **{field: IMAGE_REFS for field in _IMAGE_REF_FIELDS}}
+_JOB_IMAGE: Spec = {'uuid': True, 'activity': {'uuid': True},
+                    'activity_uuid': True, 'activityUuid': True}
+JOB_DETAILS_SPEC: Dict[str, Any] = {
+    '*': {},
+    'subjects': {'[]': _JOB_SUBJECT, '*': _JOB_SUBJECT},
+    'images': {'[]': _JOB_IMAGE, '*': _JOB_IMAGE},
+}
+JOB_DETAILS_SPEC['data'] = JOB_DETAILS_SPEC
+JOB_DETAILS_SPEC['job'] = JOB_DETAILS_SPEC
+
+# /jobs/{uuid}/subjects pages: every subject field, image payloads cut to references
+_SUBJECT_ROW: Spec = {'*': True, **{field: IMAGE_REFS for field in _IMAGE_REF_FIELDS}}
+SUBJECTS_PAGE_SPEC: Spec = {'*': True, '[]': _SUBJECT_ROW,
+                            'data': {'[]': _SUBJECT_ROW}, 'results': {'[]': _SUBJECT_ROW}}
+
+_MISSING = object()
+
+
+def prune(value: Any, spec: Spec) -> Any:
+    """Apply a spec to an already decoded value"""
+    if spec is True:
+        return value
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            sub = spec.get(key, spec.get('*'))
+            if sub is not None:
+                out[key] = prune(item, sub)
+        return out
+    if isinstance(value, list):
+        sub = spec.get('[]')
+        return [prune(item, sub) for item in value] if sub is not None else []
+    return value
+
+
+def _child_spec(parent: Any, parent_spec: Spec, key: Any) -> Any:
+    if parent_spec is True:
+        return True
+    if isinstance(parent, list):
+        return parent_spec.get('[]')
+    return parent_spec.get(key, parent_spec.get('*'))
+
+
+def build_pruned(events: Iterable[Tuple[str, Any]], spec: Spec) -> Any:
+    """Assemble a pruned value from ijson basic_parse events, skipping dropped subtrees"""
+    stack = []  # [container, spec, pending map key]
+    skip_depth = 0
+    root = _MISSING
+    for event, value in events:
+        if skip_depth:
+            if event in ('start_map', 'start_array'):
+                skip_depth += 1
+            elif event in ('end_map', 'end_array'):
+                skip_depth -= 1
+            continue
+        if event == 'map_key':
+            stack[-1][2] = value
+            continue
+        if event in ('end_map', 'end_array'):
+            container = stack.pop()[0]
+            if not stack:
+                root = container
+            continue
+
+        # A value (scalar or container start) inside the current container
+        if stack:
+            parent, parent_spec, key = stack[-1]
+            value_spec = _child_spec(parent, parent_spec, key)
+            if value_spec is None:
+                if event in ('start_map', 'start_array'):
+                    skip_depth = 1
+                continue
+        else:
+            value_spec = spec
+        if event in ('start_map', 'start_array'):
+            item = {} if event == 'start_map' else []
+        else:
+            item = value
+        if stack:
+            if isinstance(parent, list):
+                parent.append(item)
+            else:
+                parent[key] = item
+        elif not isinstance(item, (dict, list)):
+            root = item
+        if isinstance(item, (dict, list)) and event in ('start_map', 'start_array'):
+            stack.append([item, value_spec, None])
+    return None if root is _MISSING else root
+
+
+def loads_pruned(source: Union[bytes, IO[bytes]], spec: Spec) -> Any:
+    """Decode JSON from bytes or a binary stream, keeping only what spec names"""
+    if ijson is not None:
+        stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        try:
+            return build_pruned(ijson.basic_parse(stream, use_float=True), spec)
+        except ijson.JSONError as e:
+            raise ValueError(f"invalid JSON: {e}") from e
+    if not isinstance(source, (bytes, bytearray)):
+        source = source.read()
+    return prune(json.loads(source), spec)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Readable stream over an iterator of byte chunks (e.g. Response.iter_content)"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = chunk
+            self.bytes_read += len(chunk)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def chunk_stream(chunks: Iterable[bytes]) -> IO[bytes]:
+    return io.BufferedReader(_ChunkReader(chunks))
@@ -0,0 +1,241 @@
+# campaign_core/metrics.py
+"""
+Per-endpoint API metrics for the portal clients, emitted as CloudWatch Embedded
+Metric Format (EMF).
+
+Every HTTP call made through a client's _send lands in an ApiMetrics collector:
+request and error counts, 429s, retries, bytes received and a latency histogram
+per endpoint (ids collapsed, e.g. "GET /jobs/{id}"). At the end of a portal the
+collector is written as EMF JSON lines, one per endpoint plus one portal-wide
+line, so CloudWatch turns them into metrics under METRICS_CONFIG['namespace']
+with Portal / Endpoint dimensions without an extra service. Latency percentiles
+come from fixed log-spaced buckets (about 19% wide), so p50/p90/p99 are upper
+bucket bounds, capped at the slowest request seen.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from campaign_core.config import METRICS_CONFIG
+from campaign_core.profiling import endpoint_template
+
+# Bucket upper bounds in milliseconds: 1ms * 2^(k/4), up to ~18 minutes
+_BUCKET_BOUNDS_MS = [2 ** (k / 4) for k in range(81)]
+
+_COUNT_METRICS = (("Requests", "Count"), ("Errors", "Count"), ("Throttled", "Count"),
+                  ("Retries", "Count"), ("BytesIn", "Bytes"))
+_LATENCY_METRICS = (("LatencyP50", 0.50), ("LatencyP90", 0.90), ("LatencyP99", 0.99))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (not thread-safe; ApiMetrics holds the lock)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    @classmethod
+    def from_buckets(cls, buckets: Dict[str, List[float]]) -> "LatencyHistogram":
+        """Rebuild from buckets() output (e.g. an EMF line's LatencyHistogram)"""
+        histogram = cls()
+        for upper, n in zip(buckets.get("upper_ms", []), buckets.get("counts", [])):
+            # Bounds are >19% apart, so the rounded bound finds its own bucket
+            histogram.counts[bisect.bisect_left(_BUCKET_BOUNDS_MS, upper - 0.001)] += n
+            histogram.count += n
+            histogram.sum_ms += upper * n
+            histogram.max_ms = max(histogram.max_ms, upper)
+        return histogram
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the q-th request"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                bound = _BUCKET_BOUNDS_MS[index] if index < len(_BUCKET_BOUNDS_MS) else self.max_ms
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def buckets(self) -> Dict[str, List[float]]:
+        """Non-empty buckets, for Logs Insights queries over the raw lines"""
+        upper, counts = [], []
+        for index, n in enumerate(self.counts):
+            if n:
+                upper.append(round(_BUCKET_BOUNDS_MS[index], 3) if index < len(_BUCKET_BOUNDS_MS)
+                             else round(self.max_ms, 3))
+                counts.append(n)
+        return {"upper_ms": upper, "counts": counts}
+
+
+class _EndpointStats:
+    __slots__ = ("requests", "errors", "throttled", "retries", "bytes_in", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.retries = 0
+        self.bytes_in = 0
+        self.latency = LatencyHistogram()
+
+    def merge(self, other: "_EndpointStats") -> None:
+        self.requests += other.requests
+        self.errors += other.errors
+        self.throttled += other.throttled
+        self.retries += other.retries
+        self.bytes_in += other.bytes_in
+        self.latency.merge(other.latency)
+
+    def values(self) -> Dict[str, Any]:
+        values = {"Requests": self.requests, "Errors": self.errors, "Throttled": self.throttled,
+                  "Retries": self.retries, "BytesIn": self.bytes_in}
+        for name, q in _LATENCY_METRICS:
+            values[name] = self.latency.percentile(q)
+        values["LatencyMax"] = round(self.latency.max_ms, 3)
+        return values
+
+
+class ApiMetrics:
+    """Thread-safe per-endpoint counters and latency histograms for one portal"""
+
+    def __init__(self, portal: str):
+        self.portal = portal
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _EndpointStats] = {}
+
+    def _endpoint(self, method: str, url: str) -> _EndpointStats:
+        name = f"{method} {endpoint_template(url)}"
+        stats = self._endpoints.get(name)
+        if stats is None:
+            stats = self._endpoints[name] = _EndpointStats()
+        return stats
+
+    def record_response(self, method: str, url: str, status: Optional[int], seconds: float,
+                        bytes_in: int = 0) -> None:
+        """One HTTP exchange; status None means no response (timeout, connection error)"""
+        with self._lock:
+            stats = self._endpoint(method, url)
+            stats.requests += 1
+            stats.bytes_in += bytes_in
+            stats.latency.record(seconds)
+            if status is None or status >= 400:
+                stats.errors += 1
+            if status == 429:
+                stats.throttled += 1
+
+    def record_bytes(self, method: str, url: str, bytes_in: int) -> None:
+        """Body bytes counted after the fact (streamed responses)"""
+        with self._lock:
+            self._endpoint(method, url).bytes_in += bytes_in
+
+    def record_retry(self, method: str, url: str) -> None:
+        with self._lock:
+            self._endpoint(method, url).retries += 1
+
+    def _totals(self) -> _EndpointStats:
+        total = _EndpointStats()
+        for stats in self._endpoints.values():
+            total.merge(stats)
+        return total
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Metric values per endpoint, plus '*' for the whole portal"""
+        with self._lock:
+            out = {name: stats.values() for name, stats in sorted(self._endpoints.items())}
+            if self._endpoints:
+                out["*"] = self._totals().values()
+            return out
+
+    def emf_documents(self, namespace: Optional[str] = None,
+                      timestamp_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        """EMF documents: one per endpoint (Portal, Endpoint) and one per portal (Portal)"""
+        namespace = namespace or METRICS_CONFIG['namespace']
+        timestamp_ms = int(time.time() * 1000) if timestamp_ms is None else timestamp_ms
+        with self._lock:
+            if not self._endpoints:
+                return []
+            rows = [(["Portal", "Endpoint"], {"Endpoint": name}, stats)
+                    for name, stats in sorted(self._endpoints.items())]
+            rows.append((["Portal"], {}, self._totals()))
+            return [_emf_document(namespace, timestamp_ms, dimensions,
+                                  {"Portal": self.portal, **labels}, stats)
+                    for dimensions, labels, stats in rows]
+
+
+def _emf_document(namespace: str, timestamp_ms: int, dimensions: List[str],
+                  labels: Dict[str, str], stats: _EndpointStats) -> Dict[str, Any]:
+    metrics = [{"Name": name, "Unit": unit} for name, unit in _COUNT_METRICS]
+    metrics += [{"Name": name, "Unit": "Milliseconds"} for name, _ in _LATENCY_METRICS]
+    metrics.append({"Name": "LatencyMax", "Unit": "Milliseconds"})
+    return {
+        "_aws": {
+            "Timestamp": timestamp_ms,
+            "CloudWatchMetrics": [{"Namespace": namespace, "Dimensions": [dimensions],
+                                   "Metrics": metrics}],
+        },
+        **labels,
+        **stats.values(),
+        "LatencyHistogram": stats.latency.buckets(),
+    }
+
+
+class EmfSink:
+    """Writes EMF documents as JSON lines to stdout, stderr or a file (appending)"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self._lock = threading.Lock()
+
+    def emit(self, documents: Iterable[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(doc, separators=(",", ":")) + "\n" for doc in documents)
+        if not lines:
+            return
+        with self._lock:
+            if self.target in ("stdout", "stderr"):
+                stream = sys.stdout if self.target == "stdout" else sys.stderr
+                stream.write(lines)
+                stream.flush()
+            else:
+                with open(self.target, "a", encoding="utf-8") as fh:
+                    fh.write(lines)
+
+
+def response_bytes(response: Any, streamed: bool = False) -> int:
+    """Bytes received: Content-Length when sent, else the body length (0 if still streaming)"""
+    length = response.headers.get("Content-Length")
+    if length is not None:
+        try:
+            return int(length)
+        except (TypeError, ValueError):
+            pass
+    return 0 if streamed else len(response.content or b"")
+
+
+def open_metrics_sink(target: Optional[str] = None) -> Optional[EmfSink]:
+    """Sink for --metrics-sink / CAMPAIGN_METRICS_SINK, or None when metrics emission is off"""
+    target = target or METRICS_CONFIG['sink']
+    return EmfSink(target) if target else None
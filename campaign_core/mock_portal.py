@@ -0,0 +1,278 @@
+# campaign_core/mock_portal.py
+"""
+Local stand-in for the Netlife portal API, for end-to-end runs and benchmarks.
+
+Serves /activities/search, /jobs/{uuid}, /jobs/{uuid}/subjects, /jobs/{uuid}/users
+(paginated through meta.next), /users/{uuid} and the per-subject accesskeys
+endpoint from a campaign_core.synthetic dataset, generated on the fly or read
+from a dump() directory (--dataset-dir). Every portal lives under its own
+path prefix, http://host:port/<portal>/api/v1, so one server stands in for all of
+them. Dataset scale, latency, users page size, injected 429/5xx rates and paths
+that always fail are configurable.
+
+cli_live runs against it unchanged:
+
+    python -m campaign_core.mock_portal --port 8765 --scale sc004 --secret-file /tmp/mock.json
+    NETLIFE_BASE_URL_TEMPLATE=http://127.0.0.1:8765/{portal}/api/v1 \\
+    NETLIFE_SECRET_ARN=file:///tmp/mock.json \\
+        python -m campaign_cli.cli_live build --portals legacyphoto --out /tmp/out.csv
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, fields, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from campaign_core.synthetic import SCALES, DatasetSpec, DiskDataset, SyntheticDataset
+
+
+@dataclass
+class MockPortalConfig:
+    """How the server behaves; what it serves comes from a campaign_core.synthetic dataset"""
+    seed: int = 0                     # fault-injection and latency-jitter stream
+    users_page_size: int = 100
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0           # fraction of requests answered 503
+    throttle_rate: float = 0.0        # fraction of requests answered 429 (Retry-After: 0)
+    fail_pattern: str = ""            # regex of API paths always answered 503 (e.g. one listing)
+    username: Optional[str] = None    # require this Basic auth user/password when set
+    password: Optional[str] = None
+
+
+_ROUTES = [
+    ("activities", re.compile(r"^/activities/search$")),
+    ("job", re.compile(r"^/jobs/([^/]+)$")),
+    ("subjects", re.compile(r"^/jobs/([^/]+)/subjects$")),
+    ("users", re.compile(r"^/jobs/([^/]+)/users$")),
+    ("accesskeys", re.compile(r"^/jobs/([^/]+)/subjects/([^/]+)/accesskeys$")),
+    ("user", re.compile(r"^/users/([^/]+)$")),
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:  # quiet: benchmarks hit it hard
+        pass
+
+    def _reply(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None,
+               payload: Optional[bytes] = None) -> None:
+        if payload is None:
+            payload = b"" if body is None else json.dumps(body, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        owner = self.server.owner
+        parts = urlsplit(self.path)
+        match = re.match(r"^/([^/]+)/api/v1(/.*)$", parts.path)
+        if match is None:
+            self._reply(404, {"error": "not found"})
+            owner.record(None, 404)
+            return
+        portal, path = match.groups()
+        route, args = next(((name, m.groups()) for name, rx in _ROUTES
+                            for m in [rx.match(path)] if m), (None, ()))
+        status = owner.inject(self.headers.get("Authorization"), path)
+        if status == 401:
+            self._reply(401, {"error": "unauthorized"})
+        elif status == 429:
+            self._reply(429, {"error": "too many requests"}, {"Retry-After": "0"})
+        elif status == 503:
+            self._reply(503, {"error": "unavailable"})
+        else:
+            status = self._serve(owner, portal, route, args, parse_qs(parts.query))
+        owner.record(route, status)
+
+    def _serve(self, owner: "MockPortalServer", portal: str, route: Optional[str],
+               args: Tuple[str, ...], query: Dict[str, List[str]]) -> int:
+        data = owner.data
+        if route == "activities":
+            self._reply(200, {"data": data.activities(portal)})
+            return 200
+        if route == "user":
+            self._reply(200, {"data": data.user(args[0])})
+            return 200
+        job = data.job(portal, args[0]) if args else None
+        if job is None:
+            self._reply(404, {"error": "not found"})
+            return 404
+        if route == "job":
+            payload = json.dumps({"data": data.job_document(job)}, separators=(",", ":")).encode()
+            etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._reply(304, headers={"ETag": etag})
+                return 304
+            self._reply(200, headers={"ETag": etag}, payload=payload)
+        elif route == "subjects":
+            has_order = query.get("filter_has_order", [None])[0]
+            self._reply(200, {"data": data.subject_rows(
+                job, None if has_order is None else has_order == "true")})
+        elif route == "users":
+            rows = data.registrations(job)
+            page = int(query.get("page", ["1"])[0])
+            size = max(1, owner.config.users_page_size)
+            body: Dict[str, Any] = {"data": rows[(page - 1) * size:page * size]}
+            if page * size < len(rows):
+                body["meta"] = {"next": f"/jobs/{job.uuid}/users?page={page + 1}"}
+            self._reply(200, body)
+        elif route == "accesskeys":
+            key = data.access_key(job, args[1])
+            self._reply(200, {"data": [{"access_key": key}] if key else []})
+        else:
+            self._reply(404, {"error": "not found"})
+            return 404
+        return 200
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    owner: "MockPortalServer"
+
+
+class MockPortalServer:
+    """Threaded HTTP server over a synthetic dataset; use as a context manager"""
+
+    def __init__(self, config: Optional[MockPortalConfig] = None,
+                 dataset: Optional[Union[SyntheticDataset, DiskDataset]] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockPortalConfig()
+        self.data = dataset if dataset is not None else SyntheticDataset()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.owner = self
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        expected = None
+        if self.config.username is not None:
+            expected = "Basic " + base64.b64encode(
+                f"{self.config.username}:{self.config.password or ''}".encode()).decode()
+        self._authorization = expected
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url_template(self) -> str:
+        """Value for NETLIFE_BASE_URL_TEMPLATE"""
+        return self.url + "/{portal}/api/v1"
+
+    def base_url(self, portal: str) -> str:
+        return self.base_url_template.format(portal=portal)
+
+    def inject(self, authorization: Optional[str], path: str = "") -> Optional[int]:
+        """Sleep the configured latency, then pick an injected status (None = serve)"""
+        c = self.config
+        with self._lock:
+            delay = c.latency_ms + (self._rng.uniform(-1, 1) * c.latency_jitter_ms if c.latency_jitter_ms else 0)
+            roll = self._rng.random()
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if self._authorization is not None and authorization != self._authorization:
+            return 401
+        if c.fail_pattern and re.search(c.fail_pattern, path):
+            return 503
+        if roll < c.throttle_rate:
+            return 429
+        if roll < c.throttle_rate + c.error_rate:
+            return 503
+        return None
+
+    def record(self, route: Optional[str], status: int) -> None:
+        with self._lock:
+            self.requests[route or "unknown"] += 1
+            self.statuses[status] += 1
+
+    def start(self) -> "MockPortalServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-portal",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockPortalServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def write_secret(path: str, username: str = "mock", password: str = "mock",
+                 rate_limit_per_sec: int = 0) -> str:
+    """Secret JSON for NETLIFE_SECRET_ARN=file://<path>; returns that value"""
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"username": username, "password": password, "timeout_s": 30,
+                   "rate_limit_per_sec": rate_limit_per_sec}, fh)
+    return f"file://{path}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local mock Netlife portal API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--secret-file", help="Also write a credentials file for NETLIFE_SECRET_ARN=file://...")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small",
+                        help="Dataset size preset; the dataset options below override it")
+    parser.add_argument("--dataset-dir", help="Serve a campaign_core.synthetic dump instead of generating")
+    for field in fields(MockPortalConfig):
+        if field.name in ("seed", "username", "password"):
+            continue
+        parser.add_argument("--" + field.name.replace("_", "-"), type=type(field.default),
+                            default=field.default)
+    for field in fields(DatasetSpec):
+        parser.add_argument("--" + field.name.replace("_", "-"), type=type(field.default), default=None)
+    args = parser.parse_args(argv)
+    spec = replace(SCALES[args.scale], **{f.name: getattr(args, f.name) for f in fields(DatasetSpec)
+                                         if getattr(args, f.name) is not None})
+    config = MockPortalConfig(seed=spec.seed, **{f.name: getattr(args, f.name)
+                                                 for f in fields(MockPortalConfig)
+                                                 if f.name not in ("seed", "username", "password")})
+    dataset = DiskDataset(args.dataset_dir) if args.dataset_dir else SyntheticDataset(spec)
+    secret = None
+    if args.secret_file:
+        config.username = config.password = "mock"
+        secret = write_secret(args.secret_file)
+    server = MockPortalServer(config, dataset, args.host, args.port).start()
+    described = {"dataset_dir": args.dataset_dir} if args.dataset_dir else asdict(spec)
+    print(f"Mock portal listening on {server.url} with {json.dumps({**asdict(config), **described})}")
+    print(f"  export NETLIFE_BASE_URL_TEMPLATE='{server.base_url_template}'")
+    if secret:
+        print(f"  export NETLIFE_SECRET_ARN='{secret}'")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
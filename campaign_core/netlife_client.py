@@ -12,9 +12,11 @@ import time
 import json
 import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Set, Tuple
 from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 # Suppress urllib3 SSL warnings (we use verify=False intentionally for internal certs)
@@ -22,17 +24,151 @@ warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+from campaign_core.bounded_cache import BoundedCache
+from campaign_core.concurrency import AdaptiveConcurrencyLimiter
+from campaign_core.http_cache import ConditionalHTTPCache, http_cache_key
+from campaign_core.json_stream import (
+    HAVE_IJSON, JOB_DETAILS_SPEC, SUBJECTS_PAGE_SPEC, chunk_stream, loads_pruned,
+)
+from campaign_core.metrics import ApiMetrics, EmfSink, response_bytes
+from campaign_core.persistent_cache import PersistentCache
+from campaign_core.profiling import RunProfiler, endpoint_template
+from campaign_core.rate_limit import get_rate_limiter
 from campaign_core.config import (
     PERFORMANCE_CONFIG, API_ENDPOINTS, SMS_DEFAULTS, 
-    ACTIVITY_CONFIG, get_timestamp
+    ACTIVITY_CONFIG, CACHE_CONFIG, CLIENT_CACHE_CONFIG, get_timestamp
 )
 
 logger = logging.getLogger(__name__)
 
-class NetlifeAPIClient:
-    """Enhanced Netlife API client for SMS campaign data processing"""
+
+def _access_keys_from_response(response: Any) -> Any:
+    """Normalize an accesskeys response (list, {access_keys: [...]} or {data: [...]})"""
+    if not response:
+        return []
+    if isinstance(response, list):
+        return response
+    if isinstance(response, dict):
+        return response.get('access_keys', response.get('data', []))
+    return []
+
+
+def _first_access_key(access_keys: Any) -> Optional[str]:
+    """Extract the key value from the first entry of a normalized accesskeys list"""
+    if access_keys:
+        if isinstance(access_keys, list) and len(access_keys) > 0:
+            first_key = access_keys[0]
+            if isinstance(first_key, dict):
+                return first_key.get('access_key') or first_key.get('key')
+            return str(first_key)
+        elif isinstance(access_keys, str):
+            return access_keys
+    return None
+
+
+def _is_not_found(error: Exception) -> bool:
+    """True for an HTTP 404 raised by requests or httpx"""
+    return getattr(getattr(error, 'response', None), 'status_code', None) == 404
+
+
+def _unwrap_data(data: Any) -> Any:
+    """Handle Netlife API response format ({data: ...} envelope)"""
+    if isinstance(data, dict) and 'data' in data:
+        return data['data']
+    return data
+
+
+def _page_rows(p: Any) -> list:
+    """Rows of one page: {data:[...]} / {results:[...]} / raw list"""
+    if isinstance(p, list):
+        return p
+    if isinstance(p, dict):
+        if isinstance(p.get("data"), list):
+            return p["data"]
+        if isinstance(p.get("results"), list):
+            return p["results"]
+    return []
+
+
+def _next_page(p: Any) -> Optional[str]:
+    """meta.next / next link of a page (absolute or relative)"""
+    if not isinstance(p, dict):
+        return None
+    nxt = p.get("meta", {}).get("next") or p.get("next")
+    if not nxt:
+        return None
+    return nxt.strip()
+
+
+def _registered_users_from_rows(rows: list) -> dict[str, dict[str, str]]:
+    """/jobs/{job}/users rows → {subjectUuid: {userUuid, email}}"""
+    out: dict[str, dict[str, str]] = {}
+    for row in rows:
+        su = str((row.get("subjectUuid") or "")).strip()
+        uu = str((row.get("userUuid") or row.get("uuid") or "")).strip()
+        em = str((row.get("userUsername") or row.get("email") or "")).strip()
+        if su:
+            out[su] = {"userUuid": uu, "email": em.lower()}  # normalize email case
+    return out
+
+
+def _subjects_params(has_order: Optional[bool], include_images: bool,
+                     include_favorite: bool) -> Dict[str, str]:
+    """Query parameters for /jobs/{job}/subjects"""
+    params = {}
+    if has_order is True:
+        params['filter_has_order'] = 'true'
+    elif has_order is False:
+        params['filter_has_order'] = 'false'
+    if include_images:
+        params['include_images'] = 'true'
+    if include_favorite:
+        params['include_favorite_image'] = 'true'
+    return params
+
+
+def _audience_wants(audience: str) -> Tuple[bool, bool]:
+    """(need buyers, need non-buyers) for a --buyers / --non-buyers / --both audience"""
+    return audience in ('buyers', 'both'), audience in ('non-buyers', 'both')
+
+
+def _partition_by_has_order(subjects: List[Dict[str, Any]]
+                            ) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Split an unfiltered subject listing into (buyers, non_buyers) on has_order.
+
+    Returns None when any subject lacks the flag, so callers can fall back to the
+    server-side filtered listings instead of misclassifying everyone as a non-buyer.
+    """
+    if any('has_order' not in s for s in subjects):
+        return None
+    buyers = [s for s in subjects if s['has_order']]
+    non_buyers = [s for s in subjects if not s['has_order']]
+    return buyers, non_buyers
+
+
+def _normalize_list(value: Any) -> List[Dict[str, Any]]:
+    """Coerce an unwrapped list response (None / single object / list) to a list"""
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return value if isinstance(value, list) else []
+
+class IncompleteFetchError(RuntimeError):
+    """A listing a job depends on (subjects, registered users) failed or stopped part
+    way; raised instead of returning partial rows that would pass for the whole job"""
+
+
+class NetlifeClientBase:
+    """Transport-independent state shared by the sync and async Netlife clients:
+    URL handling, statistics, caches and the subject → activity mapping."""
     
-    def __init__(self, portal_name: str, base_url: str, username: str, password: str):
+    def __init__(self, portal_name: str, base_url: str,
+                 persistent_cache: Optional[PersistentCache] = None,
+                 http_cache: Optional[ConditionalHTTPCache] = None,
+                 cache_budgets: Optional[Dict[str, int]] = None,
+                 profiler: Optional[RunProfiler] = None,
+                 metrics_sink: Optional[EmfSink] = None):
         # Clean up the URL (copied from FMC pattern)
         base_url = base_url.rstrip('/')
         if base_url.endswith('/api/v1'):
@@ -40,9 +176,8 @@ class NetlifeAPIClient:
         
         self.portal_name = portal_name
         self.base_url = base_url
-        self.auth = HTTPBasicAuth(username, password)
-        self.session = requests.Session()
-        self.session.auth = self.auth
+        # Adaptive in-flight window; set by the transport-specific subclass
+        self._concurrency = None
         
         # Determine portal brand
         self.portal_brand = self._determine_portal_brand(portal_name)
@@ -68,16 +203,52 @@ class NetlifeAPIClient:
             'access_keys_failed': 0,
             'api_calls_total': 0,
             'api_calls_failed': 0,
+            'user_details_cache_hits': 0,
+            'user_details_cache_misses': 0,
+            'registrations_cache_hits': 0,
+            'registrations_cache_misses': 0,
+            'registrations_incomplete': 0,
+            'http_cache_hits': 0,
+            'http_cache_misses': 0,
+            'http_cache_bytes_saved': 0,
             'errors': []
         }
         
-        # Thread-safe caches
+        # Thread-safe caches, each an LRU bounded by approximate bytes (CLIENT_CACHE_CONFIG,
+        # overridable per cache name with cache_budgets)
         self._cache_lock = threading.Lock()
-        self._job_details_cache = {}
-        self._buyers_cache = {}
-        self._non_buyers_cache = {}
-        self._subjects_enriched_cache = {}
-        self._user_details_cache = {}  # NEW: Cache for user details
+        self._cache_budgets = {**CLIENT_CACHE_CONFIG, **(cache_budgets or {})}
+        self._job_details_cache = self._new_cache('job_details')
+        self._buyers_cache = self._new_cache('buyers')
+        self._non_buyers_cache = self._new_cache('non_buyers')
+        self._subjects_enriched_cache = self._new_cache('subjects_enriched')
+        self._user_details_cache = self._new_cache('user_details')  # NEW: Cache for user details
+        # Optional cross-run cache for user profiles and job registration maps
+        self._persistent_cache = persistent_cache
+        # Optional on-disk conditional-request cache for large documents (/jobs/{uuid})
+        self._http_cache = http_cache
+        # Optional --profile collector for per-endpoint timings
+        self._profiler = profiler
+        # Per-endpoint latency histograms, bytes, retries and 429s (EMF on log_final_stats)
+        self.metrics = ApiMetrics(portal_name)
+        self._metrics_sink = metrics_sink
+    
+    def _new_cache(self, name: str) -> BoundedCache:
+        """Create one of the in-process caches; override to plug in another policy"""
+        return BoundedCache(name, self._cache_budgets[name])
+    
+    def _memory_caches(self) -> List[BoundedCache]:
+        return [self._job_details_cache, self._buyers_cache, self._non_buyers_cache,
+                self._subjects_enriched_cache, self._user_details_cache]
+    
+    def release_job(self, job_uuid: str) -> None:
+        """Drop a processed job's heavy entries (job document and subject listings)"""
+        with self._cache_lock:
+            self._job_details_cache.discard(job_uuid)
+            self._buyers_cache.discard(job_uuid)
+            self._non_buyers_cache.discard(job_uuid)
+            self._subjects_enriched_cache.discard_matching(
+                lambda key: key.startswith(f"{job_uuid}_"))
     
     def _determine_portal_brand(self, portal_name: str) -> str:
         """Determine portal brand based on portal name"""
@@ -92,6 +263,423 @@ class NetlifeAPIClient:
         else:
             return 'Unknown'
     
+    @property
+    def origin(self) -> str:
+        # Always normalize to /api/v1
+        return self.base_url.rstrip("/") + "/api/v1"
+    
+    def _api_url(self, endpoint: str) -> str:
+        """Build a full /api/v1 URL for an endpoint (copied from FMC pattern)"""
+        if self.base_url.endswith('/api/v1'):
+            if endpoint.startswith('/api/v1'):
+                endpoint = endpoint[7:]
+            return f"{self.base_url}{endpoint}"
+        if not endpoint.startswith('/api/v1'):
+            endpoint = f"/api/v1{endpoint}"
+        return f"{self.base_url}{endpoint}"
+    
+    def _page_url(self, nxt: str) -> str:
+        """Resolve a meta.next link, keeping the same origin if relative"""
+        if nxt.startswith("/"):
+            return self.origin + nxt
+        if nxt.startswith("http"):
+            return nxt
+        return self.origin + nxt if not nxt.startswith("/api") else self.base_url.rstrip("/") + nxt
+    
+    def _cached_subjects(self, job_uuid: str, has_order: Optional[bool],
+                         cache_key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._cache_lock:
+            if has_order is True:
+                return self._buyers_cache.get(job_uuid)
+            elif has_order is False:
+                return self._non_buyers_cache.get(job_uuid)
+            return self._subjects_enriched_cache.get(cache_key)
+    
+    def _store_subjects(self, job_uuid: str, has_order: Optional[bool], cache_key: str,
+                        subjects: List[Dict[str, Any]]) -> None:
+        with self._cache_lock:
+            if has_order is True:
+                self._buyers_cache[job_uuid] = subjects
+            elif has_order is False:
+                self._non_buyers_cache[job_uuid] = subjects
+            else:
+                self._subjects_enriched_cache[cache_key] = subjects
+    
+    def _record_subject_counts(self, buyers: List[Dict[str, Any]],
+                               non_buyers: List[Dict[str, Any]]) -> None:
+        with self._stats_lock:
+            self.stats['subjects_buyers'] += len(buyers)
+            self.stats['subjects_non_buyers'] += len(non_buyers)
+            self.stats['subjects_total'] += len(buyers) + len(non_buyers)
+    
+    def _split_subjects(self, job_uuid: str, subjects: List[Dict[str, Any]]
+                        ) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """Partition one unfiltered listing and seed the buyer / non-buyer caches"""
+        split = _partition_by_has_order(subjects)
+        if split is None:
+            logger.warning(f"[{self.portal_name}] Subjects for job {job_uuid} carry no has_order flag; "
+                           f"falling back to filtered listings")
+            return None
+        buyers, non_buyers = split
+        with self._cache_lock:
+            self._buyers_cache[job_uuid] = buyers
+            self._non_buyers_cache[job_uuid] = non_buyers
+        return split
+    
+    def _cached_user_details(self, user_uuid: str) -> Optional[Dict]:
+        """User profile from the in-process or persistent cache (None on a miss)"""
+        with self._cache_lock:
+            user_data = self._user_details_cache.get(user_uuid)
+        if user_data is None and self._persistent_cache is not None:
+            user_data = self._persistent_cache.get('user_details', f"{self.portal_name}:{user_uuid}")
+            if user_data is not None:
+                with self._cache_lock:
+                    self._user_details_cache[user_uuid] = user_data
+        with self._stats_lock:
+            self.stats['user_details_cache_hits' if user_data is not None
+                       else 'user_details_cache_misses'] += 1
+        return user_data
+    
+    def _store_user_details(self, user_uuid: str, user_data: Dict) -> None:
+        with self._cache_lock:
+            self._user_details_cache[user_uuid] = user_data
+        if self._persistent_cache is not None:
+            self._persistent_cache.set('user_details', f"{self.portal_name}:{user_uuid}",
+                                       user_data, CACHE_CONFIG['user_details_ttl'])
+    
+    def _cached_registrations(self, job_uuid: str) -> Optional[dict[str, dict[str, str]]]:
+        """Job registration map from the persistent cache (None on a miss or when off)"""
+        if self._persistent_cache is None:
+            return None
+        registrations = self._persistent_cache.get('registrations', f"{self.portal_name}:{job_uuid}")
+        with self._stats_lock:
+            self.stats['registrations_cache_hits' if registrations is not None
+                       else 'registrations_cache_misses'] += 1
+        return registrations
+    
+    def _store_registrations(self, job_uuid: str, registrations: dict[str, dict[str, str]],
+                             complete: bool = True) -> None:
+        """Persist a job's registration map, unless a users page failed part way"""
+        if not complete:
+            logger.warning(f"[{self.portal_name}] Registered users for job {job_uuid} are incomplete "
+                           f"(a users page failed); not caching them")
+            with self._stats_lock:
+                self.stats['registrations_incomplete'] += 1
+            return
+        if self._persistent_cache is not None:
+            self._persistent_cache.set('registrations', f"{self.portal_name}:{job_uuid}",
+                                       registrations, CACHE_CONFIG['registrations_ttl'])
+    
+    def build_subject_activity_mapping(self, details_data: Dict[str, Any], 
+                                     subjects_enriched: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Set[str]]:
+        """Build mapping of subjects to activities from job details"""
+        # Helper functions for data processing
+        def _safe_str(v) -> str:
+            return "" if v is None else str(v).strip()
+        
+        def coerce_subjects_dict(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+            subs = data.get("subjects")
+            if subs is None and isinstance(data.get("job"), dict):
+                subs = data["job"].get("subjects")
+            if isinstance(subs, dict):
+                return subs
+            if isinstance(subs, list):
+                out = {}
+                for s in subs:
+                    su = _safe_str(s.get("uuid"))
+                    if su:
+                        out[su] = s
+                return out
+            return {}
+        
+        def coerce_images_dict(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+            imgs = data.get("images")
+            if isinstance(imgs, dict):
+                return imgs
+            if isinstance(imgs, list):
+                out = {}
+                for img in imgs:
+                    iu = _safe_str(img.get("uuid"))
+                    if iu:
+                        out[iu] = img
+                return out
+            return {}
+        
+        def extract_image_ids_from_subject(subj: Dict[str, Any]) -> List[str]:
+            out, seen = [], set()
+            
+            def add(u):
+                u = _safe_str(u)
+                if u and u not in seen:
+                    seen.add(u)
+                    out.append(u)
+            
+            def scan(v):
+                if v is None:
+                    return
+                if isinstance(v, list):
+                    for item in v:
+                        if isinstance(item, str):
+                            add(item)
+                        elif isinstance(item, dict):
+                            add(item.get("uuid"))
+                elif isinstance(v, dict):
+                    keys = list(v.keys())
+                    if keys and all(len(str(k)) >= 20 for k in keys):
+                        for k in keys:
+                            add(k)
+                    else:
+                        add(v.get("uuid"))
+                elif isinstance(v, str):
+                    add(v)
+            
+            scan(subj.get("images"))
+            scan(subj.get("group_images"))
+            scan(subj.get("image"))
+            for fav_key in ("favorite_image_uuid", "favoriteImageUuid", "favorite_image"):
+                fav = subj.get(fav_key)
+                if isinstance(fav, dict):
+                    add(fav.get("uuid"))
+                elif fav:
+                    add(fav)
+            return out
+        
+        def image_activity_uuid(img: Dict[str, Any]) -> str:
+            if not isinstance(img, dict):
+                return ""
+            act = img.get("activity") or {}
+            au = _safe_str(act.get("uuid")) if isinstance(act, dict) else ""
+            if not au:
+                au = _safe_str(img.get("activity_uuid") or img.get("activityUuid"))
+            return au
+        
+        # Build the mapping
+        subs_by_uuid = coerce_subjects_dict(details_data)
+        imgs_by_uuid = coerce_images_dict(details_data)
+        
+        # Enrich with subjects data if provided
+        if subjects_enriched:
+            for s in subjects_enriched:
+                su = _safe_str(s.get("uuid"))
+                if not su:
+                    continue
+                tgt = subs_by_uuid.setdefault(su, {})
+                for k in ("images", "group_images", "image", "favorite_image_uuid", "favoriteImageUuid", "favorite_image"):
+                    if k in s and s[k]:
+                        tgt[k] = s[k]
+        
+        mapping: Dict[str, Set[str]] = {}
+        for suuid, subj in subs_by_uuid.items():
+            acts = set()
+            direct = _safe_str(subj.get("activity_uuid") or subj.get("activity") or "")
+            if direct:
+                acts.add(direct)
+            for img_id in extract_image_ids_from_subject(subj):
+                img = imgs_by_uuid.get(img_id)
+                if img:
+                    au = image_activity_uuid(img)
+                    if au:
+                        acts.add(au)
+            if acts:
+                mapping[suuid] = acts
+        
+        return mapping
+    
+    def increment_job_processed(self):
+        """Thread-safe increment of jobs processed counter"""
+        with self._stats_lock:
+            self.stats['jobs_processed'] += 1
+    
+    def add_subject_stats(self, has_phone: bool = False, has_email: bool = False, has_images: bool = False):
+        """Thread-safe increment of subject statistics"""
+        with self._stats_lock:
+            if has_phone:
+                self.stats['subjects_with_phones'] += 1
+            if has_email:
+                self.stats['subjects_with_emails'] += 1
+            if has_images:
+                self.stats['subjects_with_images'] += 1
+    
+    def get_stats_summary(self) -> Dict[str, Any]:
+        """Get thread-safe copy of current statistics"""
+        with self._stats_lock:
+            stats_copy = self.stats.copy()
+            if self._concurrency is not None:
+                stats_copy.update(self._concurrency.snapshot())
+            stats_copy['memory_caches'] = {cache.name: cache.stats()
+                                           for cache in self._memory_caches()}
+            stats_copy['api_metrics'] = self.metrics.summary()
+            if 'start_time' in stats_copy:
+                duration = datetime.now() - stats_copy['start_time']
+                stats_copy['duration_seconds'] = duration.total_seconds()
+                stats_copy['duration_formatted'] = str(duration).split('.')[0]  # Remove microseconds
+            return stats_copy
+    
+    def log_final_stats(self):
+        """Log final statistics for this portal"""
+        stats = self.get_stats_summary()
+        
+        logger.info(f"\n{'='*60}")
+        logger.info(f"FINAL STATS - {self.portal_name} ({self.portal_brand})")
+        logger.info(f"{'='*60}")
+        logger.info(f"Duration: {stats.get('duration_formatted', 'Unknown')}")
+        logger.info(f"Activities Found: {stats['activities_found']}")
+        logger.info(f"Jobs Processed: {stats['jobs_processed']}")
+        logger.info(f"Subjects Total: {stats['subjects_total']}")
+        logger.info(f"  - Buyers: {stats['subjects_buyers']}")
+        logger.info(f"  - Non-Buyers: {stats['subjects_non_buyers']}")
+        logger.info(f"  - With Phones: {stats['subjects_with_phones']}")
+        logger.info(f"  - With Emails: {stats['subjects_with_emails']}")
+        logger.info(f"  - With Images: {stats['subjects_with_images']}")
+        
+        # NEW: Log registered user statistics
+        if stats['registered_users_checked'] > 0:
+            logger.info(f"Registered Users:")
+            logger.info(f"  - Checked: {stats['registered_users_checked']}")
+            logger.info(f"  - Found: {stats['registered_users_found']}")
+            percentage = (stats['registered_users_found'] / stats['registered_users_checked'] * 100) if stats['registered_users_checked'] > 0 else 0
+            logger.info(f"  - Rate: {percentage:.1f}%")
+        
+        logger.info(f"Access Keys:")
+        logger.info(f"  - Existing: {stats['access_keys_existing']}")
+        logger.info(f"  - Created: {stats['access_keys_created']}")
+        logger.info(f"  - Failed: {stats['access_keys_failed']}")
+        logger.info(f"API Calls:")
+        logger.info(f"  - Total: {stats['api_calls_total']}")
+        logger.info(f"  - Failed: {stats['api_calls_failed']}")
+        logger.info(f"Caches (hits/misses):")
+        logger.info(f"  - User Details: {stats['user_details_cache_hits']}/{stats['user_details_cache_misses']}")
+        logger.info(f"  - Registrations: {stats['registrations_cache_hits']}/{stats['registrations_cache_misses']}")
+        logger.info(f"  - HTTP 304s: {stats['http_cache_hits']}/{stats['http_cache_misses']} "
+                    f"({stats['http_cache_bytes_saved']} bytes saved)")
+        logger.info(f"Memory Caches (entries, ~MB now/peak/budget, evicted, released):")
+        for name, cache in stats['memory_caches'].items():
+            logger.info(f"  - {name}: {cache['entries']}, "
+                        f"{cache['bytes'] / 1024 ** 2:.1f}/{cache['peak_bytes'] / 1024 ** 2:.1f}/"
+                        f"{cache['max_bytes'] / 1024 ** 2:.0f}, "
+                        f"{cache['evictions']}, {cache['released']}")
+        if 'concurrency_window' in stats:
+            logger.info(f"Adaptive Concurrency:")
+            logger.info(f"  - Window: {stats['concurrency_window']} (peak {stats['concurrency_window_peak']})")
+            logger.info(f"  - Increases/Decreases: {stats['concurrency_increases']}/{stats['concurrency_decreases']}")
+            logger.info(f"  - Latency EWMA/Baseline: {stats['latency_ewma_ms']}ms/{stats['latency_baseline_ms']}ms")
+        if stats['api_metrics']:
+            logger.info(f"API Endpoints (requests, p50/p90/p99 ms, MB in, retries, 429s):")
+            for name, m in stats['api_metrics'].items():
+                logger.info(f"  - {'all' if name == '*' else name}: {m['Requests']}, "
+                            f"{m['LatencyP50']:.0f}/{m['LatencyP90']:.0f}/{m['LatencyP99']:.0f}, "
+                            f"{m['BytesIn'] / 1024 ** 2:.1f}, {m['Retries']}, {m['Throttled']}")
+        
+        if stats['errors']:
+            logger.warning(f"Errors encountered: {len(stats['errors'])}")
+            for error in stats['errors'][:5]:  # Show first 5 errors
+                logger.warning(f"  - {error}")
+        
+        logger.info(f"{'='*60}")
+        self.emit_metrics()
+    
+    def emit_metrics(self) -> None:
+        """Write this portal's API metrics to the EMF sink, if one is configured"""
+        if self._metrics_sink is None:
+            return
+        try:
+            self._metrics_sink.emit(self.metrics.emf_documents())
+        except OSError as e:
+            logger.warning(f"[{self.portal_name}] Could not emit API metrics: {e}")
+
+
+class NetlifeAPIClient(NetlifeClientBase):
+    """Enhanced Netlife API client for SMS campaign data processing"""
+    
+    def __init__(self, portal_name: str, base_url: str, username: str, password: str,
+                 pool_maxsize: Optional[int] = None, rate_limit_per_sec: Optional[float] = None,
+                 max_in_flight: Optional[int] = None,
+                 persistent_cache: Optional[PersistentCache] = None,
+                 http_cache: Optional[ConditionalHTTPCache] = None,
+                 cache_budgets: Optional[Dict[str, int]] = None,
+                 profiler: Optional[RunProfiler] = None,
+                 metrics_sink: Optional[EmfSink] = None):
+        super().__init__(portal_name, base_url, persistent_cache, http_cache, cache_budgets,
+                         profiler, metrics_sink)
+        self.auth = HTTPBasicAuth(username, password)
+        
+        # Concurrency-safe transport: one requests.Session per thread, all mounted on a
+        # shared HTTPAdapter so keep-alive connections are pooled per host and sized by config
+        self._adapter = HTTPAdapter(
+            pool_connections=PERFORMANCE_CONFIG['pool_connections'],
+            pool_maxsize=pool_maxsize or PERFORMANCE_CONFIG['pool_maxsize'],
+        )
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+        
+        # Shared token bucket for this portal host (secret's rate_limit_per_sec)
+        self._rate_limiter = get_rate_limiter(urlparse(self.base_url).netloc, rate_limit_per_sec)
+        # Adaptive in-flight window for this portal (AIMD on 429/5xx and latency)
+        self._concurrency = AdaptiveConcurrencyLimiter(max_limit=max_in_flight)
+        self._side_executor: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def _side_pool(self) -> ThreadPoolExecutor:
+        """Long-lived pool for work a job thread overlaps with its own request.
+
+        Reusing threads keeps the per-thread session count bounded across jobs.
+        """
+        with self._sessions_lock:
+            if self._side_executor is None:
+                self._side_executor = ThreadPoolExecutor(
+                    max_workers=PERFORMANCE_CONFIG['max_concurrent_jobs'],
+                    thread_name_prefix=f"{self.portal_name}-side")
+            return self._side_executor
+    
+    @property
+    def session(self) -> requests.Session:
+        """Session bound to the calling thread (requests.Session is not thread-safe)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.auth = self.auth
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+    
+    def close(self):
+        """Close every per-thread session and the shared connection pool"""
+        with self._sessions_lock:
+            side, self._side_executor = self._side_executor, None
+        if side is not None:
+            side.shutdown(wait=True)
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+    
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Single choke point for every HTTP call: rate limit, adaptive window, then send"""
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire()
+        self._concurrency.acquire()
+        status = None
+        bytes_in = 0
+        start = time.monotonic()
+        cpu_start = time.thread_time()
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = response.status_code
+            bytes_in = response_bytes(response, streamed=kwargs.get('stream', False))
+            return response
+        finally:
+            elapsed = time.monotonic() - start
+            self._concurrency.release(elapsed, status, f"{method} {endpoint_template(url)}")
+            self.metrics.record_response(method, url, status, elapsed, bytes_in)
+            if self._profiler is not None:
+                self._profiler.record_endpoint(method, url, elapsed,
+                                               time.thread_time() - cpu_start)
+    
     def test_connection(self) -> bool:
         """Test if the portal is accessible with provided credentials"""
         try:
@@ -105,35 +693,76 @@ class NetlifeAPIClient:
     
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Any:
         """Make API request with retry logic (enhanced from FMC)"""
-        # Handle URL construction (copied from FMC pattern)
-        if self.base_url.endswith('/api/v1'):
-            if endpoint.startswith('/api/v1'):
-                endpoint = endpoint[7:]
-            url = f"{self.base_url}{endpoint}"
-        else:
-            if not endpoint.startswith('/api/v1'):
-                endpoint = f"/api/v1{endpoint}"
-            url = f"{self.base_url}{endpoint}"
+        url = self._api_url(endpoint)
         
         max_retries = PERFORMANCE_CONFIG['retry_attempts']
         backoff = PERFORMANCE_CONFIG['retry_backoff']
-        timeout = PERFORMANCE_CONFIG['timeout']
+        timeout = kwargs.pop('timeout', None) or PERFORMANCE_CONFIG['timeout']
         
         with self._stats_lock:
             self.stats['api_calls_total'] += 1
+
+        # Conditional GET against the on-disk response cache (ETag / Last-Modified)
+        conditional = kwargs.pop('conditional', False) and self._http_cache is not None
+        cached = None
+        if conditional:
+            cache_key = http_cache_key(url, kwargs.get('params'))
+            cached = self._http_cache.lookup(cache_key)
+            if cached is not None:
+                kwargs['headers'] = {**kwargs.get('headers', {}), **cached.validators()}
+
+        # Large documents are decoded keeping only the fields named by a prune spec;
+        # with ijson they are parsed straight off the socket (unless the body is cached)
+        prune = kwargs.pop('prune', None)
+        stream_body = prune is not None and HAVE_IJSON and not conditional
         
         for attempt in range(max_retries):
+            if attempt:
+                self.metrics.record_retry(method, url)
             try:
-                response = self.session.request(method, url, **kwargs, timeout=timeout, verify=False)
-                response.raise_for_status()
+                response = self._send(method, url, **kwargs, timeout=timeout, verify=False,
+                                      stream=stream_body)
+                if cached is not None and response.status_code == 304:
+                    body = self._http_cache.revalidated(cached)
+                    if body is not None:
+                        with self._stats_lock:
+                            self.stats['http_cache_hits'] += 1
+                            self.stats['http_cache_bytes_saved'] += len(body)
+                        return _unwrap_data(loads_pruned(body, prune) if prune is not None
+                                            else json.loads(body))
+                    # Body vanished from disk: refetch unconditionally within this attempt,
+                    # so a 304 on the last attempt cannot end the loop with no response
+                    kwargs['headers'] = {k: v for k, v in kwargs['headers'].items()
+                                         if k not in ('If-None-Match', 'If-Modified-Since')}
+                    cached = None
+                    response = self._send(method, url, **kwargs, timeout=timeout, verify=False,
+                                          stream=stream_body)
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError:
+                    if stream_body:
+                        response.close()  # unread streamed body: hand the connection back
+                    raise
+                if conditional:
+                    self._http_cache.store(cache_key, response.content, response.headers)
+                    with self._stats_lock:
+                        self.stats['http_cache_misses'] += 1
                 
+                if stream_body:
+                    with response:
+                        body = chunk_stream(response.iter_content(PERFORMANCE_CONFIG['stream_chunk_size']))
+                        data = loads_pruned(body, prune)
+                        if 'Content-Length' not in response.headers:
+                            self.metrics.record_bytes(method, url, body.raw.bytes_read)
+                        return _unwrap_data(data)
+                if prune is not None and response.content:
+                    try:
+                        return _unwrap_data(loads_pruned(response.content, prune))
+                    except ValueError:
+                        return response.text
                 if response.content:
                     try:
-                        data = response.json()
-                        # Handle Netlife API response format
-                        if isinstance(data, dict) and 'data' in data:
-                            return data['data']
-                        return data
+                        return _unwrap_data(response.json())
                     except json.JSONDecodeError:
                         return response.text
                 return None
@@ -156,25 +785,22 @@ class NetlifeAPIClient:
                     raise
                 time.sleep(backoff ** attempt)
     
-
-    _lock = threading.Lock()
-
-    @property
-    def origin(self) -> str:
-        # Always normalize to /api/v1
-        return self.base_url.rstrip("/") + "/api/v1"
-
     def http_get(self, endpoint: str, params: dict | None = None, timeout: int = 30):
         """
         Robust GET with retries/backoff, tolerant JSON parsing, and endpoint trim.
         """
         endpoint = (endpoint or "").strip()  # fix '  /jobs/...'
         url = self.origin + endpoint  # do NOT double-join leading slashes
+        return self._get_json(url, params=params, timeout=timeout)
+
+    def _get_json(self, url: str, params: dict | None = None, timeout: int = 30):
+        """http_get's retry loop for an absolute URL (also used for meta.next pages)"""
         headers = {"Accept": "application/json", "Content-Type": "application/json"}
         for attempt in range(1, 4):
+            if attempt > 1:
+                self.metrics.record_retry('GET', url)
             try:
-                with self._lock:
-                    r = self.session.get(url, params=params, headers=headers, timeout=timeout, verify=False)
+                r = self._send('GET', url, params=params, headers=headers, timeout=timeout, verify=False)
                 if r.status_code == 429:
                     ra = r.headers.get("Retry-After")
                     if ra:
@@ -188,7 +814,7 @@ class NetlifeAPIClient:
                 r.raise_for_status()
                 # tolerant JSON decode
                 ct = (r.headers.get("content-type") or "").lower()
-                if "json" in ct or r.text.lstrip().startswith(("{", "[")):
+                if "json" in ct or r.content.lstrip().startswith((b"{", b"[")):
                     return r.json()
                 return None
             except requests.RequestException:
@@ -197,67 +823,41 @@ class NetlifeAPIClient:
                     continue
                 return None
 
-    def _paginate(self, first_page: dict | list) -> list[dict]:
+    def _paginate(self, first_page: dict | list) -> tuple[list[dict], bool]:
         """
         Flattens {data:[...], meta.next:?} / {results:[...]} / raw list pages into a list of rows.
-        Follows meta.next (absolute or relative).
+        Follows meta.next (absolute or relative). Returns (rows, complete): complete is
+        False when a later page could not be fetched and the rows stop short.
         """
         rows: list[dict] = []
-        def page_rows(p):
-            if isinstance(p, list):
-                return p
-            if isinstance(p, dict):
-                if isinstance(p.get("data"), list):
-                    return p["data"]
-                if isinstance(p.get("results"), list):
-                    return p["results"]
-            return []
-        def next_url(p):
-            if not isinstance(p, dict):
-                return None
-            nxt = p.get("meta", {}).get("next") or p.get("next")
-            if not nxt:
-                return None
-            # support absolute or relative
-            return nxt.strip()
-
         cur = first_page
-        rows.extend(page_rows(cur))
-        nxt = next_url(cur)
+        rows.extend(_page_rows(cur))
+        nxt = _next_page(cur)
         while nxt:
-            # keep same origin if relative
-            if nxt.startswith("/"):
-                url = self.origin + nxt
-            elif nxt.startswith("http"):
-                url = nxt
-            else:
-                url = self.origin + nxt if not nxt.startswith("/api") else self.base_url.rstrip("/") + nxt
-            with self._lock:
-                r = self.session.get(url, headers={"Accept":"application/json"}, timeout=30, verify=False)
-            if r.status_code != 200:
-                break
-            cur = r.json() if r.text.lstrip().startswith(("{","[")) else {}
-            rows.extend(page_rows(cur))
-            nxt = next_url(cur)
-        return rows
+            cur = self._get_json(self._page_url(nxt))
+            if cur is None:
+                return rows, False
+            rows.extend(_page_rows(cur))
+            nxt = _next_page(cur)
+        return rows, True
 
     def get_job_registered_users_map(self, job_uuid: str) -> dict[str, dict[str, str]]:
         """
         Bulk registrations: /jobs/{job}/users  → {subjectUuid: {userUuid, email}}
-        Handles shape + pagination.
+        Handles shape + pagination. Raises IncompleteFetchError when any page fails.
         """
+        cached = self._cached_registrations(job_uuid)
+        if cached is not None:
+            return cached
         first = self.http_get(f"/jobs/{job_uuid}/users")
         if first is None:
-            return {}
-        rows = self._paginate(first)
-        out: dict[str, dict[str, str]] = {}
-        for row in rows:
-            su = str((row.get("subjectUuid") or "")).strip()
-            uu = str((row.get("userUuid") or row.get("uuid") or "")).strip()
-            em = str((row.get("userUsername") or row.get("email") or "")).strip()
-            if su:
-                out[su] = {"userUuid": uu, "email": em.lower()}  # normalize email case
-        return out
+            raise IncompleteFetchError(f"registered users for job {job_uuid} could not be fetched")
+        rows, complete = self._paginate(first)
+        registrations = _registered_users_from_rows(rows)
+        self._store_registrations(job_uuid, registrations, complete)
+        if not complete:
+            raise IncompleteFetchError(f"registered users for job {job_uuid} stopped at a failed page")
+        return registrations
     
     def get_activities_in_webshop(self) -> List[Dict[str, Any]]:
         """Get all activities with status in-webshop"""
@@ -289,23 +889,19 @@ class NetlifeAPIClient:
     def get_job_details(self, job_uuid: str) -> Dict[str, Any]:
         """Get job details with caching and slow-path retry"""
         with self._cache_lock:
-            if job_uuid in self._job_details_cache:
-                return self._job_details_cache[job_uuid]
+            cached = self._job_details_cache.get(job_uuid)
+        if cached is not None:
+            return cached
         
         endpoint = API_ENDPOINTS['job_details'].format(job_uuid=job_uuid)
         
         try:
-            details = self._make_request('GET', endpoint)
+            details = self._make_request('GET', endpoint, conditional=True, prune=JOB_DETAILS_SPEC)
         except requests.exceptions.ReadTimeout:
             logger.warning(f"[{self.portal_name}] Slow-path retry for job {job_uuid} with extended timeout")
-            # Slow-path retry with extended timeout
-            old_timeout = PERFORMANCE_CONFIG['timeout']
-            try:
-                # Temporarily extend timeout for this request
-                self.session.timeout = 120
-                details = self._make_request('GET', endpoint)
-            finally:
-                self.session.timeout = old_timeout
+            # Slow-path retry with extended timeout (per request, so other threads keep the default)
+            details = self._make_request('GET', endpoint, conditional=True, prune=JOB_DETAILS_SPEC,
+                                          timeout=PERFORMANCE_CONFIG['slow_path_timeout'])
         
         details = details or {}
         
@@ -316,50 +912,28 @@ class NetlifeAPIClient:
     
     def get_job_subjects(self, job_uuid: str, has_order: Optional[bool] = None,
                         include_images: bool = False, include_favorite: bool = False) -> List[Dict[str, Any]]:
-        """Get subjects for a job with buyer filtering"""
+        """Get subjects for a job with buyer filtering (IncompleteFetchError on failure)"""
         cache_key = f"{job_uuid}_{has_order}_{include_images}_{include_favorite}"
         
-        with self._cache_lock:
-            if has_order is True and job_uuid in self._buyers_cache:
-                return self._buyers_cache[job_uuid]
-            elif has_order is False and job_uuid in self._non_buyers_cache:
-                return self._non_buyers_cache[job_uuid]
-            elif has_order is None and cache_key in self._subjects_enriched_cache:
-                return self._subjects_enriched_cache[cache_key]
-        
-        params = {}
-        if has_order is True:
-            params['filter_has_order'] = 'true'
-        elif has_order is False:
-            params['filter_has_order'] = 'false'
-        if include_images:
-            params['include_images'] = 'true'
-        if include_favorite:
-            params['include_favorite_image'] = 'true'
+        cached = self._cached_subjects(job_uuid, has_order, cache_key)
+        if cached is not None:
+            return cached
+        
+        params = _subjects_params(has_order, include_images, include_favorite)
         
         try:
             endpoint = API_ENDPOINTS['job_subjects'].format(job_uuid=job_uuid)
-            subjects = self._make_request('GET', endpoint, params=params)
-            
-            if not subjects:
-                subjects = []
-            elif isinstance(subjects, dict):
-                subjects = [subjects]
+            subjects = _normalize_list(self._make_request('GET', endpoint, params=params,
+                                                          prune=SUBJECTS_PAGE_SPEC))
             
             # Cache the results
-            with self._cache_lock:
-                if has_order is True:
-                    self._buyers_cache[job_uuid] = subjects
-                elif has_order is False:
-                    self._non_buyers_cache[job_uuid] = subjects
-                else:
-                    self._subjects_enriched_cache[cache_key] = subjects
+            self._store_subjects(job_uuid, has_order, cache_key, subjects)
             
             return subjects
             
         except Exception as e:
             logger.error(f"[{self.portal_name}] Error fetching subjects for job {job_uuid}: {e}")
-            return []
+            raise IncompleteFetchError(f"subjects listing for job {job_uuid} failed: {e}") from e
     
     # =============================================================================
     # NEW METHODS: Registered User Lookup
@@ -396,9 +970,9 @@ class NetlifeAPIClient:
     def get_user_details(self, user_uuid: str) -> Optional[Dict]:
         """Get detailed user information with caching"""
         # Check cache first
-        with self._cache_lock:
-            if user_uuid in self._user_details_cache:
-                return self._user_details_cache[user_uuid]
+        cached = self._cached_user_details(user_uuid)
+        if cached is not None:
+            return cached
         
         endpoint = f"/users/{user_uuid}"
         
@@ -407,8 +981,7 @@ class NetlifeAPIClient:
             
             if user_data and isinstance(user_data, dict):
                 # Cache the result
-                with self._cache_lock:
-                    self._user_details_cache[user_uuid] = user_data
+                self._store_user_details(user_uuid, user_data)
                 return user_data
             
             return None
@@ -421,240 +994,101 @@ class NetlifeAPIClient:
     # END NEW METHODS
     # =============================================================================
     
+    def _fetch_access_key(self, job_uuid: str, subject_uuid: str) -> Optional[str]:
+        """First existing access key of a subject, or None when the portal says it has
+        none (an empty listing or a 404). Raises when the portal could not answer
+        (timeouts, 5xx, retries exhausted), so a failure is never mistaken for "no key"."""
+        endpoint = API_ENDPOINTS['subject_access_keys'].format(
+            job_uuid=job_uuid, subject_uuid=subject_uuid
+        )
+        try:
+            response = self._make_request('GET', endpoint)
+        except requests.HTTPError as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+        access_keys = _access_keys_from_response(response)
+
+        # Track if we found existing keys
+        if access_keys:
+            with self._stats_lock:
+                self.stats['access_keys_existing'] += 1
+
+        return _first_access_key(access_keys)
+
+    def _access_key_failed(self, subject_name: str, error: Exception) -> None:
+        logger.error(f"[{self.portal_name}] Error with access key for {subject_name}: {error}")
+        with self._stats_lock:
+            self.stats['access_keys_failed'] += 1
+
     def get_or_create_access_key(self, job_uuid: str, subject_uuid: str, 
                                 subject_name: str, has_images: bool) -> Optional[str]:
-        """Get existing access key (read-only, no creation)"""
+        """Get existing access key (read-only, no creation); None when missing or on error"""
         try:
-            endpoint = API_ENDPOINTS['subject_access_keys'].format(
-                job_uuid=job_uuid, subject_uuid=subject_uuid
-            )
-            
-            # Get existing keys (read-only)
-            try:
-                response = self._make_request('GET', endpoint)
-            except Exception as get_error:
-                # If 404 or endpoint doesn't exist, return None
-                logger.debug(f"[{self.portal_name}] Access keys endpoint not available for {subject_name}: {get_error}")
-                return None
-            
-            access_keys = []
-            if response:
-                if isinstance(response, list):
-                    access_keys = response
-                elif isinstance(response, dict):
-                    access_keys = response.get('access_keys', response.get('data', []))
-            
-            # Track if we found existing keys
-            if access_keys:
-                with self._stats_lock:
-                    self.stats['access_keys_existing'] += 1
-            
-            # Extract the key value
-            if access_keys:
-                if isinstance(access_keys, list) and len(access_keys) > 0:
-                    first_key = access_keys[0]
-                    if isinstance(first_key, dict):
-                        return first_key.get('access_key') or first_key.get('key')
-                    return str(first_key)
-                elif isinstance(access_keys, str):
-                    return access_keys
-            
-            return None
-            
+            return self._fetch_access_key(job_uuid, subject_uuid)
         except Exception as e:
-            logger.error(f"[{self.portal_name}] Error with access key for {subject_name}: {e}")
-            with self._stats_lock:
-                self.stats['access_keys_failed'] += 1
+            self._access_key_failed(subject_name, e)
             return None
     
-    def get_buyers_and_non_buyers(self, job_uuid: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Get both buyers and non-buyers for a job efficiently"""
-        buyers = self.get_job_subjects(job_uuid, has_order=True)
-        non_buyers = self.get_job_subjects(job_uuid, has_order=False)
-        
-        with self._stats_lock:
-            self.stats['subjects_buyers'] += len(buyers)
-            self.stats['subjects_non_buyers'] += len(non_buyers)
-            self.stats['subjects_total'] += len(buyers) + len(non_buyers)
-        
-        return buyers, non_buyers
-    
-    def build_subject_activity_mapping(self, details_data: Dict[str, Any], 
-                                     subjects_enriched: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Set[str]]:
-        """Build mapping of subjects to activities from job details"""
-        # Helper functions for data processing
-        def _safe_str(v) -> str:
-            return "" if v is None else str(v).strip()
-        
-        def coerce_subjects_dict(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
-            subs = data.get("subjects")
-            if subs is None and isinstance(data.get("job"), dict):
-                subs = data["job"].get("subjects")
-            if isinstance(subs, dict):
-                return subs
-            if isinstance(subs, list):
-                out = {}
-                for s in subs:
-                    su = _safe_str(s.get("uuid"))
-                    if su:
-                        out[su] = s
-                return out
-            return {}
-        
-        def coerce_images_dict(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
-            imgs = data.get("images")
-            if isinstance(imgs, dict):
-                return imgs
-            if isinstance(imgs, list):
-                out = {}
-                for img in imgs:
-                    iu = _safe_str(img.get("uuid"))
-                    if iu:
-                        out[iu] = img
-                return out
+    def get_access_keys_bulk(self, job_uuid: str, subjects: List[Dict[str, Any]],
+                             max_workers: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """Resolve access keys for many subjects of one job with bounded parallelism.
+
+        The portal has no job-wide access-key listing, so this fans the per-subject
+        GETs out over a small thread pool instead of issuing them one by one.
+        Returns {subject_uuid: access_key or None}; subjects whose lookup failed are
+        left out, so callers can tell "no key" (cacheable) from "ask again later".
+        """
+        subjects = [s for s in subjects if s.get('uuid')]
+        if not subjects:
             return {}
         
-        def extract_image_ids_from_subject(subj: Dict[str, Any]) -> List[str]:
-            out, seen = [], set()
-            
-            def add(u):
-                u = _safe_str(u)
-                if u and u not in seen:
-                    seen.add(u)
-                    out.append(u)
-            
-            def scan(v):
-                if v is None:
-                    return
-                if isinstance(v, list):
-                    for item in v:
-                        if isinstance(item, str):
-                            add(item)
-                        elif isinstance(item, dict):
-                            add(item.get("uuid"))
-                elif isinstance(v, dict):
-                    keys = list(v.keys())
-                    if keys and all(len(str(k)) >= 20 for k in keys):
-                        for k in keys:
-                            add(k)
-                    else:
-                        add(v.get("uuid"))
-                elif isinstance(v, str):
-                    add(v)
-            
-            scan(subj.get("images"))
-            scan(subj.get("group_images"))
-            scan(subj.get("image"))
-            for fav_key in ("favorite_image_uuid", "favoriteImageUuid", "favorite_image"):
-                fav = subj.get(fav_key)
-                if isinstance(fav, dict):
-                    add(fav.get("uuid"))
-                elif fav:
-                    add(fav)
-            return out
-        
-        def image_activity_uuid(img: Dict[str, Any]) -> str:
-            if not isinstance(img, dict):
-                return ""
-            act = img.get("activity") or {}
-            au = _safe_str(act.get("uuid")) if isinstance(act, dict) else ""
-            if not au:
-                au = _safe_str(img.get("activity_uuid") or img.get("activityUuid"))
-            return au
-        
-        # Build the mapping
-        subs_by_uuid = coerce_subjects_dict(details_data)
-        imgs_by_uuid = coerce_images_dict(details_data)
+        def resolve(subject: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+            try:
+                return True, self._fetch_access_key(job_uuid, subject['uuid'])
+            except Exception as e:
+                self._access_key_failed(subject.get('name', ''), e)
+                return False, None
         
-        # Enrich with subjects data if provided
-        if subjects_enriched:
-            for s in subjects_enriched:
-                su = _safe_str(s.get("uuid"))
-                if not su:
-                    continue
-                tgt = subs_by_uuid.setdefault(su, {})
-                for k in ("images", "group_images", "image", "favorite_image_uuid", "favoriteImageUuid", "favorite_image"):
-                    if k in s and s[k]:
-                        tgt[k] = s[k]
+        workers = max(1, min(max_workers or PERFORMANCE_CONFIG['access_key_workers'], len(subjects)))
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix=f"{self.portal_name}-keys") as pool:
+            results = list(pool.map(resolve, subjects))
         
-        mapping: Dict[str, Set[str]] = {}
-        for suuid, subj in subs_by_uuid.items():
-            acts = set()
-            direct = _safe_str(subj.get("activity_uuid") or subj.get("activity") or "")
-            if direct:
-                acts.add(direct)
-            for img_id in extract_image_ids_from_subject(subj):
-                img = imgs_by_uuid.get(img_id)
-                if img:
-                    au = image_activity_uuid(img)
-                    if au:
-                        acts.add(au)
-            if acts:
-                mapping[suuid] = acts
-        
-        return mapping
-    
-    def increment_job_processed(self):
-        """Thread-safe increment of jobs processed counter"""
-        with self._stats_lock:
-            self.stats['jobs_processed'] += 1
-    
-    def add_subject_stats(self, has_phone: bool = False, has_email: bool = False, has_images: bool = False):
-        """Thread-safe increment of subject statistics"""
-        with self._stats_lock:
-            if has_phone:
-                self.stats['subjects_with_phones'] += 1
-            if has_email:
-                self.stats['subjects_with_emails'] += 1
-            if has_images:
-                self.stats['subjects_with_images'] += 1
-    
-    def get_stats_summary(self) -> Dict[str, Any]:
-        """Get thread-safe copy of current statistics"""
-        with self._stats_lock:
-            stats_copy = self.stats.copy()
-            if 'start_time' in stats_copy:
-                duration = datetime.now() - stats_copy['start_time']
-                stats_copy['duration_seconds'] = duration.total_seconds()
-                stats_copy['duration_formatted'] = str(duration).split('.')[0]  # Remove microseconds
-            return stats_copy
+        keys = {s['uuid']: key for s, (ok, key) in zip(subjects, results) if ok}
+        logger.info(f"[{self.portal_name}] Resolved {sum(1 for k in keys.values() if k)}/{len(subjects)} "
+                    f"access keys for job {job_uuid} ({len(subjects) - len(keys)} lookups failed)")
+        return keys
     
-    def log_final_stats(self):
-        """Log final statistics for this portal"""
-        stats = self.get_stats_summary()
-        
-        logger.info(f"\n{'='*60}")
-        logger.info(f"FINAL STATS - {self.portal_name} ({self.portal_brand})")
-        logger.info(f"{'='*60}")
-        logger.info(f"Duration: {stats.get('duration_formatted', 'Unknown')}")
-        logger.info(f"Activities Found: {stats['activities_found']}")
-        logger.info(f"Jobs Processed: {stats['jobs_processed']}")
-        logger.info(f"Subjects Total: {stats['subjects_total']}")
-        logger.info(f"  - Buyers: {stats['subjects_buyers']}")
-        logger.info(f"  - Non-Buyers: {stats['subjects_non_buyers']}")
-        logger.info(f"  - With Phones: {stats['subjects_with_phones']}")
-        logger.info(f"  - With Emails: {stats['subjects_with_emails']}")
-        logger.info(f"  - With Images: {stats['subjects_with_images']}")
+    def get_buyers_and_non_buyers(self, job_uuid: str, audience: str = 'both',
+                                  split_locally: Optional[bool] = None
+                                  ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Get the buyer / non-buyer subject lists a job's audience needs.
+
+        Only the listings the audience asks for are fetched (the other side comes back
+        empty). For 'both' the two filtered listings run concurrently, or - with
+        split_locally - one unfiltered listing is partitioned on has_order.
+        """
+        want_buyers, want_non_buyers = _audience_wants(audience)
+        if split_locally is None:
+            split_locally = PERFORMANCE_CONFIG['split_subjects_locally']
         
-        # NEW: Log registered user statistics
-        if stats['registered_users_checked'] > 0:
-            logger.info(f"Registered Users:")
-            logger.info(f"  - Checked: {stats['registered_users_checked']}")
-            logger.info(f"  - Found: {stats['registered_users_found']}")
-            percentage = (stats['registered_users_found'] / stats['registered_users_checked'] * 100) if stats['registered_users_checked'] > 0 else 0
-            logger.info(f"  - Rate: {percentage:.1f}%")
+        split = None
+        if want_buyers and want_non_buyers and split_locally:
+            split = self._split_subjects(job_uuid, self.get_job_subjects(job_uuid))
         
-        logger.info(f"Access Keys:")
-        logger.info(f"  - Existing: {stats['access_keys_existing']}")
-        logger.info(f"  - Created: {stats['access_keys_created']}")
-        logger.info(f"  - Failed: {stats['access_keys_failed']}")
-        logger.info(f"API Calls:")
-        logger.info(f"  - Total: {stats['api_calls_total']}")
-        logger.info(f"  - Failed: {stats['api_calls_failed']}")
-        
-        if stats['errors']:
-            logger.warning(f"Errors encountered: {len(stats['errors'])}")
-            for error in stats['errors'][:5]:  # Show first 5 errors
-                logger.warning(f"  - {error}")
+        if split is not None:
+            buyers, non_buyers = split
+        elif want_buyers and want_non_buyers:
+            # Non-buyers on a pooled side thread, buyers on the calling thread
+            pending = self._side_pool.submit(self.get_job_subjects, job_uuid, False)
+            buyers = self.get_job_subjects(job_uuid, has_order=True)
+            non_buyers = pending.result()
+        else:
+            buyers = self.get_job_subjects(job_uuid, has_order=True) if want_buyers else []
+            non_buyers = self.get_job_subjects(job_uuid, has_order=False) if want_non_buyers else []
         
-        logger.info(f"{'='*60}")
+        self._record_subject_counts(buyers, non_buyers)
+        return buyers, non_buyers
+    
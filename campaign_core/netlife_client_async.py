@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Async Netlife API Client for SMS Campaigns
+asyncio counterpart of NetlifeAPIClient built on httpx with HTTP/2 multiplexing:
+one client (and, with HTTP/2, one connection) per portal carries hundreds of small
+requests concurrently without a thread per request. Return shapes match the sync client.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from campaign_core.concurrency import AsyncAdaptiveConcurrencyLimiter
+from campaign_core.config import ACTIVITY_CONFIG, API_ENDPOINTS, PERFORMANCE_CONFIG
+from campaign_core.netlife_client import (
+    IncompleteFetchError,
+    NetlifeClientBase,
+    _access_keys_from_response,
+    _audience_wants,
+    _first_access_key,
+    _is_not_found,
+    _next_page,
+    _normalize_list,
+    _page_rows,
+    _registered_users_from_rows,
+    _subjects_params,
+    _unwrap_data,
+)
+from campaign_core.http_cache import ConditionalHTTPCache, http_cache_key
+from campaign_core.json_stream import JOB_DETAILS_SPEC, SUBJECTS_PAGE_SPEC, loads_pruned
+from campaign_core.metrics import EmfSink, response_bytes
+from campaign_core.persistent_cache import PersistentCache
+from campaign_core.profiling import RunProfiler, endpoint_template
+from campaign_core.rate_limit import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+async def _empty_list() -> List[Dict[str, Any]]:
+    return []
+
+
+class AsyncNetlifeAPIClient(NetlifeClientBase):
+    """Async Netlife API client; use as `async with AsyncNetlifeAPIClient(...) as client`"""
+
+    def __init__(self, portal_name: str, base_url: str, username: str, password: str,
+                 rate_limit_per_sec: Optional[float] = None,
+                 max_in_flight: Optional[int] = None, http2: bool = True,
+                 persistent_cache: Optional[PersistentCache] = None,
+                 http_cache: Optional[ConditionalHTTPCache] = None,
+                 cache_budgets: Optional[Dict[str, int]] = None,
+                 profiler: Optional[RunProfiler] = None,
+                 metrics_sink: Optional[EmfSink] = None):
+        super().__init__(portal_name, base_url, persistent_cache, http_cache, cache_budgets,
+                         profiler, metrics_sink)
+        # Adaptive in-flight window for this portal (AIMD on 429/5xx and latency)
+        self._concurrency = AsyncAdaptiveConcurrencyLimiter(max_limit=max_in_flight)
+        self._rate_limiter = get_rate_limiter(urlparse(self.base_url).netloc, rate_limit_per_sec)
+        # With HTTP/2 every request multiplexes over one connection; the connection cap
+        # only matters when a portal falls back to HTTP/1.1
+        max_connections = self._concurrency.max_limit
+        self._client = httpx.AsyncClient(
+            auth=httpx.BasicAuth(username, password),
+            http2=http2,
+            verify=False,
+            timeout=PERFORMANCE_CONFIG['timeout'],
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            headers={"Accept": "application/json", "Accept-Encoding": "gzip"},
+        )
+
+    async def __aenter__(self) -> "AsyncNetlifeAPIClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self):
+        """Close the underlying HTTP/2 connection pool"""
+        await self._client.aclose()
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Single choke point for every HTTP call: rate limit, adaptive window, then send"""
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire_async()
+        await self._concurrency.acquire()
+        status = None
+        bytes_in = 0
+        start = time.monotonic()
+        try:
+            response = await self._client.request(method, url, **kwargs)
+            status = response.status_code
+            bytes_in = response_bytes(response)
+            return response
+        finally:
+            elapsed = time.monotonic() - start
+            await self._concurrency.release(elapsed, status, f"{method} {endpoint_template(url)}")
+            self.metrics.record_response(method, url, status, elapsed, bytes_in)
+            if self._profiler is not None:
+                # Other tasks run on the loop meanwhile, so no per-request CPU time
+                self._profiler.record_endpoint(method, url, elapsed)
+
+    async def test_connection(self) -> bool:
+        """Test if the portal is accessible with provided credentials"""
+        try:
+            await self._make_request('GET', API_ENDPOINTS['activities_search'],
+                                     params={'status_id': ACTIVITY_CONFIG['target_status']})
+            logger.info(f"[{self.portal_name}] Connection test successful")
+            return True
+        except Exception as e:
+            logger.warning(f"[{self.portal_name}] Connection test failed: {e}")
+            return False
+
+    async def _make_request(self, method: str, endpoint: str, **kwargs) -> Any:
+        """Make API request with retry logic (same semantics as NetlifeAPIClient._make_request)"""
+        url = self._api_url(endpoint)
+
+        max_retries = PERFORMANCE_CONFIG['retry_attempts']
+        backoff = PERFORMANCE_CONFIG['retry_backoff']
+        timeout = kwargs.pop('timeout', None) or PERFORMANCE_CONFIG['timeout']
+
+        with self._stats_lock:
+            self.stats['api_calls_total'] += 1
+
+        # Conditional GET against the on-disk response cache (ETag / Last-Modified)
+        conditional = kwargs.pop('conditional', False) and self._http_cache is not None
+        cached = None
+        if conditional:
+            cache_key = http_cache_key(url, kwargs.get('params'))
+            cached = self._http_cache.lookup(cache_key)
+            if cached is not None:
+                kwargs['headers'] = {**kwargs.get('headers', {}), **cached.validators()}
+        # Large documents keep only the fields named by a prune spec (see json_stream)
+        prune = kwargs.pop('prune', None)
+
+        for attempt in range(max_retries):
+            if attempt:
+                self.metrics.record_retry(method, url)
+            try:
+                response = await self._send(method, url, **kwargs, timeout=timeout)
+                if cached is not None and response.status_code == 304:
+                    # Disk reads and writes of cached bodies run off the event loop
+                    body = await asyncio.to_thread(self._http_cache.revalidated, cached)
+                    if body is not None:
+                        with self._stats_lock:
+                            self.stats['http_cache_hits'] += 1
+                            self.stats['http_cache_bytes_saved'] += len(body)
+                        return _unwrap_data(loads_pruned(body, prune) if prune is not None
+                                            else json.loads(body))
+                    # Body vanished from disk: refetch unconditionally within this attempt,
+                    # so a 304 on the last attempt cannot end the loop with no response
+                    kwargs['headers'] = {k: v for k, v in kwargs['headers'].items()
+                                         if k not in ('If-None-Match', 'If-Modified-Since')}
+                    cached = None
+                    response = await self._send(method, url, **kwargs, timeout=timeout)
+                response.raise_for_status()
+                if conditional:
+                    await asyncio.to_thread(self._http_cache.store, cache_key,
+                                            response.content, response.headers)
+                    with self._stats_lock:
+                        self.stats['http_cache_misses'] += 1
+
+                if prune is not None and response.content:
+                    try:
+                        return _unwrap_data(loads_pruned(response.content, prune))
+                    except ValueError:
+                        return response.text
+                if response.content:
+                    try:
+                        return _unwrap_data(response.json())
+                    except json.JSONDecodeError:
+                        return response.text
+                return None
+
+            except httpx.TimeoutException:
+                logger.warning(f"[{self.portal_name}] Request timeout (attempt {attempt + 1}/{max_retries}) - {endpoint}")
+                if attempt == max_retries - 1:
+                    with self._stats_lock:
+                        self.stats['api_calls_failed'] += 1
+                        self.stats['errors'].append(f"Timeout: {endpoint}")
+                    raise
+                await asyncio.sleep(backoff ** attempt)
+
+            except httpx.HTTPError as e:
+                logger.warning(f"[{self.portal_name}] Request failed (attempt {attempt + 1}/{max_retries}): {e}")
+                if attempt == max_retries - 1:
+                    with self._stats_lock:
+                        self.stats['api_calls_failed'] += 1
+                        self.stats['errors'].append(f"Request failed: {endpoint} - {str(e)}")
+                    raise
+                await asyncio.sleep(backoff ** attempt)
+
+    async def http_get(self, endpoint: str, params: dict | None = None, timeout: int = 30):
+        """
+        Robust GET with retries/backoff, tolerant JSON parsing, and endpoint trim.
+        """
+        endpoint = (endpoint or "").strip()
+        return await self._get_json(self.origin + endpoint, params=params, timeout=timeout)
+
+    async def _get_json(self, url: str, params: dict | None = None, timeout: int = 30):
+        """http_get's retry loop for an absolute URL (also used for meta.next pages)"""
+        for attempt in range(1, 4):
+            if attempt > 1:
+                self.metrics.record_retry('GET', url)
+            try:
+                r = await self._send('GET', url, params=params, timeout=timeout)
+                if r.status_code == 429:
+                    ra = r.headers.get("Retry-After")
+                    if ra:
+                        await asyncio.sleep(min(int(ra), 30))
+                    # jittered backoff
+                    await asyncio.sleep(min(12, 0.75 * (2 ** (attempt - 1))) + random.random() * 0.5)
+                    continue
+                if r.status_code >= 500 and attempt < 3:
+                    await asyncio.sleep(min(12, 0.75 * (2 ** (attempt - 1))) + random.random() * 0.5)
+                    continue
+                r.raise_for_status()
+                # tolerant JSON decode
+                ct = (r.headers.get("content-type") or "").lower()
+                if "json" in ct or r.content.lstrip().startswith((b"{", b"[")):
+                    return r.json()
+                return None
+            except httpx.HTTPError:
+                if attempt < 3:
+                    await asyncio.sleep(min(12, 0.75 * (2 ** (attempt - 1))) + random.random() * 0.5)
+                    continue
+                return None
+
+    async def _paginate(self, first_page: dict | list) -> tuple[list[dict], bool]:
+        """
+        Flattens {data:[...], meta.next:?} / {results:[...]} / raw list pages into a list of rows.
+        Follows meta.next (absolute or relative). Returns (rows, complete), like the sync client.
+        """
+        rows: list[dict] = []
+        cur = first_page
+        rows.extend(_page_rows(cur))
+        nxt = _next_page(cur)
+        while nxt:
+            cur = await self._get_json(self._page_url(nxt))
+            if cur is None:
+                return rows, False
+            rows.extend(_page_rows(cur))
+            nxt = _next_page(cur)
+        return rows, True
+
+    async def get_job_registered_users_map(self, job_uuid: str) -> dict[str, dict[str, str]]:
+        """
+        Bulk registrations: /jobs/{job}/users  → {subjectUuid: {userUuid, email}}
+        Handles shape + pagination; raises IncompleteFetchError when any page fails.
+        Persistent-cache reads and writes (SQLite) run off the event loop.
+        """
+        cached = await asyncio.to_thread(self._cached_registrations, job_uuid)
+        if cached is not None:
+            return cached
+        first = await self.http_get(f"/jobs/{job_uuid}/users")
+        if first is None:
+            raise IncompleteFetchError(f"registered users for job {job_uuid} could not be fetched")
+        rows, complete = await self._paginate(first)
+        registrations = _registered_users_from_rows(rows)
+        await asyncio.to_thread(self._store_registrations, job_uuid, registrations, complete)
+        if not complete:
+            raise IncompleteFetchError(f"registered users for job {job_uuid} stopped at a failed page")
+        return registrations
+
+    async def get_activities_in_webshop(self) -> List[Dict[str, Any]]:
+        """Get all activities with status in-webshop"""
+        logger.info(f"[{self.portal_name}] Fetching activities with status '{ACTIVITY_CONFIG['target_status']}'...")
+
+        try:
+            activities = _normalize_list(await self._make_request(
+                'GET', API_ENDPOINTS['activities_search'],
+                params={'status_id': ACTIVITY_CONFIG['target_status']}))
+
+            if not activities:
+                logger.info(f"[{self.portal_name}] No activities found")
+                return []
+
+            with self._stats_lock:
+                self.stats['activities_found'] = len(activities)
+
+            logger.info(f"[{self.portal_name}] Found {len(activities)} activities")
+            return activities
+
+        except Exception as e:
+            logger.error(f"[{self.portal_name}] Error fetching activities: {e}")
+            return []
+
+    async def get_job_details(self, job_uuid: str) -> Dict[str, Any]:
+        """Get job details with caching and slow-path retry"""
+        with self._cache_lock:
+            cached = self._job_details_cache.get(job_uuid)
+        if cached is not None:
+            return cached
+
+        endpoint = API_ENDPOINTS['job_details'].format(job_uuid=job_uuid)
+
+        try:
+            details = await self._make_request('GET', endpoint, conditional=True,
+                                               prune=JOB_DETAILS_SPEC)
+        except httpx.ReadTimeout:
+            logger.warning(f"[{self.portal_name}] Slow-path retry for job {job_uuid} with extended timeout")
+            details = await self._make_request('GET', endpoint, conditional=True,
+                                               prune=JOB_DETAILS_SPEC,
+                                          timeout=PERFORMANCE_CONFIG['slow_path_timeout'])
+
+        details = details or {}
+
+        with self._cache_lock:
+            self._job_details_cache[job_uuid] = details
+
+        return details
+
+    async def get_job_subjects(self, job_uuid: str, has_order: Optional[bool] = None,
+                               include_images: bool = False, include_favorite: bool = False) -> List[Dict[str, Any]]:
+        """Get subjects for a job with buyer filtering"""
+        cache_key = f"{job_uuid}_{has_order}_{include_images}_{include_favorite}"
+
+        cached = self._cached_subjects(job_uuid, has_order, cache_key)
+        if cached is not None:
+            return cached
+
+        params = _subjects_params(has_order, include_images, include_favorite)
+
+        try:
+            endpoint = API_ENDPOINTS['job_subjects'].format(job_uuid=job_uuid)
+            subjects = _normalize_list(await self._make_request('GET', endpoint, params=params,
+                                                                prune=SUBJECTS_PAGE_SPEC))
+            self._store_subjects(job_uuid, has_order, cache_key, subjects)
+            return subjects
+
+        except Exception as e:
+            logger.error(f"[{self.portal_name}] Error fetching subjects for job {job_uuid}: {e}")
+            raise IncompleteFetchError(f"subjects listing for job {job_uuid} failed: {e}") from e
+
+    async def get_registered_users(self, job_uuid: str, subject_uuid: str) -> List[Dict]:
+        """Get registered users for a subject"""
+        endpoint = f"/jobs/{job_uuid}/subjects/{subject_uuid}/users"
+
+        try:
+            users_data = await self._make_request('GET', endpoint)
+
+            with self._stats_lock:
+                self.stats['registered_users_checked'] += 1
+
+            if not users_data or not isinstance(users_data, dict):
+                return []
+
+            if not users_data.get('success', False):
+                return []
+
+            users = users_data.get('data', [])
+
+            if users and isinstance(users, list):
+                with self._stats_lock:
+                    self.stats['registered_users_found'] += 1
+
+            return users if isinstance(users, list) else []
+
+        except Exception as e:
+            logger.debug(f"[{self.portal_name}] Error fetching registered users for subject {subject_uuid}: {e}")
+            return []
+
+    async def get_user_details(self, user_uuid: str) -> Optional[Dict]:
+        """Get detailed user information with caching (cache I/O off the event loop)"""
+        cached = await asyncio.to_thread(self._cached_user_details, user_uuid)
+        if cached is not None:
+            return cached
+
+        try:
+            user_data = await self._make_request('GET', f"/users/{user_uuid}")
+
+            if user_data and isinstance(user_data, dict):
+                await asyncio.to_thread(self._store_user_details, user_uuid, user_data)
+                return user_data
+
+            return None
+
+        except Exception as e:
+            logger.debug(f"[{self.portal_name}] Error fetching user details for {user_uuid}: {e}")
+            return None
+
+    async def _fetch_access_key(self, job_uuid: str, subject_uuid: str) -> Optional[str]:
+        """First existing access key, or None when the subject has none; raises on failure"""
+        endpoint = API_ENDPOINTS['subject_access_keys'].format(
+            job_uuid=job_uuid, subject_uuid=subject_uuid
+        )
+        try:
+            response = await self._make_request('GET', endpoint)
+        except httpx.HTTPStatusError as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+        access_keys = _access_keys_from_response(response)
+
+        if access_keys:
+            with self._stats_lock:
+                self.stats['access_keys_existing'] += 1
+
+        return _first_access_key(access_keys)
+
+    def _access_key_failed(self, subject_name: str, error: Exception) -> None:
+        logger.error(f"[{self.portal_name}] Error with access key for {subject_name}: {error}")
+        with self._stats_lock:
+            self.stats['access_keys_failed'] += 1
+
+    async def get_or_create_access_key(self, job_uuid: str, subject_uuid: str,
+                                       subject_name: str, has_images: bool) -> Optional[str]:
+        """Get existing access key (read-only, no creation); None when missing or on error"""
+        try:
+            return await self._fetch_access_key(job_uuid, subject_uuid)
+        except Exception as e:
+            self._access_key_failed(subject_name, e)
+            return None
+
+    async def get_access_keys_bulk(self, job_uuid: str, subjects: List[Dict[str, Any]],
+                                   max_workers: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """Resolve access keys for many subjects of one job as bounded concurrent tasks.
+        Returns {subject_uuid: access_key or None}; failed lookups are left out."""
+        subjects = [s for s in subjects if s.get('uuid')]
+        if not subjects:
+            return {}
+
+        sem = asyncio.Semaphore(max(1, max_workers or PERFORMANCE_CONFIG['access_key_workers']))
+
+        async def resolve(subject: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+            async with sem:
+                try:
+                    return True, await self._fetch_access_key(job_uuid, subject['uuid'])
+                except Exception as e:
+                    self._access_key_failed(subject.get('name', ''), e)
+                    return False, None
+
+        results = await asyncio.gather(*(resolve(s) for s in subjects))
+
+        keys = {s['uuid']: key for s, (ok, key) in zip(subjects, results) if ok}
+        logger.info(f"[{self.portal_name}] Resolved {sum(1 for k in keys.values() if k)}/{len(subjects)} "
+                    f"access keys for job {job_uuid} ({len(subjects) - len(keys)} lookups failed)")
+        return keys
+
+    async def get_buyers_and_non_buyers(self, job_uuid: str, audience: str = 'both',
+                                        split_locally: Optional[bool] = None
+                                        ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Get the buyer / non-buyer subject lists a job's audience needs
+        (see NetlifeAPIClient.get_buyers_and_non_buyers); both listings run at once."""
+        want_buyers, want_non_buyers = _audience_wants(audience)
+        if split_locally is None:
+            split_locally = PERFORMANCE_CONFIG['split_subjects_locally']
+
+        split = None
+        if want_buyers and want_non_buyers and split_locally:
+            split = self._split_subjects(job_uuid, await self.get_job_subjects(job_uuid))
+
+        if split is not None:
+            buyers, non_buyers = split
+        else:
+            buyers, non_buyers = await asyncio.gather(
+                self.get_job_subjects(job_uuid, has_order=True) if want_buyers else _empty_list(),
+                self.get_job_subjects(job_uuid, has_order=False) if want_non_buyers else _empty_list(),
+            )
+
+        self._record_subject_counts(buyers, non_buyers)
+        return buyers, non_buyers
@@ -0,0 +1,258 @@
+# campaign_core/output.py
+"""
+Streaming CSV output for campaign datasets.
+
+Rows are written through the csv module as each job finishes, so memory stays
+bounded by one job rather than the whole run, and commas or quotes inside
+job/activity names are escaped instead of shifting columns. s3:// outputs are
+uploaded as a multipart upload while rows are still being produced.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, Callable, Deque, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from campaign_core.config import OUTPUT_CONFIG
+from campaign_core.models import Contact
+
+S3_MIN_PART_SIZE = 5 * 1024 * 1024  # S3 rejects non-final parts smaller than 5 MiB
+
+CSV_COLUMNS = (
+    "portal", "job_uuid", "job_name", "subject_uuid", "external_id", "first_name",
+    "last_name", "parent_name", "phone_number", "phone_number_2", "email", "email_2",
+    "country", "group", "buyer", "access_code", "url", "custom_gallery_url",
+    "sms_marketing_consent", "sms_marketing_timestamp", "sms_transactional_consent",
+    "sms_transactional_timestamp", "activity_uuid", "activity_name", "registered_user",
+    "registered_user_email", "registered_user_uuid", "resolution_strategy",
+)
+
+
+def contact_row(contact: Contact) -> List[str]:
+    """One CSV row in CSV_COLUMNS order (None becomes an empty cell)"""
+    return [getattr(contact, column) or "" for column in CSV_COLUMNS]
+
+
+class CsvStreamWriter:
+    """Incremental Contact → CSV writer over a text stream.
+
+    The stream is opened lazily and the header goes out with the first row, so a
+    run that produces no contacts writes nothing (no empty file, no empty upload).
+    """
+
+    def __init__(self, open_stream: Callable[[], IO[str]], header: bool = True):
+        self._open_stream = open_stream
+        self._header = header
+        self._stream: Optional[IO[str]] = None
+        self._writer = None
+        self.rows = 0
+
+    def open(self) -> None:
+        """Open the stream and write the header now (for outputs that must exist even
+        when empty); writes call this implicitly"""
+        if self._stream is None:
+            self._stream = self._open_stream()
+            self._writer = csv.writer(self._stream, lineterminator="\n")
+            if self._header:
+                self._writer.writerow(CSV_COLUMNS)
+
+    def write_contacts(self, contacts: Iterable[Contact]) -> None:
+        for contact in contacts:
+            self.open()
+            self._writer.writerow(contact_row(contact))
+            self.rows += 1
+
+    def append(self, part: "CsvStreamWriter") -> None:
+        """Copy the rows of a headerless spooled part onto the end of this output"""
+        if not part.rows:
+            return
+        self.open()
+        part._stream.seek(0)
+        shutil.copyfileobj(part._stream, self._stream)
+        self.rows += part.rows
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+class _StdoutStream(io.TextIOWrapper):
+    """stdout as a csv stream that leaves the process's stdout open on close"""
+
+    def __init__(self):
+        sys.stdout.flush()  # keep anything already echoed ahead of the rows
+        super().__init__(sys.stdout.buffer, encoding="utf-8", newline="", write_through=True)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.flush()
+            self.detach()
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """Binary sink that uploads to S3 with multipart upload while it is being written.
+
+    Bytes are cut into OUTPUT_CONFIG['s3_part_size'] parts, uploaded by a small thread
+    pool (at most s3_max_concurrency parts in flight, so memory stays bounded), and the
+    upload is completed on close. Outputs smaller than one part go up as a single
+    put_object. Any failed part aborts the multipart upload so no orphaned parts are
+    left behind. SSE-KMS is applied when kms_key_id is set (AWS_KMS_KEY_ID in the CLIs).
+    """
+
+    def __init__(self, uri: str, kms_key_id: Optional[str] = None, s3_client=None,
+                 part_size: Optional[int] = None, max_concurrency: Optional[int] = None):
+        super().__init__()
+        parsed = urlparse(uri)
+        self.bucket, self.key = parsed.netloc, parsed.path.lstrip("/") or "output.csv"
+        self._extra = {}
+        if kms_key_id:
+            self._extra.update(ServerSideEncryption="aws:kms", SSEKMSKeyId=kms_key_id)
+        if s3_client is None:
+            import boto3
+            s3_client = boto3.client("s3")
+        self._s3 = s3_client
+        self._part_size = max(S3_MIN_PART_SIZE, part_size or OUTPUT_CONFIG['s3_part_size'])
+        self._max_concurrency = max(1, max_concurrency or OUTPUT_CONFIG['s3_max_concurrency'])
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending: Deque[Future] = deque()
+        self._parts: List[Dict[str, Any]] = []
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self._part_size:
+            chunk = bytes(self._buffer[:self._part_size])
+            del self._buffer[:self._part_size]
+            self._submit_part(chunk)
+        return len(data)
+
+    def _submit_part(self, chunk: bytes) -> None:
+        if self._upload_id is None:
+            created = self._s3.create_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                                       **self._extra)
+            self._upload_id = created["UploadId"]
+            self._pool = ThreadPoolExecutor(max_workers=self._max_concurrency,
+                                            thread_name_prefix="s3-part")
+        # Backpressure: never hold more than max_concurrency parts in memory
+        while len(self._pending) >= self._max_concurrency:
+            self._parts.append(self._pending.popleft().result())
+        part_number = len(self._parts) + len(self._pending) + 1
+        self._pending.append(self._pool.submit(self._upload_part, part_number, chunk))
+
+    def _upload_part(self, part_number: int, chunk: bytes) -> Dict[str, Any]:
+        response = self._s3.upload_part(Bucket=self.bucket, Key=self.key,
+                                        UploadId=self._upload_id, PartNumber=part_number,
+                                        Body=chunk)
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def abort(self) -> None:
+        """Drop the upload; nothing becomes visible at the destination key"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._upload_id is not None:
+            self._s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                            UploadId=self._upload_id)
+            self._upload_id = None
+        super().close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self._s3.put_object(Bucket=self.bucket, Key=self.key,
+                                    Body=bytes(self._buffer), **self._extra)
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                while self._pending:
+                    self._parts.append(self._pending.popleft().result())
+                self._s3.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts})
+                self._pool.shutdown(wait=True)
+        except Exception:
+            self.abort()
+            raise
+        self._buffer = bytearray()
+        super().close()
+
+
+def open_csv_output(out: Optional[str], kms_key_id: Optional[str] = None,
+                    s3_client=None) -> CsvStreamWriter:
+    """Writer for --out: s3://bucket/key, a local path, or stdout when empty"""
+    if out and out.startswith("s3://"):
+        return CsvStreamWriter(lambda: io.TextIOWrapper(
+            io.BufferedWriter(S3MultipartWriter(out, kms_key_id, s3_client)),
+            encoding="utf-8", newline=""))
+    if out:
+        return CsvStreamWriter(lambda: open(out, "w", encoding="utf-8", newline=""))
+    return CsvStreamWriter(_StdoutStream)
+
+
+def spooled_part() -> CsvStreamWriter:
+    """Headerless temporary part, for producers that finish out of output order"""
+    return CsvStreamWriter(
+        lambda: tempfile.SpooledTemporaryFile(max_size=OUTPUT_CONFIG['spool_max_bytes'],
+                                              mode="w+", encoding="utf-8", newline=""),
+        header=False,
+    )
+
+
+def partial_marker_path(out: str) -> str:
+    return f"{out}.partial.json"
+
+
+def write_sidecar(path: str, body: bytes, kms_key_id: Optional[str] = None,
+                  s3_client=None) -> None:
+    """Write a small document next to the output (local path or s3://)"""
+    if path.startswith("s3://"):
+        parsed = urlparse(path)
+        extra = {}
+        if kms_key_id:
+            extra.update(ServerSideEncryption="aws:kms", SSEKMSKeyId=kms_key_id)
+        if s3_client is None:
+            import boto3
+            s3_client = boto3.client("s3")
+        s3_client.put_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"), Body=body, **extra)
+        return
+    with open(path, "wb") as fh:
+        fh.write(body)
+
+
+def write_partial_marker(out: str, status: Dict[str, Any], kms_key_id: Optional[str] = None,
+                         s3_client=None) -> None:
+    """Flag --out as incomplete with a <out>.partial.json sidecar (local or s3://)"""
+    write_sidecar(partial_marker_path(out), json.dumps(status, sort_keys=True).encode(),
+                  kms_key_id=kms_key_id, s3_client=s3_client)
+
+
+def clear_partial_marker(out: str, s3_client=None) -> None:
+    """Drop the sidecar an interrupted attempt left next to a now complete output"""
+    marker = partial_marker_path(out)
+    if marker.startswith("s3://"):
+        parsed = urlparse(marker)
+        if s3_client is None:
+            import boto3
+            s3_client = boto3.client("s3")
+        s3_client.delete_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))
+        return
+    try:
+        os.remove(marker)
+    except FileNotFoundError:
+        pass
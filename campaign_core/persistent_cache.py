@@ -0,0 +1,235 @@
+# campaign_core/persistent_cache.py
+"""
+Cross-run persistent cache on SQLite.
+
+Values live in one file, so an on-demand run (e.g. a Fargate task) can seed it from
+S3, read through and write back to it while working, and sync it to S3 when done.
+Each entry carries its own expiry. Negative results (e.g. "this subject has no access
+key") are cached with a shorter TTL, so they are re-checked sooner than hits.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from campaign_core.config import CACHE_CONFIG
+
+_MISSING = object()
+_KEY_SEP = "\x1f"
+
+
+class PersistentCache:
+    """Thread-safe SQLite key/value store with per-entry TTL, split into namespaces"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return default
+        return json.loads(row[0])
+
+    def set_many(self, namespace: str, items: Iterable[Tuple[str, Any, float]]) -> None:
+        """Store (key, value, ttl_seconds) triples in one transaction"""
+        now = time.time()
+        rows = [(namespace, key, json.dumps(value), now + ttl) for key, value, ttl in items]
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) "
+                    "VALUES (?, ?, ?, ?)", rows)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        self.set_many(namespace, [(key, value, ttl)])
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?",
+                               (namespace, key))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            return cursor.rowcount
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            if namespace is None:
+                return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?",
+                                      (namespace,)).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ----------------------------- S3 seed / sync -----------------------------
+
+    @staticmethod
+    def seed_from_s3(path: str, uri: str, s3_client=None) -> bool:
+        """Download the cache file from s3://bucket/key to path (before opening it).
+
+        Returns False when there is nothing to seed from yet (first run).
+        """
+        s3 = s3_client or _s3_client()
+        bucket, key = _split_s3_uri(uri)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        try:
+            s3.head_object(Bucket=bucket, Key=key)
+        except Exception:
+            return False
+        # Download next to the target and swap in, so a failed transfer leaves no half file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".seed")
+        os.close(fd)
+        try:
+            s3.download_file(bucket, key, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return True
+
+    def sync_to_s3(self, uri: str, kms_key_id: Optional[str] = None, s3_client=None) -> None:
+        """Upload a consistent snapshot of the cache (expired entries dropped) to S3"""
+        self.purge_expired()
+        s3 = s3_client or _s3_client()
+        bucket, key = _split_s3_uri(uri)
+        fd, snapshot_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        try:
+            snapshot = sqlite3.connect(snapshot_path)
+            with self._lock:
+                self._conn.backup(snapshot)
+            snapshot.close()
+            extra = {}
+            if kms_key_id:
+                extra.update(ServerSideEncryption="aws:kms", SSEKMSKeyId=kms_key_id)
+            s3.upload_file(snapshot_path, bucket, key, ExtraArgs=extra or None)
+        finally:
+            os.remove(snapshot_path)
+
+
+class CacheView:
+    """dict-like view of one namespace, so pipeline code can keep using `in`, `get`,
+    item assignment and `update` whether the cache is in-process or persistent.
+
+    Keys may be strings or tuples of strings. Values for which `is_negative` is true
+    are stored with `negative_ttl` instead of `ttl`. Reads are memoized in-process,
+    misses included, so each key costs at most one SQLite query per run.
+    """
+
+    def __init__(self, cache: PersistentCache, namespace: str, *, ttl: float,
+                 negative_ttl: float, is_negative: Callable[[Any], bool] = lambda v: not v):
+        self._cache = cache
+        self.namespace = namespace
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._is_negative = is_negative
+        self._local: Dict[Any, Any] = {}
+        self._local_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def _encode(key: Any) -> str:
+        return _KEY_SEP.join(key) if isinstance(key, tuple) else str(key)
+
+    def _lookup(self, key: Any) -> Any:
+        with self._local_lock:
+            if key in self._local:
+                return self._local[key]
+        value = self._cache.get(self.namespace, self._encode(key), _MISSING)
+        with self._local_lock:
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._local.setdefault(key, value)
+            return self._local[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.update({key: value})
+
+    def update(self, items: Dict[Any, Any]) -> None:
+        items = dict(items)
+        with self._local_lock:
+            self._local.update(items)
+            self.writes += len(items)
+        self._cache.set_many(self.namespace, (
+            (self._encode(k), v, self._negative_ttl if self._is_negative(v) else self._ttl)
+            for k, v in items.items()
+        ))
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._local_lock:
+            return iter([k for k, v in self._local.items() if v is not _MISSING])
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes}
+
+
+def open_persistent_cache(path: Optional[str] = None, s3_uri: Optional[str] = None,
+                          s3_client=None) -> Optional[PersistentCache]:
+    """Open the run's cache file, seeding it from S3 first when a URI is configured
+    and there is no local copy yet.
+
+    Returns None when neither a path nor an S3 URI is set (in-process caching only).
+    """
+    path = path or CACHE_CONFIG['path']
+    s3_uri = s3_uri or CACHE_CONFIG['s3_uri']
+    if not path and not s3_uri:
+        return None
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), "campaign-cache.sqlite")
+    if s3_uri and not os.path.exists(path):
+        PersistentCache.seed_from_s3(path, s3_uri, s3_client=s3_client)
+    return PersistentCache(path)
+
+
+def _split_s3_uri(uri: str) -> Tuple[str, str]:
+    parsed = urlparse(uri)
+    return parsed.netloc, parsed.path.lstrip("/")
+
+
+def _s3_client():
+    import boto3
+    return boto3.client("s3")
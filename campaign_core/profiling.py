@@ -0,0 +1,254 @@
+# campaign_core/profiling.py
+"""
+Run profiling for the campaign CLIs (--profile).
+
+Stages (activity search, job details, subjects, access keys, assembly, CSV write,
+upload, ...) and API endpoints record call counts, wall time and CPU time. CPU is
+the calling thread's time, so for the async engine it is the event loop's CPU
+while the stage was active. Optionally every profiled stage also runs under
+cProfile (merged into one .prof dump at the end): one profiler per thread before
+Python 3.12, one for the whole process from 3.12 on, where cProfile sits on
+sys.monitoring and only one profiler can be enabled at a time (stages overlapping
+on several threads then share it, so per-function times are approximate). tracemalloc
+records the peak traced memory seen by each stage. Concurrent stages share the
+process-wide tracemalloc peak, so overlapping stages report the peak since the
+earliest of them started. The report is one JSON document.
+"""
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional
+
+from campaign_core.output import write_sidecar
+
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[0-9A-Za-z_-]{8,}$")
+
+# From 3.12 a cProfile.Profile sees every thread, and enabling a second one raises
+_PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+def endpoint_template(path: str) -> str:
+    """/api/v1/jobs/<uuid>/subjects -> /jobs/{id}/subjects (ids collapsed, query dropped)"""
+    path = path.split("?", 1)[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].split("/", 1)[-1]
+    if "/api/v1" in path:  # also drops a path prefix in front of it (mock portal)
+        path = path.split("/api/v1", 1)[1]
+    return "/".join("{id}" if _ID_SEGMENT.match(seg) else seg for seg in path.split("/")) or "/"
+
+
+class _Timing:
+    __slots__ = ("calls", "wall", "cpu", "wall_max", "mem_peak")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu: Optional[float] = None
+        self.wall_max = 0.0
+        self.mem_peak = 0
+
+    def add(self, wall: float, cpu: Optional[float], mem_peak: int = 0) -> None:
+        self.calls += 1
+        self.wall += wall
+        if cpu is not None:
+            self.cpu = (self.cpu or 0.0) + cpu
+        self.wall_max = max(self.wall_max, wall)
+        self.mem_peak = max(self.mem_peak, mem_peak)
+
+    def as_dict(self, memory: bool) -> Dict[str, Any]:
+        out = {"calls": self.calls, "wall_s": round(self.wall, 6),
+               "cpu_s": round(self.cpu, 6) if self.cpu is not None else None,
+               "wall_max_s": round(self.wall_max, 6),
+               "wall_avg_s": round(self.wall / self.calls, 6) if self.calls else 0.0}
+        if memory:
+            out["tracemalloc_peak_bytes"] = self.mem_peak
+        return out
+
+
+class RunProfiler:
+    """Collects stage and endpoint timings for one run (thread-safe).
+
+    A disabled profiler (the default) costs one attribute check per stage.
+    """
+
+    def __init__(self, enabled: bool = False, cprofile: bool = False, memory: bool = False):
+        self.enabled = enabled or cprofile or memory
+        self.cprofile = cprofile
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _Timing] = {}
+        self._endpoints: Dict[str, _Timing] = {}
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._cprofile_depth = 0          # active stages, process-wide profiler only
+        self._cprofile_skipped = 0        # stages not profiled: another profiler was active
+        self._active_stages = 0
+        self._started_wall = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self._started_tracemalloc = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    # ------------------------------ stages -------------------------------
+
+    def stage(self, name: str):
+        """Context manager timing one stage; a no-op when profiling is off"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        if self.memory:
+            with self._lock:
+                if self._active_stages == 0:
+                    tracemalloc.reset_peak()
+                self._active_stages += 1
+        profile = self._enter_cprofile() if self.cprofile else None
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            if profile is not None:
+                self._exit_cprofile(profile)
+            mem_peak = 0
+            if self.memory:
+                mem_peak = tracemalloc.get_traced_memory()[1]
+            with self._lock:
+                if self.memory:
+                    self._active_stages -= 1
+                self._stages.setdefault(name, _Timing()).add(wall, cpu, mem_peak)
+
+    def _enter_cprofile(self) -> Optional[cProfile.Profile]:
+        """Enable profiling for a stage; None when another profiler holds the hook"""
+        if _PROCESS_WIDE_CPROFILE:
+            # One profiler, enabled while any stage is active on any thread
+            with self._lock:
+                if self._cprofile_depth == 0:
+                    if not self._profiles:
+                        self._profiles.append(cProfile.Profile())
+                    if not self._enable(self._profiles[0]):
+                        return None
+                self._cprofile_depth += 1
+                return self._profiles[0]
+        # One profiler per thread, enabled while any stage is active on that thread
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            self._local.depth = 0
+            with self._lock:
+                self._profiles.append(profile)
+        if self._local.depth == 0:
+            with self._lock:
+                if not self._enable(profile):
+                    return None
+        self._local.depth += 1
+        return profile
+
+    def _enable(self, profile: cProfile.Profile) -> bool:
+        # Caller holds the lock. e.g. `python -m cProfile` already profiling the process:
+        # the stage still runs and is timed, just not under our profiler
+        try:
+            profile.enable()
+        except ValueError:
+            self._cprofile_skipped += 1
+            return False
+        return True
+
+    def _exit_cprofile(self, profile: cProfile.Profile) -> None:
+        if _PROCESS_WIDE_CPROFILE:
+            with self._lock:
+                self._cprofile_depth -= 1
+                if self._cprofile_depth == 0:
+                    profile.disable()
+            return
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            profile.disable()
+
+    # ----------------------------- endpoints -----------------------------
+
+    def record_endpoint(self, method: str, url: str, wall: float,
+                        cpu: Optional[float] = None) -> None:
+        """One HTTP request; cpu is None where it cannot be attributed (async client)"""
+        if not self.enabled:
+            return
+        name = f"{method} {endpoint_template(url)}"
+        with self._lock:
+            self._endpoints.setdefault(name, _Timing()).add(wall, cpu)
+
+    # ------------------------------- report ------------------------------
+
+    def report(self, **metadata: Any) -> Dict[str, Any]:
+        with self._lock:
+            report = {
+                **metadata,
+                "wall_s": round(time.perf_counter() - self._started_wall, 6),
+                "cpu_s": round(time.process_time() - self._started_cpu, 6),
+                "stages": {name: t.as_dict(self.memory) for name, t in sorted(self._stages.items())},
+                "endpoints": {name: t.as_dict(False)
+                              for name, t in sorted(self._endpoints.items())},
+            }
+        if self._cprofile_skipped:
+            report["cprofile_skipped_stages"] = self._cprofile_skipped
+        if self.memory:
+            report["tracemalloc_current_bytes"] = tracemalloc.get_traced_memory()[0]
+        return report
+
+    def cprofile_dump(self) -> Optional[bytes]:
+        """Merged pstats dump of the run's profiles (None without cProfile)"""
+        with self._lock:
+            profiles = [p for p in self._profiles if p.getstats()]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        # Same bytes Stats.dump_stats writes, so the dump can go to S3 as well
+        return marshal.dumps(stats.stats)
+
+    def close(self) -> None:
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+
+
+# Shared stand-in for pipelines run without --profile
+NULL_PROFILER = RunProfiler()
+
+
+def profile_report_path(out: Optional[str]) -> str:
+    """<out>.profile.json next to the output; a timestamped local file for stdout runs"""
+    if out:
+        return f"{out}.profile.json"
+    return time.strftime("campaign-profile-%Y%m%dT%H%M%SZ.json", time.gmtime())
+
+
+def write_profile(profiler: RunProfiler, out: Optional[str], kms_key_id: Optional[str] = None,
+                  s3_client=None, **metadata: Any) -> str:
+    """Write the JSON report (and the .prof dump, with cProfile); returns the report path"""
+    path = profile_report_path(out)
+    report = profiler.report(**metadata)
+    dump = profiler.cprofile_dump()
+    if dump is not None:
+        prof_path = path[:-len(".json")] + ".prof"
+        write_sidecar(prof_path, dump, kms_key_id=kms_key_id, s3_client=s3_client)
+        report["cprofile_dump"] = prof_path
+    write_sidecar(path, json.dumps(report, indent=2, sort_keys=True).encode(),
+                  kms_key_id=kms_key_id, s3_client=s3_client)
+    return path
@@ -0,0 +1,76 @@
+# campaign_core/rate_limit.py
+"""
+Token-bucket rate limiting shared by every client talking to the same portal host.
+One bucket per host per process, so all threads, jobs and async tasks hitting a
+portal draw from the same budget (the secret's rate_limit_per_sec).
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket; usable from threads (acquire) and asyncio (acquire_async)"""
+
+    def __init__(self, rate_per_sec: float, capacity: Optional[float] = None):
+        self._lock = threading.Lock()
+        self.rate = float(rate_per_sec)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def set_rate(self, rate_per_sec: float) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = float(rate_per_sec)
+            self.capacity = max(1.0, self.rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens now (possibly going into debt) and return how long to wait"""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+            self.waits += 1
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str, rate_per_sec: Optional[float]) -> Optional[TokenBucket]:
+    """Return the process-wide bucket for a portal host (None when unlimited)"""
+    if not rate_per_sec or rate_per_sec <= 0:
+        return None
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate_per_sec)
+        elif bucket.rate != float(rate_per_sec):
+            bucket.set_rate(rate_per_sec)
+        return bucket
@@ -0,0 +1,112 @@
+# campaign_core/shutdown.py
+"""
+Graceful SIGTERM/SIGINT handling for campaign runs.
+
+ECS sends SIGTERM and kills the task after a short grace period. On the first
+signal the coordinator stops new jobs from starting, gives in-flight jobs until a
+deadline to finish, and lets the pipelines return so finished jobs are flushed to
+the output and checkpoint. The run then ends as partial (PARTIAL_EXIT_CODE), so the
+state machine can retry it with --resume. A second signal gets the default handling.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import signal
+import threading
+import time
+from concurrent.futures import CancelledError, Future, TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, Optional
+
+from campaign_core.config import SHUTDOWN_CONFIG
+
+PARTIAL_EXIT_CODE = 75  # EX_TEMPFAIL: output is incomplete, retry with --resume
+_POLL_SECONDS = 0.2
+
+
+class ShutdownRequested(Exception):
+    """A job was not started, or not finished before the deadline, because of a shutdown"""
+
+
+class ShutdownCoordinator:
+    """Shared shutdown flag with a deadline for in-flight work (thread-safe)"""
+
+    def __init__(self, grace_seconds: Optional[float] = None):
+        self.grace_seconds = SHUTDOWN_CONFIG['grace_seconds'] if grace_seconds is None else grace_seconds
+        self._event = threading.Event()
+        self._deadline: Optional[float] = None
+        self._previous: Dict[int, Any] = {}
+        self.signal_name: Optional[str] = None
+
+    # ------------------------------ signals ------------------------------
+
+    def install(self, signals=(signal.SIGTERM, signal.SIGINT)) -> "ShutdownCoordinator":
+        """Route the signals to request(); only possible from the main thread"""
+        if threading.current_thread() is not threading.main_thread():
+            return self
+        for signum in signals:
+            self._previous[signum] = signal.signal(signum, self._handle)
+        return self
+
+    def restore(self) -> None:
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous = {}
+
+    def _handle(self, signum, frame) -> None:
+        # A second signal falls through to the original handler (e.g. hard Ctrl-C)
+        self.restore()
+        self.request(signal.Signals(signum).name)
+
+    def request(self, reason: str = "requested") -> None:
+        if not self._event.is_set():
+            self.signal_name = reason
+            self._deadline = time.monotonic() + self.grace_seconds
+            self._event.set()
+
+    # ------------------------------- state -------------------------------
+
+    @property
+    def requested(self) -> bool:
+        return self._event.is_set()
+
+    def remaining(self) -> float:
+        """Seconds left for in-flight work (infinite while no shutdown is requested)"""
+        if self._deadline is None:
+            return float("inf")
+        return max(0.0, self._deadline - time.monotonic())
+
+    def guard(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a job so it does not start once shutdown has been requested"""
+        @functools.wraps(fn)
+        def guarded(*args, **kwargs):
+            if self.requested:
+                raise ShutdownRequested()
+            return fn(*args, **kwargs)
+        return guarded
+
+    # ------------------------------ waiting ------------------------------
+
+    def result(self, future: Future) -> Any:
+        """future.result(), but gives up at the shutdown deadline"""
+        while True:
+            timeout = self.remaining() if self.requested else _POLL_SECONDS
+            try:
+                return future.result(timeout=timeout)
+            except CancelledError:
+                raise ShutdownRequested() from None
+            except FuturesTimeout:
+                if self.requested and self.remaining() <= 0:
+                    raise ShutdownRequested() from None
+
+    async def result_async(self, task: "asyncio.Future") -> Any:
+        """Await task, but cancel it and give up at the shutdown deadline"""
+        while not task.done():
+            timeout = self.remaining() if self.requested else _POLL_SECONDS
+            await asyncio.wait({task}, timeout=timeout)
+            if not task.done() and self.requested and self.remaining() <= 0:
+                task.cancel()
+                raise ShutdownRequested()
+        if task.cancelled():
+            raise ShutdownRequested()
+        return task.result()
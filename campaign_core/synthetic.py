@@ -0,0 +1,424 @@
+# campaign_core/synthetic.py
+"""
+Deterministic synthetic portal data for the mock portal and benchmarks.
+
+A dataset holds jobs with their activities, images, subjects (delivery_1 /
+delivery_2 contacts, buyer flag, image refs), registrations and access keys,
+shaped like the Netlife API documents. Everything derives from (seed, portal,
+job index). Each job draws from its own random.Random, so any job can be built
+alone, in any order and on any thread, and is the same every time. The global
+random module is never touched.
+
+Jobs are built on first use and only the most recent are kept, so a dataset of
+10^6 subjects costs the memory of a few jobs. dump() streams a dataset to a
+directory (one JSON line per job plus a byte-offset index), and DiskDataset
+serves the same interface from it without regenerating anything.
+
+Scale is set per DatasetSpec, optionally per portal: DatasetSpec.scaled(10_000)
+gives the SC-004 volume of about 100 jobs and 10^4 subjects.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import sys
+import uuid
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from campaign_core.bounded_cache import BoundedCache
+from campaign_core.phones import realistic_phone, stable_seed
+
+_FIRST_NAMES = ("Ava", "Liam", "Emma", "Noah", "Mia", "Owen", "Zoe", "Ethan", "Lily", "Lucas",
+                "Sofia", "Mason", "Chloe", "Elijah", "Grace", "James", "Nora", "Caleb", "Ella", "Leo")
+_LAST_NAMES = ("Smith", "Johnson", "Brown", "Garcia", "Miller", "Davis", "Lopez", "Wilson",
+               "Martinez", "Anderson", "Taylor", "Thomas", "Moore", "Jackson", "Lee", "Walker")
+_SCHOOLS = ("Lincoln", "Jefferson", "Roosevelt", "Westview", "Lakeside", "Oak Ridge", "Riverside",
+            "Central", "Hillcrest", "Maple Grove", "Summit", "Valley View")
+_SCHOOL_KINDS = ("High School", "Middle School", "Elementary", "Academy", "Prep")
+_ACTIVITY_NAMES = ("Fall Picture Day", "Spring Picture Day", "Retakes", "Senior Portraits",
+                   "Sports Day", "Graduation", "Club Photos")
+_EMAIL_DOMAINS = ("gmail.com", "yahoo.com", "outlook.com", "icloud.com", "example.com")
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _formatted_phone(rng: random.Random) -> str:
+    # Portals store whatever the customer typed; the CLI normalises it
+    e164 = realistic_phone(rng)
+    style = rng.random()
+    if style < 0.6:
+        return e164
+    digits = e164[2:]
+    if style < 0.8:
+        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+    if style < 0.95:
+        return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+    return digits
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Size and shape of one portal's synthetic data"""
+    seed: int = 0
+    jobs: int = 5
+    activities_per_job: int = 2
+    subjects_per_job: int = 50
+    subjects_jitter: float = 0.0      # each job has subjects_per_job * (1 ± jitter) subjects
+    images_per_subject: int = 2
+    image_padding_bytes: int = 0      # filler per image, to grow /jobs/{uuid} documents
+    buyer_ratio: float = 0.4
+    registered_ratio: float = 0.3
+    phone_ratio: float = 0.8
+    email_ratio: float = 0.9
+    second_contact_ratio: float = 0.2  # subjects that also have a delivery_2 contact
+    access_key_ratio: float = 1.0
+
+    @classmethod
+    def scaled(cls, subjects: int, jobs: Optional[int] = None, **overrides: Any) -> "DatasetSpec":
+        """About `subjects` subjects spread over `jobs` jobs (default: ~100 subjects per job)"""
+        jobs = jobs or max(1, round(subjects / 100))
+        return cls(jobs=jobs, subjects_per_job=max(1, round(subjects / jobs)),
+                   **{"subjects_jitter": 0.5, **overrides})
+
+
+SCALES: Dict[str, DatasetSpec] = {
+    "small": DatasetSpec(),
+    "sc004": DatasetSpec.scaled(10_000),          # O(100) jobs, O(10^4) subjects
+    "sc004-max": DatasetSpec.scaled(1_000_000),   # 10^6 subjects
+}
+
+
+@dataclass
+class SyntheticJob:
+    """One job as the portal holds it; subjects keep their private registration/key fields"""
+    uuid: str
+    name: str
+    activities: List[Dict[str, Any]]
+    images: List[Dict[str, Any]]
+    subjects: List[Dict[str, Any]]
+    settings: Dict[str, Any] = field(default_factory=dict)
+    _by_uuid: Optional[Dict[str, Dict[str, Any]]] = field(default=None, repr=False, compare=False)
+
+    def subject(self, subject_uuid: str) -> Optional[Dict[str, Any]]:
+        if self._by_uuid is None:
+            self._by_uuid = {s["uuid"]: s for s in self.subjects}
+        return self._by_uuid.get(subject_uuid)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"uuid": self.uuid, "name": self.name, "settings": self.settings,
+                "activities": self.activities, "images": self.images, "subjects": self.subjects}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SyntheticJob":
+        return cls(uuid=data["uuid"], name=data["name"], settings=data.get("settings") or {},
+                   activities=data["activities"], images=data["images"], subjects=data["subjects"])
+
+
+class _DatasetBase:
+    """API-shaped views shared by generated and on-disk datasets"""
+
+    def __init__(self, cache_jobs: int = 32):
+        self._jobs = BoundedCache("synthetic_jobs", max_bytes=sys.maxsize,
+                                  max_entries=cache_jobs, sizeof=lambda job: 0)
+        self._index: Dict[str, Dict[str, int]] = {}
+
+    # Subclasses provide these
+    def job_count(self, portal: str) -> int:
+        raise NotImplementedError
+
+    def job_header(self, portal: str, index: int) -> Dict[str, Any]:
+        """{'uuid', 'name', 'activities'} without building the job's subjects"""
+        raise NotImplementedError
+
+    def _load_job(self, portal: str, index: int) -> SyntheticJob:
+        raise NotImplementedError
+
+    # Lookups
+
+    def job_uuid(self, portal: str, index: int) -> str:
+        return self.job_header(portal, index)["uuid"]
+
+    def job_index(self, portal: str, job_uuid: str) -> Optional[int]:
+        index = self._index.get(portal)
+        if index is None:
+            index = {self.job_uuid(portal, i): i for i in range(self.job_count(portal))}
+            self._index[portal] = index
+        return index.get(job_uuid)
+
+    def job_at(self, portal: str, index: int) -> SyntheticJob:
+        job = self._jobs.get((portal, index))
+        if job is None:
+            job = self._jobs[(portal, index)] = self._load_job(portal, index)
+        return job
+
+    def job(self, portal: str, job_uuid: str) -> Optional[SyntheticJob]:
+        index = self.job_index(portal, job_uuid)
+        return None if index is None else self.job_at(portal, index)
+
+    def iter_jobs(self, portal: str) -> Iterator[SyntheticJob]:
+        for index in range(self.job_count(portal)):
+            yield self.job_at(portal, index)
+
+    # API documents
+
+    def activities(self, portal: str) -> List[Dict[str, Any]]:
+        """/activities/search?status_id=in-webshop"""
+        out: List[Dict[str, Any]] = []
+        for index in range(self.job_count(portal)):
+            out.extend(self.job_header(portal, index)["activities"])
+        return out
+
+    @staticmethod
+    def job_document(job: SyntheticJob) -> Dict[str, Any]:
+        """/jobs/{uuid}"""
+        return {"uuid": job.uuid, "name": job.name, "settings": job.settings,
+                "subjects": [{"uuid": s["uuid"], "first_name": s["first_name"], "images": s["images"],
+                              **({"favorite_image_uuid": s["favorite_image_uuid"]}
+                                 if "favorite_image_uuid" in s else {})}
+                             for s in job.subjects],
+                "images": job.images}
+
+    @staticmethod
+    def subject_row(subject: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in subject.items() if not k.startswith("_")}
+
+    def subject_rows(self, job: SyntheticJob, has_order: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """/jobs/{uuid}/subjects[?filter_has_order=...]"""
+        return [self.subject_row(s) for s in job.subjects
+                if has_order is None or s["has_order"] == has_order]
+
+    @staticmethod
+    def registrations(job: SyntheticJob) -> List[Dict[str, str]]:
+        """/jobs/{uuid}/users rows"""
+        return [{"subjectUuid": s["uuid"], "userUuid": s["_user_uuid"], "email": s["_user_email"]}
+                for s in job.subjects if s.get("_user_uuid")]
+
+    @staticmethod
+    def access_key(job: SyntheticJob, subject_uuid: str) -> Optional[str]:
+        """/jobs/{uuid}/subjects/{uuid}/accesskeys (None: no key)"""
+        subject = job.subject(subject_uuid)
+        return subject.get("_access_key") if subject else None
+
+    @staticmethod
+    def user(user_uuid: str) -> Dict[str, Any]:
+        """/users/{uuid}: a stable profile for any uuid"""
+        rng = random.Random(stable_seed("user", user_uuid))
+        first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+        return {"uuid": user_uuid, "first_name": first, "last_name": last,
+                "phone_number": realistic_phone(rng),
+                "email_address": f"{first}.{last}{rng.randint(1, 999)}@{rng.choice(_EMAIL_DOMAINS)}".lower()}
+
+    def totals(self, portal: str) -> Dict[str, int]:
+        """Counts over every job of a portal (builds each job once)"""
+        totals = {"jobs": 0, "activities": 0, "subjects": 0, "buyers": 0, "images": 0,
+                  "registered": 0, "access_keys": 0}
+        for job in self.iter_jobs(portal):
+            totals["jobs"] += 1
+            totals["activities"] += len(job.activities)
+            totals["images"] += len(job.images)
+            for s in job.subjects:
+                totals["subjects"] += 1
+                totals["buyers"] += s["has_order"]
+                totals["registered"] += bool(s.get("_user_uuid"))
+                totals["access_keys"] += bool(s.get("_access_key"))
+        return totals
+
+
+class SyntheticDataset(_DatasetBase):
+    """Generated lazily from a spec (per-portal specs override the default)"""
+
+    def __init__(self, spec: Optional[DatasetSpec] = None,
+                 portal_specs: Optional[Dict[str, DatasetSpec]] = None, cache_jobs: int = 32):
+        super().__init__(cache_jobs)
+        self.spec = spec or DatasetSpec()
+        self.portal_specs = dict(portal_specs or {})
+        self._headers = BoundedCache("synthetic_headers", max_bytes=sys.maxsize,
+                                     max_entries=100_000, sizeof=lambda header: 0)
+
+    def spec_for(self, portal: str) -> DatasetSpec:
+        return self.portal_specs.get(portal, self.spec)
+
+    def job_count(self, portal: str) -> int:
+        return self.spec_for(portal).jobs
+
+    def job_header(self, portal: str, index: int) -> Dict[str, Any]:
+        header = self._headers.get((portal, index))
+        if header is None:
+            header = self._headers[(portal, index)] = self._build_header(portal, index)
+        return header
+
+    def _build_header(self, portal: str, index: int) -> Dict[str, Any]:
+        spec = self.spec_for(portal)
+        rng = random.Random(stable_seed(spec.seed, portal, index, "header"))
+        job_uuid = _uuid(rng)
+        year = 2024 + rng.randint(0, 2)
+        name = f"{rng.choice(_SCHOOLS)} {rng.choice(_SCHOOL_KINDS)} {year} #{index + 1}"
+        month = rng.randint(1, 12)
+        activities = [{
+            "uuid": _uuid(rng),
+            "name": _ACTIVITY_NAMES[(index + a) % len(_ACTIVITY_NAMES)],
+            "status": "in-webshop",
+            "starting": f"{year}-{(month + a - 1) % 12 + 1:02d}-{rng.randint(1, 28):02d}T09:00:00Z",
+            "job": {"uuid": job_uuid, "name": name},
+        } for a in range(spec.activities_per_job)]
+        return {"uuid": job_uuid, "name": name, "activities": activities}
+
+    def _load_job(self, portal: str, index: int) -> SyntheticJob:
+        spec = self.spec_for(portal)
+        header = self.job_header(portal, index)
+        rng = random.Random(stable_seed(spec.seed, portal, index, "subjects"))
+        activities = header["activities"]
+        count = spec.subjects_per_job
+        if spec.subjects_jitter:
+            count = max(1, round(count * (1 + rng.uniform(-spec.subjects_jitter, spec.subjects_jitter))))
+        padding = "x" * spec.image_padding_bytes
+        subjects: List[Dict[str, Any]] = []
+        images: List[Dict[str, Any]] = []
+        for k in range(count):
+            subject_uuid = _uuid(rng)
+            refs: List[Any] = []
+            for m in range(spec.images_per_subject):
+                image_uuid = _uuid(rng)
+                activity = activities[(k + m) % len(activities)] if activities else None
+                url = f"https://cdn.example.com/{header['uuid'][:8]}/{image_uuid}.jpg"
+                image: Dict[str, Any] = {"uuid": image_uuid, "filename": f"IMG_{k:05d}_{m}.jpg",
+                                         "url": url, "sizes": [{"w": w, "url": f"{url}?w={w}"}
+                                                               for w in (200, 800)]}
+                if activity is not None:
+                    # The API is not consistent about how an image names its activity
+                    style = rng.random()
+                    if style < 0.8:
+                        image["activity"] = {"uuid": activity["uuid"], "name": activity["name"]}
+                    elif style < 0.9:
+                        image["activity_uuid"] = activity["uuid"]
+                    else:
+                        image["activityUuid"] = activity["uuid"]
+                if padding:
+                    image["exif"] = {"camera": "synthetic", "notes": padding}
+                images.append(image)
+                refs.append(image_uuid if rng.random() < 0.7 else {"uuid": image_uuid, "url": url})
+            first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+            subject: Dict[str, Any] = {
+                "uuid": subject_uuid, "external_id": f"S{index:05d}{k:05d}",
+                "first_name": first, "last_name": last,
+                "group": f"Grade {rng.randint(1, 12)}", "country": "US",
+                "has_order": rng.random() < spec.buyer_ratio,
+                "delivery_1": self._delivery(rng, spec, first, last),
+                "images": refs,
+            }
+            if rng.random() < spec.second_contact_ratio:
+                subject["delivery_2"] = self._delivery(rng, spec, rng.choice(_FIRST_NAMES), last)
+            if refs and rng.random() < 0.3:
+                first_ref = refs[0]
+                subject["favorite_image_uuid"] = first_ref if isinstance(first_ref, str) else first_ref["uuid"]
+            if rng.random() < spec.registered_ratio:
+                subject["_user_uuid"] = _uuid(rng)
+                subject["_user_email"] = (subject["delivery_1"].get("email_address")
+                                          or f"{first}.{last}.{k}@{rng.choice(_EMAIL_DOMAINS)}".lower())
+            if rng.random() < spec.access_key_ratio:
+                subject["_access_key"] = f"{rng.getrandbits(32):08X}"
+            subjects.append(subject)
+        return SyntheticJob(uuid=header["uuid"], name=header["name"], activities=activities,
+                            images=images, subjects=subjects,
+                            settings={"currency": "USD", "gallery_expires_days": 90})
+
+    @staticmethod
+    def _delivery(rng: random.Random, spec: DatasetSpec, first: str, last: str) -> Dict[str, str]:
+        delivery = {}
+        if rng.random() < spec.phone_ratio:
+            delivery["mobile_phone"] = _formatted_phone(rng)
+        if rng.random() < spec.email_ratio:
+            delivery["email_address"] = (f"{first}.{last}{rng.randint(1, 9999)}"
+                                         f"@{rng.choice(_EMAIL_DOMAINS)}").lower()
+        return delivery
+
+
+def dump(dataset: _DatasetBase, directory: str, portals: Iterable[str]) -> Dict[str, Any]:
+    """Stream every job of each portal to <directory>/<portal>.jsonl; returns the manifest"""
+    os.makedirs(directory, exist_ok=True)
+    manifest: Dict[str, Any] = {"portals": {}}
+    for portal in portals:
+        headers = []
+        with open(os.path.join(directory, f"{portal}.jsonl"), "wb") as fh:
+            for index in range(dataset.job_count(portal)):
+                header = dataset.job_header(portal, index)
+                headers.append({**header, "offset": fh.tell()})
+                fh.write(json.dumps(dataset.job_at(portal, index).to_dict(),
+                                    separators=(",", ":")).encode() + b"\n")
+        with open(os.path.join(directory, f"{portal}.index.json"), "w", encoding="utf-8") as fh:
+            json.dump(headers, fh, separators=(",", ":"))
+        spec = dataset.spec_for(portal) if isinstance(dataset, SyntheticDataset) else None
+        manifest["portals"][portal] = {"jobs": len(headers),
+                                       "spec": asdict(spec) if spec is not None else None}
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    return manifest
+
+
+class DiskDataset(_DatasetBase):
+    """A dump() directory, read one job line at a time by byte offset"""
+
+    def __init__(self, directory: str, cache_jobs: int = 32):
+        super().__init__(cache_jobs)
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as fh:
+            self.manifest = json.load(fh)
+        self._headers: Dict[str, List[Dict[str, Any]]] = {}
+
+    def _portal_headers(self, portal: str) -> List[Dict[str, Any]]:
+        headers = self._headers.get(portal)
+        if headers is None:
+            if portal not in self.manifest["portals"]:
+                headers = []
+            else:
+                with open(os.path.join(self.directory, f"{portal}.index.json"), "r",
+                          encoding="utf-8") as fh:
+                    headers = json.load(fh)
+            self._headers[portal] = headers
+        return headers
+
+    def job_count(self, portal: str) -> int:
+        return len(self._portal_headers(portal))
+
+    def job_header(self, portal: str, index: int) -> Dict[str, Any]:
+        return self._portal_headers(portal)[index]
+
+    def _load_job(self, portal: str, index: int) -> SyntheticJob:
+        with open(os.path.join(self.directory, f"{portal}.jsonl"), "rb") as fh:
+            fh.seek(self.job_header(portal, index)["offset"])
+            return SyntheticJob.from_dict(json.loads(fh.readline()))
+
+
+def fingerprint(dataset: _DatasetBase, portal: str) -> str:
+    """Digest of a portal's jobs, for checking that two datasets match"""
+    digest = hashlib.sha256()
+    for job in dataset.iter_jobs(portal):
+        digest.update(json.dumps(job.to_dict(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic portal dataset to disk")
+    parser.add_argument("directory")
+    parser.add_argument("--portals", default="legacyphoto", help="Comma-separated portal keys")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--subjects", type=int, help="Total subjects per portal (overrides --scale)")
+    parser.add_argument("--jobs", type=int, help="Jobs per portal, with --subjects")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    spec = DatasetSpec.scaled(args.subjects, args.jobs) if args.subjects else SCALES[args.scale]
+    spec = replace(spec, seed=args.seed)
+    portals = [p for p in args.portals.split(",") if p]
+    manifest = dump(SyntheticDataset(spec), args.directory, portals)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# campaign-core/tests/unit/test_bounded_cache.py
+from campaign_core.bounded_cache import BoundedCache, approx_size
+from campaign_core.netlife_client import NetlifeAPIClient
+
+
+def test_lru_eviction_by_bytes():
+    cache = BoundedCache("docs", max_bytes=300, sizeof=len)
+    cache["a"] = "x" * 100
+    cache["b"] = "x" * 100
+    cache["c"] = "x" * 100
+    assert cache.get("a") is not None       # "a" is now the most recently used
+    cache["d"] = "x" * 100                  # so "b" goes
+    assert "b" not in cache and "a" in cache
+    cache["huge"] = "x" * 301               # larger than the budget: never kept
+    assert "huge" not in cache
+    assert cache.stats() == {"entries": 3, "bytes": 300, "peak_bytes": 300, "max_bytes": 300,
+                             "hits": 1, "misses": 0, "evictions": 2, "released": 0}
+
+
+def test_approx_size_grows_with_nested_content():
+    small = {"uuid": "j1", "images": []}
+    large = {"uuid": "j1", "images": [{"uuid": f"img-{i}", "url": "u" * 50} for i in range(100)]}
+    assert approx_size(large) > approx_size(small) + 100 * 50
+
+
+def test_client_caches_are_bounded_and_released_per_job(monkeypatch):
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass",
+                              cache_budgets={"job_details": 10_000})
+    doc = {"name": "Job", "images": [{"uuid": f"img-{i}"} for i in range(20)]}
+    monkeypatch.setattr(client, "_make_request", lambda *a, **kw: dict(doc))
+    try:
+        for job in ("j1", "j2", "j3", "j4"):
+            client.get_job_details(job)
+        client.get_job_subjects("j4", has_order=True)
+        memory = client.get_stats_summary()["memory_caches"]
+        assert 0 < memory["job_details"]["bytes"] <= 10_000
+        assert memory["job_details"]["evictions"] > 0
+
+        client.release_job("j4")
+        memory = client.get_stats_summary()["memory_caches"]
+        assert "j4" not in client._job_details_cache and "j4" not in client._buyers_cache
+        assert memory["job_details"]["released"] == 1 and memory["buyers"]["released"] == 1
+        client.log_final_stats()
+    finally:
+        client.close()
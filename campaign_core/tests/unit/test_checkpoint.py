@@ -0,0 +1,53 @@
+# campaign-core/tests/unit/test_checkpoint.py
+import pytest
+
+from campaign_core.checkpoint import CheckpointMismatchError, RunCheckpoint
+from campaign_core.models import Contact
+
+OPTIONS = {"audience": "both", "contact_filter": "any",
+           "check_registered_users": False, "registered_only": False}
+
+
+def _contact(job, subject):
+    return Contact(
+        portal="legacyphoto", job_uuid=job, job_name="Job, \"quoted\"", subject_uuid=subject,
+        phone_number="5551234567", buyer="Yes", access_code="AC1", url="u",
+        custom_gallery_url="g", sms_marketing_timestamp="t", sms_transactional_timestamp="t",
+        activity_uuid="a1", activity_name="Activity", registered_user="No",
+    )
+
+
+def _exercise(first, second):
+    first.start(OPTIONS)
+    first.save_job("legacyphoto", "j1", [_contact("j1", "s1"), _contact("j1", "s2")])
+    first.save_job("legacyphoto", "j2", [])
+
+    # A retried task resumes the same run id and reads the finished jobs back
+    second.start(OPTIONS, resume=True)
+    assert second.completed_jobs("legacyphoto") == {"j1", "j2"}
+    assert second.completed_jobs("nowandforeverphoto") == set()
+    assert second.load_job("legacyphoto", "j1") == [_contact("j1", "s1"), _contact("j1", "s2")]
+    assert second.load_job("legacyphoto", "j2") == []
+
+    with pytest.raises(CheckpointMismatchError):
+        second.start(dict(OPTIONS, audience="buyers"), resume=True)
+
+
+def test_local_checkpoint_resume(tmp_path):
+    _exercise(RunCheckpoint(str(tmp_path), "run-1"), RunCheckpoint(str(tmp_path), "run-1"))
+    with pytest.raises(FileNotFoundError):
+        RunCheckpoint(str(tmp_path), "run-2").start(OPTIONS, resume=True)
+
+
+def test_s3_checkpoint_resume():
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="checkpoints")
+        uri = "s3://checkpoints/campaigns"
+        _exercise(RunCheckpoint(uri, "run-1", s3_client=s3),
+                  RunCheckpoint(uri, "run-1", s3_client=s3))
+        assert "campaigns/run-1/manifest.json" in [
+            obj["Key"] for obj in s3.list_objects_v2(Bucket="checkpoints")["Contents"]]
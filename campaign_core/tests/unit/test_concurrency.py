@@ -0,0 +1,65 @@
+# campaign-core/tests/unit/test_concurrency.py
+import asyncio
+
+import pytest
+from campaign_core.concurrency import AdaptiveConcurrencyLimiter, AsyncAdaptiveConcurrencyLimiter
+
+
+def test_window_grows_when_healthy_and_halves_on_429():
+    """Additive increase on steady latency, multiplicative decrease on throttling"""
+    gate = AdaptiveConcurrencyLimiter(initial=4, max_limit=32)
+    for _ in range(40):
+        gate.acquire()
+        gate.release(0.05, 200)
+    grown = gate.limit
+    assert grown > 4
+
+    gate.acquire()
+    gate.release(0.05, 429)
+    assert gate.limit == max(1, int(grown * 0.5))
+    assert gate.snapshot()["concurrency_decreases"] == 1
+
+
+def test_window_backs_off_when_latency_rises():
+    """Smoothed latency far above baseline shrinks the window"""
+    gate = AdaptiveConcurrencyLimiter(initial=16, max_limit=32)
+    for _ in range(5):
+        gate.record(0.02, 200)
+    before = gate.limit
+    for _ in range(30):
+        gate.record(1.0, 200)
+    assert gate.limit < before
+
+
+@pytest.mark.asyncio
+async def test_async_gate_caps_in_flight_tasks():
+    """No more tasks run concurrently than the current window allows"""
+    gate = AsyncAdaptiveConcurrencyLimiter(initial=3, max_limit=3)
+    peak = 0
+
+    async def task():
+        nonlocal peak
+        await gate.acquire()
+        peak = max(peak, gate.in_flight)
+        await asyncio.sleep(0.01)
+        await gate.release(0.01, 200)
+
+    await asyncio.gather(*(task() for _ in range(12)))
+    assert peak == 3
+    assert gate.in_flight == 0
+
+
+def test_slow_endpoint_does_not_throttle_fast_one():
+    """Seconds-long job documents are not mistaken for rising accesskeys latency"""
+    gate = AdaptiveConcurrencyLimiter(initial=4, max_limit=32)
+    for i in range(60):
+        gate.record(0.05, 200, "GET /jobs/{id}/subjects/{id}/accesskeys")
+        if i % 5 == 0:
+            gate.record(2.0, 200, "GET /jobs/{id}")
+    assert gate.limit > 4
+    assert gate.snapshot()["concurrency_decreases"] == 0
+
+    # A genuine slowdown on one endpoint still backs off
+    for _ in range(30):
+        gate.record(1.0, 200, "GET /jobs/{id}/subjects/{id}/accesskeys")
+    assert gate.snapshot()["concurrency_decreases"] > 0
@@ -0,0 +1,103 @@
+# campaign-core/tests/unit/test_delta.py
+from campaign_core.delta import DeltaRun, DeltaStateStore, delta_scope, write_removals
+from campaign_core.models import Contact
+
+SCOPE = delta_scope("both", "both", False, False)
+
+
+def _contact(job, subject, phone="5551234567", access_code="AC1"):
+    return Contact(
+        portal="legacyphoto", job_uuid=job, job_name=f"Job {job}", subject_uuid=subject,
+        phone_number=phone, buyer="No", access_code=access_code, url="u",
+        custom_gallery_url="g", sms_marketing_timestamp="t", sms_transactional_timestamp="t",
+        activity_uuid="a1", activity_name="Activity", registered_user="No",
+    )
+
+
+def _run(path, jobs_map, contacts_by_job, skip_unchanged_jobs=False, incomplete=()):
+    store = DeltaStateStore(path)
+    delta = DeltaRun(store, SCOPE, skip_unchanged_jobs=skip_unchanged_jobs)
+    to_process = delta.register_jobs("legacyphoto", jobs_map)
+    emitted = []
+    for job_uuid in to_process:
+        if job_uuid in incomplete:
+            delta.mark_incomplete("legacyphoto", job_uuid)
+        emitted.extend(delta.filter(contacts_by_job.get(job_uuid, [])))
+    removed = delta.commit()
+    store.close()
+    return delta, emitted, removed
+
+
+def test_second_run_emits_only_new_and_changed(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    jobs = {"j1": [{"uuid": "a1"}]}
+    _, emitted, _ = _run(path, jobs, {"j1": [_contact("j1", "s1"), _contact("j1", "s2")]})
+    assert len(emitted) == 2
+
+    delta, emitted, removed = _run(path, jobs, {"j1": [
+        _contact("j1", "s1"),
+        _contact("j1", "s2", phone="5559999999"),
+        _contact("j1", "s3"),
+    ]})
+    assert [c.subject_uuid for c in emitted] == ["s2", "s3"]
+    assert removed == []
+    assert delta.stats() == {"delta_new": 1, "delta_changed": 1, "delta_unchanged": 1,
+                             "delta_skipped_jobs": 0}
+
+
+def test_removals_only_for_jobs_that_ran_or_left(tmp_path):
+    """A job that fails (no rows) keeps its contacts; a job that ran or left the
+    webshop reports the contacts it lost"""
+    path = str(tmp_path / "state.sqlite")
+    jobs = {"j1": [{"uuid": "a1"}], "j2": [{"uuid": "a1"}], "j3": [{"uuid": "a1"}]}
+    _run(path, jobs, {"j1": [_contact("j1", "s1"), _contact("j1", "s2")],
+                      "j2": [_contact("j2", "s1")],
+                      "j3": [_contact("j3", "s1")]})
+
+    _, _, removed = _run(path, {"j1": jobs["j1"], "j2": jobs["j2"]},
+                         {"j1": [_contact("j1", "s1")]})
+    assert removed == [("legacyphoto", "j1", "s2", "a1"), ("legacyphoto", "j3", "s1", "a1")]
+
+    # j2 produced nothing twice in a row: still carried forward, never removed
+    _, emitted, removed = _run(path, {"j1": jobs["j1"], "j2": jobs["j2"]},
+                               {"j1": [_contact("j1", "s1")], "j2": [_contact("j2", "s1")]})
+    assert emitted == [] and removed == []
+
+    out = tmp_path / "removed.csv"
+    write_removals(str(out), [("legacyphoto", "j3", "s1", "a1")])
+    assert out.read_text() == "portal,job_uuid,subject_uuid,activity_uuid\nlegacyphoto,j3,s1,a1\n"
+
+
+def test_skip_unchanged_jobs(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    jobs = {"j1": [{"uuid": "a1"}], "j2": [{"uuid": "a1"}]}
+    contacts = {"j1": [_contact("j1", "s1")], "j2": [_contact("j2", "s1")]}
+    _run(path, jobs, contacts, skip_unchanged_jobs=True)
+
+    jobs["j2"] = [{"uuid": "a1"}, {"uuid": "a2"}]
+    delta, emitted, removed = _run(path, jobs, contacts, skip_unchanged_jobs=True)
+    assert delta.stats()["delta_skipped_jobs"] == 1
+    assert emitted == [] and removed == []
+
+    # Other scopes keep their own state
+    store = DeltaStateStore(path)
+    assert store.contacts(delta_scope("buyers", "both", False, False), "legacyphoto") == {}
+    assert len(store.contacts(SCOPE, "legacyphoto")) == 2
+    store.close()
+
+
+def test_incomplete_job_reports_no_removals_and_is_not_skipped_next_run(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    contacts = {"j1": [_contact("j1", "s1"), _contact("j1", "s2")]}
+    _run(path, {"j1": [{"uuid": "a1"}]}, contacts, skip_unchanged_jobs=True)
+
+    # Activities changed, so j1 runs; s2's access-key lookup fails and it drops out
+    jobs = {"j1": [{"uuid": "a1"}, {"uuid": "a2"}]}
+    _, _, removed = _run(path, jobs, {"j1": [_contact("j1", "s1")]},
+                         skip_unchanged_jobs=True, incomplete={"j1"})
+    assert removed == []
+
+    # Its new fingerprint was not saved: the next run processes it again
+    delta, emitted, removed = _run(path, jobs, contacts, skip_unchanged_jobs=True)
+    assert delta.stats()["delta_skipped_jobs"] == 0
+    assert emitted == [] and removed == []
@@ -0,0 +1,92 @@
+# campaign-core/tests/unit/test_http_cache.py
+import json
+import os
+from unittest.mock import MagicMock
+
+import requests
+
+from campaign_core.http_cache import ConditionalHTTPCache, http_cache_key
+from campaign_core.netlife_client import NetlifeAPIClient
+
+
+def test_lru_eviction_keeps_the_store_under_its_byte_budget(tmp_path):
+    cache = ConditionalHTTPCache(str(tmp_path), max_bytes=25)
+    for name in ("a", "b", "c"):
+        assert cache.store(f"https://x/{name}", b"0123456789", {"ETag": f'"{name}"'})
+    assert cache.lookup("https://x/a") is None  # oldest evicted
+    assert cache.revalidated(cache.lookup("https://x/b")) == b"0123456789"
+    assert cache.stats()["http_cache_evictions"] == 1
+
+    # Index survives a restart; no validator means nothing is stored
+    reopened = ConditionalHTTPCache(str(tmp_path), max_bytes=25)
+    assert reopened.lookup("https://x/c").etag == '"c"'
+    assert not reopened.store("https://x/d", b"body", {})
+
+
+def test_cache_key_orders_params():
+    assert http_cache_key("https://x/j", {"b": 2, "a": 1}) == "https://x/j?a=1&b=2"
+
+
+def test_job_details_revalidate_with_304(tmp_path, monkeypatch):
+    """Second run sends If-None-Match and is answered from disk on a 304"""
+    document = {"data": {"name": "Job 1", "subjects": [{"uuid": "s1"}]}}
+    sent_headers = []
+
+    def fake_request(self, method, url, **kwargs):
+        headers = kwargs.get("headers") or {}
+        sent_headers.append(headers)
+        r = MagicMock()
+        if headers.get("If-None-Match") == '"v1"':
+            r.status_code, r.content, r.headers = 304, b"", {}
+        else:
+            r.status_code, r.headers = 200, {"ETag": '"v1"'}
+            r.content = json.dumps(document).encode()
+            r.json.return_value = document
+        return r
+
+    monkeypatch.setattr("requests.Session.request", fake_request)
+    cache = ConditionalHTTPCache(str(tmp_path))
+    for _ in range(2):
+        client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass",
+                                  http_cache=cache)
+        assert client.get_job_details("j1") == document["data"]
+        stats = client.get_stats_summary()
+        client.close()
+
+    assert "If-None-Match" not in sent_headers[0] and sent_headers[1]["If-None-Match"] == '"v1"'
+    assert stats["http_cache_hits"] == 1
+    assert stats["http_cache_bytes_saved"] == len(json.dumps(document))
+    assert cache.stats()["http_cache_misses"] == 1
+
+
+def test_304_on_the_last_attempt_with_a_vanished_body_refetches(tmp_path, monkeypatch):
+    document = {"data": {"name": "Job 1"}}
+    cache = ConditionalHTTPCache(str(tmp_path))
+    url = "https://legacyphoto.shop/api/v1/jobs/j1"
+    cache.store(http_cache_key(url, None), json.dumps(document).encode(), {"ETag": '"v1"'})
+    os.remove(cache._path(http_cache_key(url, None), ".body"))
+    calls = []
+
+    def fake_request(self, method, url, **kwargs):
+        headers = kwargs.get("headers") or {}
+        calls.append(headers)
+        if len(calls) < 3:  # every attempt but the last fails
+            raise requests.exceptions.ConnectionError("reset")
+        r = MagicMock()
+        if "If-None-Match" in headers:
+            r.status_code, r.content, r.headers = 304, b"", {}
+        else:
+            r.status_code, r.headers = 200, {"ETag": '"v1"'}
+            r.content = json.dumps(document).encode()
+            r.json.return_value = document
+        return r
+
+    monkeypatch.setattr("requests.Session.request", fake_request)
+    monkeypatch.setattr("campaign_core.netlife_client.time.sleep", lambda s: None)
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass",
+                              http_cache=cache)
+    try:
+        assert client.get_job_details("j1") == document["data"]
+    finally:
+        client.close()
+    assert len(calls) == 4 and "If-None-Match" not in calls[3]
@@ -0,0 +1,117 @@
+# campaign-core/tests/unit/test_json_stream.py
+import json
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from campaign_core.json_stream import (
+    JOB_DETAILS_SPEC, SUBJECTS_PAGE_SPEC, build_pruned, chunk_stream, loads_pruned, prune,
+)
+from campaign_core.netlife_client import NetlifeAPIClient
+
+JOB = {"data": {
+    "uuid": "J1", "name": "Fall Portraits", "settings": {"theme": "dark"},
+    "subjects": [
+        {"uuid": "S1", "first_name": "Ann", "images": ["I1", {"uuid": "I2", "url": "u" * 200}]},
+        {"uuid": "S2", "favorite_image_uuid": "I3", "notes": ["x"] * 50},
+    ],
+    "images": [
+        {"uuid": "I1", "activity": {"uuid": "A1", "name": "Day 1"}, "url": "u" * 500,
+         "exif": {"camera": "x", "tags": list(range(50))}},
+        {"uuid": "I2", "activity_uuid": "A2", "sizes": [{"w": 100, "url": "u"}] * 10},
+        {"uuid": "I3", "activityUuid": "A3"},
+    ],
+}}
+
+
+def _events(value):
+    """The ijson basic_parse event stream for a decoded value"""
+    if isinstance(value, dict):
+        yield ("start_map", None)
+        for key, item in value.items():
+            yield ("map_key", key)
+            yield from _events(item)
+        yield ("end_map", None)
+    elif isinstance(value, list):
+        yield ("start_array", None)
+        for item in value:
+            yield from _events(item)
+        yield ("end_array", None)
+    else:
+        yield ("string" if isinstance(value, str) else "number", value)
+
+
+def test_pruned_job_keeps_the_subject_activity_mapping():
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass")
+    try:
+        slim = prune(JOB, JOB_DETAILS_SPEC)
+        assert slim["data"]["name"] == "Fall Portraits"
+        assert slim["data"]["images"][0] == {"uuid": "I1", "activity": {"uuid": "A1"}}
+        assert len(json.dumps(slim)) < len(json.dumps(JOB)) / 3
+        assert (client.build_subject_activity_mapping(slim["data"])
+                == client.build_subject_activity_mapping(JOB["data"])
+                == {"S1": {"A1", "A2"}, "S2": {"A3"}})
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("spec", [JOB_DETAILS_SPEC, SUBJECTS_PAGE_SPEC])
+def test_event_builder_matches_prune(spec):
+    """The incremental (ijson) path builds exactly what pruning the decoded value gives"""
+    assert build_pruned(_events(JOB), spec) == prune(JOB, spec)
+    page = {"data": JOB["data"]["subjects"], "meta": {"next": None}}
+    assert build_pruned(_events(page), spec) == prune(page, spec)
+
+
+def test_subject_rows_keep_fields_but_cut_image_payloads():
+    rows = loads_pruned(chunk_stream(iter([json.dumps(JOB["data"]["subjects"]).encode()[:7],
+                                           json.dumps(JOB["data"]["subjects"]).encode()[7:]])),
+                        SUBJECTS_PAGE_SPEC)
+    assert rows[0] == {"uuid": "S1", "first_name": "Ann", "images": ["I1", {"uuid": "I2"}]}
+    assert rows[1]["notes"] == ["x"] * 50
+
+
+def test_client_parses_job_details_as_it_streams(monkeypatch):
+    """With ijson available the body is read through iter_content, never .json()"""
+    body = json.dumps(JOB).encode()
+    response = MagicMock(status_code=200, headers={})
+    response.iter_content.side_effect = lambda size: (body[i:i + size]
+                                                      for i in range(0, len(body), size))
+    response.json.side_effect = AssertionError("full decode")
+    sent = {}
+
+    def fake_request(self, method, url, **kwargs):
+        sent.update(kwargs)
+        return response
+
+    monkeypatch.setattr("requests.Session.request", fake_request)
+    monkeypatch.setattr("campaign_core.netlife_client.HAVE_IJSON", True)
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass")
+    try:
+        assert client.get_job_details("J1") == prune(JOB, JOB_DETAILS_SPEC)["data"]
+        assert sent["stream"] is True
+    finally:
+        client.close()
+
+
+def test_streamed_error_responses_are_closed(monkeypatch):
+    """A 5xx read with stream=True releases its connection before the retry"""
+    responses = []
+
+    def fake_request(self, method, url, **kwargs):
+        response = MagicMock(status_code=503, headers={})
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError("503")
+        responses.append(response)
+        return response
+
+    monkeypatch.setattr("requests.Session.request", fake_request)
+    monkeypatch.setattr("campaign_core.netlife_client.HAVE_IJSON", True)
+    monkeypatch.setattr("campaign_core.netlife_client.time.sleep", lambda s: None)
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass")
+    try:
+        with pytest.raises(requests.exceptions.HTTPError):
+            client._make_request("GET", "/jobs/J1", prune=JOB_DETAILS_SPEC)
+    finally:
+        client.close()
+    assert len(responses) == 3 and all(r.close.called for r in responses)
@@ -0,0 +1,99 @@
+# campaign-core/tests/unit/test_metrics.py
+import json
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+import requests
+
+from campaign_core.adapters.portals_async import PortalsAsync
+from campaign_core.metrics import ApiMetrics, EmfSink, LatencyHistogram
+from campaign_core.netlife_client import NetlifeAPIClient
+
+
+def _emf_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_histogram_percentiles_within_a_bucket():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    assert 50 <= histogram.percentile(0.50) <= 50 * 1.19
+    assert 90 <= histogram.percentile(0.90) <= 90 * 1.19
+    assert histogram.percentile(0.99) <= 100 and histogram.percentile(1.0) == 100
+
+
+def test_emf_documents_per_endpoint_and_portal(tmp_path):
+    metrics = ApiMetrics("legacyphoto")
+    metrics.record_response("GET", "https://x.shop/api/v1/jobs/6f1c2a9e-4b1d-4c8e/subjects",
+                            429, 0.2)
+    metrics.record_retry("GET", "https://x.shop/api/v1/jobs/6f1c2a9e-4b1d-4c8e/subjects")
+    metrics.record_response("GET", "https://x.shop/api/v1/jobs/0a1b2c3d-0000-4c8e/subjects",
+                            200, 0.05, bytes_in=2048)
+    metrics.record_response("POST", "https://x.shop/api/v1/activities/search", 200, 0.01, 10)
+    sink = tmp_path / "emf.log"
+    EmfSink(str(sink)).emit(metrics.emf_documents(namespace="SMS/Test", timestamp_ms=1))
+
+    subjects, search, portal = _emf_lines(sink)
+    directive = subjects["_aws"]["CloudWatchMetrics"][0]
+    assert subjects["_aws"]["Timestamp"] == 1
+    assert directive["Namespace"] == "SMS/Test"
+    assert directive["Dimensions"] == [["Portal", "Endpoint"]]
+    assert {m["Name"] for m in directive["Metrics"]} >= {"Requests", "Throttled", "Retries",
+                                                         "BytesIn", "LatencyP99"}
+    assert subjects["Endpoint"] == "GET /jobs/{id}/subjects"
+    assert (subjects["Requests"], subjects["Errors"], subjects["Throttled"],
+            subjects["Retries"], subjects["BytesIn"]) == (2, 1, 1, 1, 2048)
+    assert subjects["LatencyP99"] == 200.0
+    assert sum(subjects["LatencyHistogram"]["counts"]) == 2
+    assert search["Endpoint"] == "POST /activities/search"
+    assert portal["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Portal"]]
+    assert "Endpoint" not in portal and portal["Requests"] == 3
+
+
+def test_client_records_retries_and_429s(tmp_path, monkeypatch):
+    responses = iter([
+        MagicMock(status_code=429, headers={"Content-Length": "2"}, content=b"{}",
+                  raise_for_status=MagicMock(side_effect=requests.HTTPError("429"))),
+        MagicMock(status_code=200, headers={}, content=b'{"data": {"name": "Job"}}'),
+    ])
+    monkeypatch.setattr("requests.Session.request", lambda self, method, url, **kw: next(responses))
+    monkeypatch.setattr("campaign_core.netlife_client.time.sleep", lambda s: None)
+    sink = tmp_path / "emf.log"
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass",
+                              metrics_sink=EmfSink(str(sink)))
+    try:
+        assert client.get_job_details("6f1c2a9e-4b1d-4c8e-9a7b-1234567890ab")["name"] == "Job"
+        client.log_final_stats()
+    finally:
+        client.close()
+    job, portal = _emf_lines(sink)
+    assert job["Portal"] == "legacyphoto" and job["Endpoint"] == "GET /jobs/{id}"
+    assert (job["Requests"], job["Throttled"], job["Retries"], job["BytesIn"]) == (2, 1, 1, 27)
+
+
+@pytest.mark.asyncio
+async def test_portals_async_emits_per_portal(tmp_path, monkeypatch):
+    calls = []
+
+    def portal(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(429)
+        return httpx.Response(200, json={"ok": True})
+
+    async def no_sleep(seconds):
+        return None
+
+    sink = tmp_path / "emf.log"
+    portals = PortalsAsync({"legacyphoto": "https://legacyphoto.shop/api/v1"}, ("u", "p"),
+                           metrics_sink=EmfSink(str(sink)))
+    portals._client = httpx.AsyncClient(transport=httpx.MockTransport(portal))
+    monkeypatch.setattr("campaign_core.adapters.portals_async.asyncio.sleep", no_sleep)
+    assert await portals._get("legacyphoto", "/jobs/6f1c2a9e-4b1d-4c8e-9a7b") == {"ok": True}
+    portals.emit_metrics()
+    job, whole = _emf_lines(sink)
+    assert job["Endpoint"] == "GET /jobs/{id}"
+    assert (job["Requests"], job["Throttled"], job["Retries"]) == (2, 1, 1)
+    assert whole["Portal"] == "legacyphoto" and whole["BytesIn"] == job["BytesIn"] > 0
@@ -0,0 +1,195 @@
+# campaign-core/tests/unit/test_netlife_client.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from campaign_core.netlife_client import IncompleteFetchError, NetlifeAPIClient
+from campaign_core.persistent_cache import CacheView, PersistentCache
+
+
+@pytest.fixture
+def client():
+    c = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass")
+    yield c
+    c.close()
+
+
+def _json_response(payload, status=200):
+    r = MagicMock()
+    r.status_code = status
+    r.headers = {"content-type": "application/json"}
+    r.text = "{}"
+    r.content = b"{}"
+    r.json.return_value = payload
+    return r
+
+
+def test_sessions_are_per_thread_and_share_pool(client):
+    """Each worker thread gets its own session mounted on the shared adapter"""
+    sessions = []
+    def grab():
+        sessions.append(client.session)
+    threads = [threading.Thread(target=grab) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in sessions}) == 3
+    assert all(s.get_adapter("https://legacyphoto.shop") is client._adapter for s in sessions)
+
+
+def test_http_get_is_not_globally_serialized(client, monkeypatch):
+    """Concurrent http_get calls overlap instead of queuing behind one lock"""
+    in_flight = 0
+    peak = 0
+    guard = threading.Lock()
+
+    def slow_get(self, method, url, **kwargs):
+        nonlocal in_flight, peak
+        with guard:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with guard:
+            in_flight -= 1
+        return _json_response({"ok": True})
+
+    monkeypatch.setattr("requests.Session.request", slow_get)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda i: client.http_get(f"/jobs/{i}"), range(4)))
+
+    assert results == [{"ok": True}] * 4
+    assert peak > 1
+
+
+def test_access_keys_bulk_resolves_every_subject(client, monkeypatch):
+    """Bulk resolution fans out per subject and maps misses to None"""
+    def fake_request(method, endpoint, **kwargs):
+        subject_uuid = endpoint.split("/")[4]
+        if subject_uuid == "s2":
+            return []
+        return [{"access_key": f"key-{subject_uuid}"}]
+
+    monkeypatch.setattr(client, "_make_request", fake_request)
+    subjects = [{"uuid": "s1"}, {"uuid": "s2"}, {"uuid": "s3"}, {"name": "no uuid"}]
+    keys = client.get_access_keys_bulk("job1", subjects, max_workers=2)
+
+    assert keys == {"s1": "key-s1", "s2": None, "s3": "key-s3"}
+    assert client.get_stats_summary()["access_keys_existing"] == 2
+
+
+def test_failed_access_key_lookups_are_not_negative_cached(client, monkeypatch, tmp_path):
+    """Only a confirmed empty listing (or 404) becomes a cached '' - errors are retried next run"""
+    def fake_request(method, endpoint, **kwargs):
+        subject_uuid = endpoint.split("/")[4]
+        if subject_uuid in ("s503", "s404"):
+            response = MagicMock(status_code=int(subject_uuid[1:]))
+            raise requests.HTTPError(f"{response.status_code}", response=response)
+        if subject_uuid == "s-timeout":
+            raise requests.Timeout("read timed out")
+        return [] if subject_uuid == "s-none" else [{"access_key": f"key-{subject_uuid}"}]
+
+    monkeypatch.setattr(client, "_make_request", fake_request)
+    subjects = [{"uuid": u} for u in ("s1", "s-none", "s404", "s503", "s-timeout")]
+    keys = client.get_access_keys_bulk("job1", subjects)
+    assert keys == {"s1": "key-s1", "s-none": None, "s404": None}
+    assert client.get_stats_summary()["access_keys_failed"] == 2
+
+    # What cli_live's prefetch stores: failures stay out of the persistent cache
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    view = CacheView(cache, "access_keys", ttl=3600, negative_ttl=3600)
+    view.update({("job1", u): code or "" for u, code in keys.items()})
+    cache.close()
+    reopened = CacheView(PersistentCache(str(tmp_path / "cache.sqlite")), "access_keys",
+                         ttl=3600, negative_ttl=3600)
+    assert ("job1", "s-none") in reopened and ("job1", "s503") not in reopened
+
+
+def test_subject_fetch_follows_audience(client, monkeypatch):
+    """Buyers-only skips the non-buyer listing; split_locally partitions one listing"""
+    calls = []
+    def fake_request(method, endpoint, params=None, **kwargs):
+        flag = (params or {}).get("filter_has_order")
+        calls.append(flag)
+        if flag is None:
+            return [{"uuid": "s1", "has_order": True}, {"uuid": "s2", "has_order": False}]
+        return [{"uuid": "s1" if flag == "true" else "s2"}]
+
+    monkeypatch.setattr(client, "_make_request", fake_request)
+    assert client.get_buyers_and_non_buyers("job1", audience="buyers") == ([{"uuid": "s1"}], [])
+    assert calls == ["true"]
+
+    calls.clear()
+    buyers, non_buyers = client.get_buyers_and_non_buyers("job2", split_locally=True)
+    assert calls == [None]
+    assert [s["uuid"] for s in buyers] == ["s1"] and [s["uuid"] for s in non_buyers] == ["s2"]
+
+    calls.clear()
+    assert client.get_buyers_and_non_buyers("job3") == ([{"uuid": "s1"}], [{"uuid": "s2"}])
+    assert sorted(calls) == ["false", "true"]
+
+
+def test_user_details_and_registrations_persist_across_clients(tmp_path, monkeypatch):
+    """A second run served from the persistent cache makes no user/registration calls"""
+    calls = []
+    def fake_request(method, endpoint, **kwargs):
+        calls.append(endpoint)
+        return {"uuid": "u1", "phone_number": "5551234567"}
+    def fake_http_get(endpoint, params=None, timeout=30):
+        calls.append(endpoint)
+        return {"data": [{"subjectUuid": "s1", "userUuid": "u1", "email": "a@x.com"}]}
+
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    for run in range(2):
+        c = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass",
+                             persistent_cache=cache)
+        monkeypatch.setattr(c, "_make_request", fake_request)
+        monkeypatch.setattr(c, "http_get", fake_http_get)
+        assert c.get_user_details("u1")["phone_number"] == "5551234567"
+        assert c.get_job_registered_users_map("j1") == {"s1": {"userUuid": "u1", "email": "a@x.com"}}
+        stats = c.get_stats_summary()
+        c.close()
+
+    assert calls == ["/users/u1", "/jobs/j1/users"]
+    assert stats["user_details_cache_hits"] == 1 and stats["registrations_cache_hits"] == 1
+    cache.close()
+
+
+def test_registrations_are_not_cached_when_a_page_fails(tmp_path, monkeypatch):
+    """A users page failing part way raises and leaves the persistent cache untouched"""
+    pages = {"/jobs/j1/users?page=2": None}
+    def fake_http_get(endpoint, params=None, timeout=30):
+        return {"data": [{"subjectUuid": "s1", "userUuid": "u1", "email": "a@x.com"}],
+                "meta": {"next": "/jobs/j1/users?page=2"}}
+    def fake_get_json(url, params=None, timeout=30):
+        return pages[url.split("/api/v1", 1)[1]]
+
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    c = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass",
+                         persistent_cache=cache)
+    monkeypatch.setattr(c, "http_get", fake_http_get)
+    monkeypatch.setattr(c, "_get_json", fake_get_json)
+    with pytest.raises(IncompleteFetchError):
+        c.get_job_registered_users_map("j1")
+    assert c.get_stats_summary()["registrations_incomplete"] == 1
+    assert cache.count("registrations") == 0
+
+    pages["/jobs/j1/users?page=2"] = {"data": [{"subjectUuid": "s2", "userUuid": "u2"}]}
+    assert set(c.get_job_registered_users_map("j1")) == {"s1", "s2"}
+    assert cache.count("registrations") == 1
+    c.close()
+    cache.close()
+
+
+def test_failed_subject_listing_raises(client, monkeypatch):
+    """A failed listing is an error for the job, not an empty audience"""
+    def failing_request(method, endpoint, **kwargs):
+        raise requests.ConnectionError("connection reset")
+
+    monkeypatch.setattr(client, "_make_request", failing_request)
+    with pytest.raises(IncompleteFetchError):
+        client.get_buyers_and_non_buyers("job1")
@@ -0,0 +1,86 @@
+# campaign-core/tests/unit/test_netlife_client_async.py
+import httpx
+import pytest
+from campaign_core.netlife_client import IncompleteFetchError
+from campaign_core.netlife_client_async import AsyncNetlifeAPIClient
+
+SUBJECT_CALLS = []
+
+
+def _portal(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if path == "/api/v1/jobs/J1/users":
+        if request.url.params.get("page") == "2":
+            return httpx.Response(200, json={"data": [{"subjectUuid": "S2", "userUuid": "U2", "email": "B@X.COM"}]})
+        return httpx.Response(200, json={"data": [{"subjectUuid": "S1", "userUuid": "U1", "email": "a@x.com"}],
+                                         "meta": {"next": "/jobs/J1/users?page=2"}})
+    if path == "/api/v1/jobs/J1/subjects":
+        SUBJECT_CALLS.append(request.url.params.get("filter_has_order"))
+        if "filter_has_order" not in request.url.params:
+            return httpx.Response(200, json={"data": [{"uuid": "S1", "has_order": True},
+                                                      {"uuid": "S2", "has_order": False}]})
+        has_order = request.url.params.get("filter_has_order") == "true"
+        return httpx.Response(200, json={"data": [{"uuid": "S1" if has_order else "S2"}]})
+    if path.endswith("/accesskeys"):
+        subject = path.split("/")[-2]
+        return httpx.Response(200, json={"data": [{"access_key": f"key-{subject}"}]})
+    return httpx.Response(404)
+
+
+def _client() -> AsyncNetlifeAPIClient:
+    c = AsyncNetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass")
+    c._client = httpx.AsyncClient(transport=httpx.MockTransport(_portal))
+    return c
+
+
+@pytest.mark.asyncio
+async def test_registered_users_map_follows_pagination():
+    """Same {subjectUuid: {userUuid, email}} shape as the sync client"""
+    async with _client() as client:
+        users = await client.get_job_registered_users_map("J1")
+    assert users == {"S1": {"userUuid": "U1", "email": "a@x.com"},
+                     "S2": {"userUuid": "U2", "email": "b@x.com"}}
+
+
+@pytest.mark.asyncio
+async def test_subjects_and_access_keys():
+    """Buyer/non-buyer listings and bulk access keys resolve concurrently"""
+    async with _client() as client:
+        buyers, non_buyers = await client.get_buyers_and_non_buyers("J1")
+        assert buyers == [{"uuid": "S1"}] and non_buyers == [{"uuid": "S2"}]
+
+        keys = await client.get_access_keys_bulk("J1", buyers + non_buyers)
+        assert keys == {"S1": "key-S1", "S2": "key-S2"}
+        assert client.get_stats_summary()["subjects_total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_subject_fetch_follows_audience():
+    """Only the listings the audience needs are requested; split_locally makes one call"""
+    SUBJECT_CALLS.clear()
+    async with _client() as client:
+        buyers, non_buyers = await client.get_buyers_and_non_buyers("J1", audience="non-buyers")
+        assert buyers == [] and non_buyers == [{"uuid": "S2"}]
+        assert SUBJECT_CALLS == ["false"]
+
+    SUBJECT_CALLS.clear()
+    async with _client() as client:
+        buyers, non_buyers = await client.get_buyers_and_non_buyers("J1", split_locally=True)
+        assert [s["uuid"] for s in buyers] == ["S1"]
+        assert [s["uuid"] for s in non_buyers] == ["S2"]
+        assert SUBJECT_CALLS == [None]
+
+
+@pytest.mark.asyncio
+async def test_failed_users_page_raises(monkeypatch):
+    """A meta.next page that cannot be fetched raises instead of returning a partial map"""
+    async with _client() as client:
+        get_json = client._get_json
+
+        async def failing_page(url, params=None, timeout=30):
+            return None if "page=" in url else await get_json(url, params=params, timeout=timeout)
+
+        monkeypatch.setattr(client, "_get_json", failing_page)
+        with pytest.raises(IncompleteFetchError):
+            await client.get_job_registered_users_map("J1")
+        assert client.get_stats_summary()["registrations_incomplete"] == 1
@@ -0,0 +1,93 @@
+# campaign-core/tests/unit/test_output.py
+import csv
+
+import pytest
+
+from campaign_core.contracts import OutputContract
+from campaign_core.models import Contact
+from campaign_core.output import CSV_COLUMNS, CsvStreamWriter, open_csv_output, spooled_part
+
+
+def _contact(subject_uuid, job_name="Job"):
+    return Contact(portal="legacyphoto", job_uuid="j1", job_name=job_name,
+                   subject_uuid=subject_uuid, phone_number="5551234567", buyer="No",
+                   access_code="K", url="u", custom_gallery_url="c",
+                   sms_marketing_timestamp="t", sms_transactional_timestamp="t",
+                   activity_uuid="a1", activity_name="Fall, 2025", registered_user="No")
+
+
+def test_rows_are_quoted_and_parts_appended_in_order(tmp_path):
+    """Commas in names stay in one cell; spooled parts land after the direct writer"""
+    out = tmp_path / "out.csv"
+    writer = open_csv_output(str(out))
+    part = spooled_part()
+    part.write_contacts([_contact("s2"), _contact("s3")])
+    writer.write_contacts([_contact("s1", job_name='Smith, "Jr" Portraits')])
+    writer.append(part)
+    part.close()
+    writer.close()
+
+    rows = list(csv.reader(out.open(newline="")))
+    assert tuple(rows[0]) == CSV_COLUMNS
+    assert [r[3] for r in rows[1:]] == ["s1", "s2", "s3"]
+    assert rows[1][2] == 'Smith, "Jr" Portraits'
+    assert rows[1][CSV_COLUMNS.index("activity_name")] == "Fall, 2025"
+    assert writer.rows == 3
+
+
+def test_empty_run_writes_nothing(tmp_path):
+    out = tmp_path / "out.csv"
+    writer = open_csv_output(str(out))
+    writer.write_contacts([])
+    writer.close()
+    assert not out.exists()
+
+
+def test_format_csv_matches_stream_writer(tmp_path):
+    contacts = [_contact("s1"), _contact("s2")]
+    out = tmp_path / "out.csv"
+    writer = CsvStreamWriter(lambda: out.open("w", newline=""))
+    writer.write_contacts(contacts)
+    writer.close()
+    assert out.read_text() == OutputContract.format_csv(contacts) + "\n"
+
+
+def test_s3_output_streams_multipart_with_kms(monkeypatch):
+    """Parts go up while rows are written; KMS settings ride on the upload"""
+    moto = pytest.importorskip("moto")
+    import boto3
+    from campaign_core import output
+
+    monkeypatch.setitem(output.OUTPUT_CONFIG, "s3_part_size", output.S3_MIN_PART_SIZE)
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="campaigns")
+        kms_key = boto3.client("kms", region_name="us-east-1").create_key()["KeyMetadata"]["KeyId"]
+
+        writer = open_csv_output("s3://campaigns/runs/out.csv", kms_key_id=kms_key, s3_client=s3)
+        batch = [_contact(f"s{i:06d}", job_name="x" * 200) for i in range(500)]
+        for _ in range(60):  # ~24 MiB: several parts
+            writer.write_contacts(batch)
+        assert s3.list_multipart_uploads(Bucket="campaigns").get("Uploads")  # started mid-run
+        writer.close()
+
+        obj = s3.get_object(Bucket="campaigns", Key="runs/out.csv")
+        assert obj["ServerSideEncryption"] == "aws:kms"
+        assert obj["SSEKMSKeyId"].endswith(kms_key)
+        lines = obj["Body"].read().decode().splitlines()
+        assert len(lines) == 1 + writer.rows == 1 + 30000
+        assert not s3.list_multipart_uploads(Bucket="campaigns").get("Uploads")
+
+
+def test_small_s3_output_is_a_single_put(monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="campaigns")
+        writer = open_csv_output("s3://campaigns/out.csv", s3_client=s3)
+        writer.write_contacts([_contact("s1")])
+        writer.close()
+        body = s3.get_object(Bucket="campaigns", Key="out.csv")["Body"].read().decode()
+        assert body.splitlines()[1].split(",")[3] == "s1"
@@ -0,0 +1,56 @@
+# campaign-core/tests/unit/test_persistent_cache.py
+import time
+
+import pytest
+
+from campaign_core.persistent_cache import CacheView, PersistentCache, open_persistent_cache
+
+
+def test_view_persists_across_runs_with_negative_ttl(tmp_path):
+    """Hits outlive the run; negative results expire on their shorter TTL"""
+    path = str(tmp_path / "cache.sqlite")
+    first = PersistentCache(path)
+    view = CacheView(first, "access_keys", ttl=3600, negative_ttl=0.05)
+    view.update({("j1", "s1"): "KEY1", ("j1", "s2"): ""})
+    first.close()
+
+    time.sleep(0.1)
+    second = PersistentCache(path)
+    view = CacheView(second, "access_keys", ttl=3600, negative_ttl=0.05)
+    assert view.get(("j1", "s1")) == "KEY1"
+    assert ("j1", "s2") not in view
+    assert ("j1", "s2") not in view  # the miss is memoized, not queried again
+    assert view.stats() == {"hits": 1, "misses": 1, "writes": 0}
+    assert second.purge_expired() == 1
+    view[("j1", "s2")] = "KEY2"
+    assert view.get(("j1", "s2")) == "KEY2" and list(view) == [("j1", "s1"), ("j1", "s2")]
+    second.close()
+
+
+def test_namespaces_are_isolated(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    cache.set("users", "u1", {"phone_number": "555"}, ttl=60)
+    assert cache.get("users", "u1") == {"phone_number": "555"}
+    assert cache.get("access_keys", "u1") is None
+    cache.close()
+
+
+def test_seed_and_sync_through_s3(tmp_path):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="caches")
+        uri = "s3://caches/legacyphoto/cache.sqlite"
+
+        # First task: nothing to seed, write, sync
+        cache = open_persistent_cache(str(tmp_path / "a.sqlite"), uri, s3_client=s3)
+        CacheView(cache, "access_keys", ttl=60, negative_ttl=60)[("j1", "s1")] = "KEY1"
+        cache.sync_to_s3(uri, s3_client=s3)
+        cache.close()
+
+        # Next task on a fresh disk starts from the synced copy
+        cache = open_persistent_cache(str(tmp_path / "b.sqlite"), uri, s3_client=s3)
+        assert CacheView(cache, "access_keys", ttl=60, negative_ttl=60).get(("j1", "s1")) == "KEY1"
+        cache.close()
@@ -0,0 +1,100 @@
+# campaign-core/tests/unit/test_profiling.py
+import cProfile
+import json
+import pstats
+import sys
+import threading
+from unittest.mock import MagicMock
+
+from campaign_core.netlife_client import NetlifeAPIClient
+from campaign_core.profiling import RunProfiler, endpoint_template, write_profile
+
+
+def test_endpoint_template_collapses_ids():
+    url = "https://legacyphoto.shop/api/v1/jobs/6f1c2a9e-4b1d-4c8e-9a7b-1234567890ab/subjects?page=2"
+    assert endpoint_template(url) == "/jobs/{id}/subjects"
+    assert endpoint_template("/api/v1/activities/search") == "/activities/search"
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = RunProfiler()
+    with profiler.stage("assemble"):
+        pass
+    profiler.record_endpoint("GET", "/jobs/abc12345", 0.1)
+    report = profiler.report()
+    assert report["stages"] == {} and report["endpoints"] == {}
+
+
+def test_report_with_cprofile_and_tracemalloc(tmp_path):
+    profiler = RunProfiler(True, cprofile=True, memory=True)
+
+    def build_rows():
+        return [{"n": i} for i in range(20_000)]
+
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def job():
+        try:
+            with profiler.stage("assemble"):
+                barrier.wait(timeout=5)  # both threads inside a profiled stage at once
+                assert len(build_rows()) == 20_000
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=job) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    with profiler.stage("csv_write"):
+        pass
+
+    out = tmp_path / "campaign.csv"
+    try:
+        path = write_profile(profiler, str(out), portals=["legacyphoto"])
+    finally:
+        profiler.close()
+    assert path == f"{out}.profile.json"
+    report = json.loads(out.with_name("campaign.csv.profile.json").read_text())
+    assert report["portals"] == ["legacyphoto"]
+    assemble = report["stages"]["assemble"]
+    assert assemble["calls"] == 2 and assemble["cpu_s"] > 0
+    assert assemble["tracemalloc_peak_bytes"] > 20_000 * 50
+    # Both worker threads' calls end up in one dump that pstats can read (total calls:
+    # on 3.12 the threads share one profiler, which can count overlapping calls as recursive)
+    stats = pstats.Stats(report["cprofile_dump"])
+    assert stats.stats[next(key for key in stats.stats if key[2] == "build_rows")][1] == 2
+
+
+def test_stage_runs_when_another_profiler_is_active():
+    outside = cProfile.Profile()
+    profiler = RunProfiler(True, cprofile=True)
+    outside.enable()
+    try:
+        with profiler.stage("assemble"):
+            rows = [{"n": i} for i in range(100)]
+    finally:
+        outside.disable()
+    assert len(rows) == 100
+    report = profiler.report()
+    assert report["stages"]["assemble"]["calls"] == 1
+    if sys.version_info >= (3, 12):
+        # Only one cProfile can be enabled per process: the stage is timed, not profiled
+        assert report["cprofile_skipped_stages"] == 1
+
+
+def test_client_send_records_endpoint_timings(monkeypatch):
+    response = MagicMock(status_code=200, headers={}, content=b'{"data": {"name": "Job"}}')
+    monkeypatch.setattr("requests.Session.request", lambda self, method, url, **kw: response)
+    profiler = RunProfiler(True)
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass",
+                              profiler=profiler)
+    try:
+        client.get_job_details("6f1c2a9e-4b1d-4c8e-9a7b-1234567890ab")
+        client.get_job_details("0a1b2c3d-0000-4c8e-9a7b-1234567890ab")
+    finally:
+        client.close()
+    endpoint = profiler.report()["endpoints"]["GET /jobs/{id}"]
+    assert endpoint["calls"] == 2 and endpoint["cpu_s"] is not None
@@ -0,0 +1,40 @@
+# campaign-core/tests/unit/test_rate_limit.py
+import asyncio
+import time
+
+import pytest
+from campaign_core.adapters.secrets import load_basic_auth
+from campaign_core.rate_limit import TokenBucket, get_rate_limiter
+
+
+def test_bucket_paces_requests_after_burst():
+    """Once the burst capacity is spent, acquisitions are spaced at 1/rate"""
+    bucket = TokenBucket(rate_per_sec=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    assert elapsed >= 4 / 20 * 0.9
+    assert bucket.waits == 4
+
+
+@pytest.mark.asyncio
+async def test_bucket_is_shared_between_threads_and_tasks():
+    """Async tasks draw from the same process-wide bucket as threads"""
+    bucket = get_rate_limiter("ratelimit-test.shop", 50)
+    assert get_rate_limiter("ratelimit-test.shop", 50) is bucket
+    assert get_rate_limiter("ratelimit-test.shop", 0) is None
+
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire_async() for _ in range(60)))
+    assert time.monotonic() - start >= 10 / 50 * 0.9
+
+
+def test_secret_without_rate_limit_is_unlimited(tmp_path):
+    """A secret that never set rate_limit_per_sec must not be capped by a default"""
+    path = tmp_path / "secret.json"
+    path.write_text('{"username": "u", "password": "p"}')
+    _, _, _, rate_limit = load_basic_auth(f"file://{path}")
+    assert rate_limit == 0
+    assert get_rate_limiter("unlimited-secret.shop", rate_limit) is None
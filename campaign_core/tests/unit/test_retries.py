@@ -1,8 +1,32 @@
 # campaign-core/tests/unit/test_retries.py
 import pytest
 
+from campaign_core.mock_portal import MockPortalConfig, MockPortalServer
+from campaign_core.netlife_client import NetlifeAPIClient
+from campaign_core.synthetic import DatasetSpec, SyntheticDataset
+
 @pytest.mark.skip(reason="Async adapter integration not fully implemented")
 @pytest.mark.asyncio
 async def test_retries_on_429(fake_async_portal_flaky):
     rows = await fake_async_portal_flaky.generate([...], concurrency=4, retries=3)
-    assert rows and fake_async_portal_flaky.retry_counts["/subjects"] >= 1
\ No newline at end of file
+    assert rows and fake_async_portal_flaky.retry_counts["/subjects"] >= 1
+
+def test_client_retries_through_mock_portal_faults(monkeypatch):
+    monkeypatch.setattr("campaign_core.netlife_client.time.sleep", lambda s: None)
+    dataset = SyntheticDataset(DatasetSpec(jobs=2, subjects_per_job=30, registered_ratio=0.5))
+    config = MockPortalConfig(users_page_size=4, throttle_rate=0.1, error_rate=0.05, seed=7)
+    with MockPortalServer(config, dataset) as server:
+        client = NetlifeAPIClient("legacyphoto", server.base_url("legacyphoto"), "user", "pass")
+        try:
+            job_uuid = server.data.job_uuid("legacyphoto", 1)
+            activities = client.get_activities_in_webshop()
+            subjects = client.get_job_subjects(job_uuid)
+            registrations = client.get_job_registered_users_map(job_uuid)
+        finally:
+            client.close()
+    job = server.data.job("legacyphoto", job_uuid)
+    assert len(activities) == 2 * dataset.spec.activities_per_job
+    assert sorted(s["uuid"] for s in subjects) == sorted(s["uuid"] for s in job.subjects)
+    assert set(registrations) == {r["subjectUuid"] for r in server.data.registrations(job)}
+    assert server.statuses[429] >= 1 and server.requests["users"] > 1
+    assert client.metrics.summary()["*"]["Retries"] >= 1
@@ -0,0 +1,62 @@
+# campaign-core/tests/unit/test_shutdown.py
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from campaign_core.output import clear_partial_marker, write_partial_marker
+from campaign_core.shutdown import ShutdownCoordinator, ShutdownRequested
+
+
+def test_sigterm_stops_new_jobs_and_bounds_in_flight_ones():
+    shutdown = ShutdownCoordinator(grace_seconds=0.2).install(signals=(signal.SIGTERM,))
+    try:
+        release = threading.Event()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            quick = pool.submit(shutdown.guard(lambda: "done"))
+            stuck = pool.submit(shutdown.guard(release.wait))
+            assert shutdown.result(quick) == "done"
+
+            os.kill(os.getpid(), signal.SIGTERM)
+            assert shutdown.requested and shutdown.signal_name == "SIGTERM"
+            with pytest.raises(ShutdownRequested):
+                pool.submit(shutdown.guard(lambda: "late")).result()
+
+            started = time.monotonic()
+            with pytest.raises(ShutdownRequested):
+                shutdown.result(stuck)
+            assert time.monotonic() - started < 1
+            release.set()
+        # The first signal restored the original handler for a second one
+        assert signal.getsignal(signal.SIGTERM) is not shutdown._handle
+    finally:
+        shutdown.restore()
+
+
+def test_result_async_cancels_at_deadline():
+    async def main():
+        shutdown = ShutdownCoordinator(grace_seconds=0.1)
+        finished = asyncio.ensure_future(asyncio.sleep(0, result=7))
+        assert await shutdown.result_async(finished) == 7
+        stuck = asyncio.ensure_future(asyncio.sleep(10))
+        shutdown.request("SIGINT")
+        with pytest.raises(ShutdownRequested):
+            await shutdown.result_async(stuck)
+        await asyncio.sleep(0)
+        assert stuck.cancelled()
+
+    asyncio.run(main())
+
+
+def test_partial_marker_roundtrip(tmp_path):
+    out = str(tmp_path / "campaign.csv")
+    write_partial_marker(out, {"status": "partial", "records": 3})
+    assert json.loads((tmp_path / "campaign.csv.partial.json").read_text())["records"] == 3
+    clear_partial_marker(out)
+    clear_partial_marker(out)
+    assert not (tmp_path / "campaign.csv.partial.json").exists()
@@ -0,0 +1,82 @@
+# campaign-core/tests/unit/test_synthetic.py
+import random
+import threading
+
+from campaign_core.adapters.portals_async import generate_realistic_phone
+from campaign_core.netlife_client import NetlifeAPIClient
+from campaign_core.synthetic import (
+    SCALES, DatasetSpec, DiskDataset, SyntheticDataset, dump, fingerprint,
+)
+
+
+def test_jobs_are_deterministic_in_any_order_and_thread():
+    spec = DatasetSpec(jobs=6, subjects_per_job=40, subjects_jitter=0.5, seed=3)
+    forward = [job.to_dict() for job in SyntheticDataset(spec).iter_jobs("legacyphoto")]
+
+    backward = SyntheticDataset(spec, cache_jobs=1)
+    results = {}
+
+    def build(index):
+        results[index] = backward.job_at("legacyphoto", index).to_dict()
+
+    threads = [threading.Thread(target=build, args=(i,)) for i in reversed(range(spec.jobs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [results[i] for i in range(spec.jobs)] == forward
+    assert fingerprint(SyntheticDataset(DatasetSpec(jobs=6, seed=4)), "legacyphoto") != \
+        fingerprint(SyntheticDataset(spec), "legacyphoto")
+
+
+def test_generation_leaves_global_random_alone():
+    random.seed(42)
+    expected = random.random()
+    random.seed(42)
+    SyntheticDataset().job_at("legacyphoto", 0)
+    assert generate_realistic_phone("S1") == generate_realistic_phone("S1")
+    assert random.random() == expected
+
+
+def test_sc004_scale_and_ratios():
+    totals = SyntheticDataset(SCALES["sc004"]).totals("legacyphoto")
+    assert totals["jobs"] == 100
+    assert 9_000 <= totals["subjects"] <= 11_000
+    assert abs(totals["buyers"] / totals["subjects"] - 0.4) < 0.03
+    assert abs(totals["registered"] / totals["subjects"] - 0.3) < 0.03
+    assert DatasetSpec.scaled(1_000_000).jobs * DatasetSpec.scaled(1_000_000).subjects_per_job == 10 ** 6
+
+
+def test_per_portal_specs_and_api_documents():
+    dataset = SyntheticDataset(DatasetSpec(jobs=2),
+                               portal_specs={"westpointportraits": DatasetSpec(jobs=5, seed=9)})
+    assert len(dataset.activities("legacyphoto")) == 4
+    assert len(dataset.activities("westpointportraits")) == 10
+    job = dataset.job_at("legacyphoto", 1)
+    assert dataset.job("legacyphoto", job.uuid) is job
+    client = NetlifeAPIClient("legacyphoto", "https://legacyphoto.shop/api/v1", "user", "pass")
+    try:
+        # Every subject maps to activities, whichever way its images name them
+        mapping = client.build_subject_activity_mapping(dataset.job_document(job))
+    finally:
+        client.close()
+    assert set(mapping) == {s["uuid"] for s in job.subjects}
+    buyers = dataset.subject_rows(job, has_order=True)
+    assert buyers and all(row["has_order"] and "_access_key" not in row for row in buyers)
+    subject = job.subjects[0]
+    assert dataset.access_key(job, subject["uuid"]) == subject["_access_key"]
+    assert dataset.user("U1") == dataset.user("U1")
+
+
+def test_dump_round_trips_through_disk(tmp_path):
+    dataset = SyntheticDataset(DatasetSpec(jobs=4, subjects_per_job=30, image_padding_bytes=64))
+    manifest = dump(dataset, str(tmp_path), ["legacyphoto", "nowandgen"])
+    assert manifest["portals"]["nowandgen"]["jobs"] == 4
+    disk = DiskDataset(str(tmp_path), cache_jobs=1)
+    for portal in ("legacyphoto", "nowandgen"):
+        assert fingerprint(disk, portal) == fingerprint(dataset, portal)
+        assert disk.activities(portal) == dataset.activities(portal)
+    job_uuid = dataset.job_uuid("nowandgen", 2)
+    assert disk.registrations(disk.job("nowandgen", job_uuid)) == \
+        dataset.registrations(dataset.job("nowandgen", job_uuid))
+    assert disk.job("unknown", job_uuid) is None